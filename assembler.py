@@ -0,0 +1,376 @@
+import re
+import html
+import posixpath
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from bundler import minify_css, resolve
+from image_index import normalize_url
+from image_pipeline import iter_images
+
+DEFAULT_INDEX = """<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>{title}</title>
+</head>
+<body>
+  <main id="main"></main>
+</body>
+</html>"""
+
+# At-rules whose blocks contain style rules that are filtered like top-level ones
+NESTED_AT_RULES = ("@media", "@supports", "@layer", "@container")
+# Small, referenced from critical rules and needed to render them without a flash
+ALWAYS_CRITICAL_AT_RULES = ("@font-face", "@charset")
+
+
+def parse_css(css: str) -> List[Tuple[str, Any]]:
+    """Split minified CSS into (prelude, body) rules; bodies of grouping at-rules are parsed
+    recursively, statements like @import have a body of None."""
+    rules, i, n = [], 0, len(css)
+    while i < n:
+        brace = semicolon = None
+        depth, j, quote = 0, i, None
+        while j < n:
+            c = css[j]
+            if quote:
+                if c == "\\":
+                    j += 1
+                elif c == quote:
+                    quote = None
+            elif c in "\"'":
+                quote = c
+            elif c == "(":
+                depth += 1
+            elif c == ")":
+                depth -= 1
+            elif depth == 0 and c == "{":
+                brace = j
+                break
+            elif depth == 0 and c == ";":
+                semicolon = j
+                break
+            j += 1
+        if brace is None:
+            if semicolon is not None and css[i:semicolon].strip():
+                rules.append((css[i:semicolon].strip(), None))
+            i = (semicolon if semicolon is not None else n) + 1
+            continue
+        # Find the matching close brace
+        depth, k, quote = 1, brace + 1, None
+        while k < n and depth:
+            c = css[k]
+            if quote:
+                if c == "\\":
+                    k += 1
+                elif c == quote:
+                    quote = None
+            elif c in "\"'":
+                quote = c
+            elif c == "{":
+                depth += 1
+            elif c == "}":
+                depth -= 1
+            k += 1
+        prelude, body = css[i:brace].strip(), css[brace + 1:k - 1]
+        rules.append((prelude, parse_css(body) if prelude.lower().startswith(NESTED_AT_RULES) else body))
+        i = k
+    return rules
+
+
+def serialize_css(rules: List[Tuple[str, Any]]) -> str:
+    parts = []
+    for prelude, body in rules:
+        if body is None:
+            parts.append(f"{prelude};")
+        elif isinstance(body, list):
+            parts.append(f"{prelude}{{{serialize_css(body)}}}")
+        else:
+            parts.append(f"{prelude}{{{body}}}")
+    return "".join(parts)
+
+
+def split_selectors(prelude: str) -> List[str]:
+    selectors, depth, start = [], 0, 0
+    for i, c in enumerate(prelude):
+        depth += {"(": 1, ")": -1, "[": 1, "]": -1}.get(c, 0)
+        if c == "," and depth == 0:
+            selectors.append(prelude[start:i])
+            start = i + 1
+    selectors.append(prelude[start:])
+    return [s.strip() for s in selectors if s.strip()]
+
+
+def html_tokens(markup: str) -> Tuple[Set[str], Set[str], Set[str]]:
+    """Tag names, classes and ids used in a fragment of HTML."""
+    tags = {t.lower() for t in re.findall(r"<([a-zA-Z][\w-]*)", markup)}
+    classes = {c for value in re.findall(r"\sclass\s*=\s*[\"']([^\"']*)", markup) for c in value.split()}
+    ids = set(re.findall(r"\sid\s*=\s*[\"']([^\"']*)", markup))
+    return tags, classes, ids
+
+
+def selector_matches(selector: str, tags: Set[str], classes: Set[str], ids: Set[str]) -> bool:
+    """Whether the subject of a selector can match an element in the token sets.
+
+    Only the last compound selector is checked, with pseudo-classes and attribute selectors
+    ignored, so the test errs toward including a rule.
+    """
+    selector = re.sub(r"::?[\w-]+(\([^)]*\))?", "", selector)
+    selector = re.sub(r"\[[^\]]*\]", "", selector)
+    compounds = [c for c in re.split(r"\s*[>+~\s]\s*", selector.strip()) if c]
+    if not compounds:
+        return True
+    subject = compounds[-1]
+    tag = re.match(r"[a-zA-Z][\w-]*|\*", subject)
+    if tag and tag.group(0) != "*" and tag.group(0).lower() not in tags:
+        return False
+    return (set(re.findall(r"\.([\w-]+)", subject)) <= classes
+            and set(re.findall(r"#([\w-]+)", subject)) <= ids)
+
+
+def split_critical(css: str, tokens: Tuple[Set[str], Set[str], Set[str]]) -> Tuple[str, str]:
+    """Split a stylesheet into the rules that can apply to the above-the-fold markup and the rest."""
+    def split(rules):
+        critical, rest = [], []
+        for prelude, body in rules:
+            lower = prelude.lower()
+            if isinstance(body, list):
+                inner_critical, inner_rest = split(body)
+                if inner_critical:
+                    critical.append((prelude, inner_critical))
+                if inner_rest:
+                    rest.append((prelude, inner_rest))
+            elif lower.startswith(ALWAYS_CRITICAL_AT_RULES):
+                critical.append((prelude, body))
+            elif lower.startswith("@"):
+                rest.append((prelude, body))
+            elif any(selector_matches(s, *tokens) for s in split_selectors(prelude)):
+                critical.append((prelude, body))
+            else:
+                rest.append((prelude, body))
+        return critical, rest
+
+    critical, rest = split(parse_css(minify_css(css)))
+    return serialize_css(critical), serialize_css(rest)
+
+
+def set_attribute(tag: str, name: str, value: Optional[str]) -> str:
+    """Set (or with None remove) an attribute on an opening tag."""
+    pattern = re.compile(rf"\s{name}(\s*=\s*(\"[^\"]*\"|'[^']*'|[^\s>]+))?(?=[\s/>])", re.I)
+    tag = pattern.sub("", tag)
+    if value is None:
+        return tag
+    end = len(tag) - (2 if tag.endswith("/>") else 1)
+    return f"{tag[:end].rstrip()} {name}=\"{html.escape(value, quote=True)}\"{tag[end:]}"
+
+
+def get_attribute(tag: str, name: str) -> Optional[str]:
+    match = re.search(rf"\s{name}\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+))", tag, re.I)
+    if not match:
+        return None
+    return html.unescape(next(group for group in match.groups() if group is not None))
+
+
+def section_images(images: Optional[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    by_section: Dict[str, List[Dict[str, Any]]] = {}
+    for section, value in (images or {}).items():
+        if isinstance(value, dict):
+            by_section[section] = [value]
+        elif isinstance(value, list):
+            by_section[section] = [entry for entry in value if isinstance(entry, dict)]
+    return by_section
+
+
+def design_tokens(files: Dict[str, str]) -> Dict[str, str]:
+    """Custom properties declared on :root by the stylesheets among files, in declaration order."""
+    tokens = {}
+    for path, content in files.items():
+        if not path.endswith(".css") or not isinstance(content, str):
+            continue
+        for prelude, body in parse_css(minify_css(content)):
+            if isinstance(body, str) and ":root" in split_selectors(prelude):
+                for name, value in re.findall(r"(--[\w-]+)\s*:\s*([^;]+)", body):
+                    tokens[name] = value.strip()
+    return tokens
+
+
+class PageAssembler:
+    """Builds the final index.html from the page shell and the section partials.
+
+    Partials are inserted into <main> in section order. Stylesheets are split into the rules
+    that can apply to the header and first section, which are inlined in <head>, and the rest,
+    which is loaded without blocking rendering. Images get loading and fetchpriority from the
+    asset metadata, local srcset variants when they were downloaded, and the first eager image
+    is preloaded.
+    """
+
+    def __init__(self, sections: List[str], images: Optional[Dict[str, Any]] = None):
+        self.sections = sections
+        self.images = images
+        self.stats = {"sections": 0, "critical_bytes": 0, "deferred_stylesheets": 0, "images": 0}
+
+    def partials(self, files: Dict[str, str]) -> List[Tuple[str, str]]:
+        """(section, markup) for every component partial, known sections first."""
+        components = {posixpath.splitext(posixpath.basename(path))[0]: content for path, content in files.items()
+                      if path.startswith("components/") and path.endswith(".html") and isinstance(content, str)}
+        order = [s for s in self.sections if s in components]
+        order += sorted(s for s in components if s not in self.sections)
+        return [(section, components[section]) for section in order]
+
+    def stylesheets(self, page: str, files: Dict[str, str], sections: List[str]) -> List[str]:
+        """Site paths of the stylesheets the page needs: those it links, then those of its sections."""
+        linked = []
+        for tag in re.findall(r"<link\b[^>]*>", page, re.I):
+            rel = (get_attribute(tag, "rel") or "").lower()
+            path = resolve("index.html", get_attribute(tag, "href") or "")
+            if rel == "stylesheet" and path in files:
+                linked.append(path)
+        for section in sections:
+            path = f"styles/components/{section}.css"
+            if path in files and path not in linked:
+                linked.append(path)
+        return linked
+
+    def insert_sections(self, page: str, partials: List[Tuple[str, str]]) -> Tuple[str, List[Tuple[str, str]]]:
+        # Partials already in the shell (an agent may have inlined some) are not added twice
+        existing = set(re.findall(r"\sid\s*=\s*[\"']([^\"']+)[\"']", page))
+        added = [(section, markup) for section, markup in partials if section not in existing]
+        markup = "\n".join(f"  {partial.strip()}" for _, partial in added)
+        main = re.search(r"(<main\b[^>]*>)(.*?)(</main\s*>)", page, re.S | re.I)
+        if main:
+            inner = main.group(2).rstrip()
+            page = page[:main.start()] + main.group(1) + inner + "\n" + markup + "\n  " + main.group(3) + page[main.end():]
+        else:
+            close = re.search(r"</body\s*>", page, re.I)
+            position = close.start() if close else len(page)
+            page = f'{page[:position]}  <main id="main">\n{markup}\n  </main>\n{page[position:]}'
+        return page, added
+
+    def above_the_fold(self, page: str, added: List[Tuple[str, str]]) -> str:
+        """Markup visible on first paint: everything before <main> plus the first section."""
+        body = re.search(r"<body\b[^>]*>(.*)", page, re.S | re.I)
+        before_main = re.split(r"<main\b", body.group(1) if body else page, 1, flags=re.I)[0]
+        first = added[0][1] if added else ""
+        return f"<html><body><main>{before_main}{first}"
+
+    def inline_critical_css(self, page: str, files: Dict[str, str], stylesheets: List[str], fold: str) -> str:
+        tokens = html_tokens(fold)
+        critical_parts = []
+        for path in stylesheets:
+            critical, rest = split_critical(files[path], tokens)
+            critical_parts.append(critical)
+            href = posixpath.relpath(path, ".")
+            links = re.compile(rf"<link\b[^>]*href\s*=\s*[\"']?(?:\./)?{re.escape(href)}[\"']?[^>]*>\s*", re.I)
+            page = links.sub("", page)
+            if rest:
+                # Loaded without blocking rendering; applied as soon as it arrives
+                deferred = (f'<link rel="preload" href="{href}" as="style" '
+                            f"onload=\"this.onload=null;this.rel='stylesheet'\">"
+                            f'<noscript><link rel="stylesheet" href="{href}"></noscript>')
+                page = self.insert_in_head(page, deferred)
+                self.stats["deferred_stylesheets"] += 1
+        critical_css = "".join(critical_parts)
+        if critical_css:
+            page = self.insert_in_head(page, f"<style>{critical_css}</style>", first=True)
+        self.stats["critical_bytes"] = len(critical_css.encode("utf-8"))
+        return page
+
+    @staticmethod
+    def insert_in_head(page: str, markup: str, first: bool = False) -> str:
+        if first:
+            # Right after the charset and viewport declarations, before anything that could block
+            anchors = list(re.finditer(r"<meta\b[^>]*(charset|viewport)[^>]*>", page, re.I))
+            if anchors:
+                position = anchors[-1].end()
+                return f"{page[:position]}\n  {markup}{page[position:]}"
+        close = re.search(r"</head\s*>", page, re.I)
+        if not close:
+            return markup + page
+        return f"{page[:close.start()]}  {markup}\n{page[close.start():]}"
+
+    def apply_image_hints(self, page: str, added: List[Tuple[str, str]]) -> str:
+        if not re.search(r"<img\b", page, re.I):
+            return page
+        by_url = {}
+        for _, entry in iter_images(self.images or {}):
+            if entry.get("url"):
+                by_url[normalize_url(entry["url"])] = entry
+        by_section = section_images(self.images)
+        preload = None
+        first_section = added[0][0] if added else None
+
+        # Images are visited per section so unmatched ones can fall back to their section's metadata
+        spans = [(m.start(), m.end(), m.group(2)) for m in
+                 re.finditer(r"<section\b[^>]*\sid\s*=\s*([\"'])([^\"']+)\1[^>]*>", page, re.I)]
+
+        def section_at(position):
+            current = None
+            for start, _, section in spans:
+                if start > position:
+                    break
+                current = section
+            return current
+
+        used: Dict[str, int] = {}
+
+        def rewrite(match):
+            nonlocal preload
+            tag = match.group(0)
+            src = get_attribute(tag, "src") or ""
+            section = section_at(match.start())
+            entry = by_url.get(normalize_url(src)) if src.startswith(("http://", "https://")) else None
+            if entry is None and section in by_section:
+                # The URL may have been swapped for an alternative; fall back to position in the section
+                index = used.get(section, 0)
+                if index < len(by_section[section]):
+                    entry = by_section[section][index]
+            if section is not None:
+                used[section] = used.get(section, 0) + 1
+
+            above_fold = section == first_section or (section is None and (not spans or match.start() < spans[0][0]))
+            loading = (entry or {}).get("loading") or ("eager" if above_fold else "lazy")
+            if entry:
+                local = entry.get("src")
+                tag = set_attribute(tag, "src", local or entry.get("url") or src)
+                if entry.get("srcset"):
+                    tag = set_attribute(tag, "srcset", entry["srcset"])
+                    tag = set_attribute(tag, "sizes", get_attribute(tag, "sizes") or "100vw")
+                largest = (entry.get("variants") or [None])[-1]
+                if largest and not get_attribute(tag, "width"):
+                    # Intrinsic size lets the browser reserve space before the image arrives
+                    tag = set_attribute(tag, "width", str(largest["width"]))
+                    tag = set_attribute(tag, "height", str(largest["height"]))
+                if not get_attribute(tag, "alt") and entry.get("alt"):
+                    tag = set_attribute(tag, "alt", entry["alt"])
+            if loading == "eager":
+                tag = set_attribute(tag, "loading", None)
+                if preload is None:
+                    tag = set_attribute(tag, "fetchpriority", "high")
+                    preload = tag
+            else:
+                tag = set_attribute(tag, "loading", "lazy")
+                tag = set_attribute(tag, "decoding", "async")
+                tag = set_attribute(tag, "fetchpriority", None)
+            self.stats["images"] += 1
+            return tag
+
+        page = re.sub(r"<img\b[^>]*>", rewrite, page, flags=re.I)
+        if preload is not None:
+            # Start the LCP image download while the parser is still in <head>
+            link = f'<link rel="preload" as="image" href="{html.escape(get_attribute(preload, "src") or "")}"'
+            if get_attribute(preload, "srcset"):
+                link += (f' imagesrcset="{html.escape(get_attribute(preload, "srcset"))}"'
+                         f' imagesizes="{html.escape(get_attribute(preload, "sizes") or "100vw")}"')
+            page = self.insert_in_head(page, link + ' fetchpriority="high">')
+        return page
+
+    def assemble(self, files: Dict[str, str], title: str = "") -> str:
+        """Return the assembled index.html for a site given as path -> content."""
+        self.stats = {"sections": 0, "critical_bytes": 0, "deferred_stylesheets": 0, "images": 0}
+        page = files.get("index.html") or DEFAULT_INDEX.format(title=html.escape(title))
+        page, added = self.insert_sections(page, self.partials(files))
+        self.stats["sections"] = len(added)
+        stylesheets = self.stylesheets(page, files, [section for section, _ in added])
+        page = self.inline_critical_css(page, files, stylesheets, self.above_the_fold(page, added))
+        return self.apply_image_hints(page, added)
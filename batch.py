@@ -0,0 +1,170 @@
+import os
+import csv
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+from crew import LandingPageCrew
+from job_store import JobStore
+from site_writer import STATE_DIR_NAME
+
+
+def load_manifest(path: str) -> List[Dict[str, str]]:
+    """Load (website_name, niche_description) jobs from a JSONL or CSV manifest."""
+    jobs = []
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    for line_no, row in enumerate(rows, start=1):
+        name = (row.get("website_name") or "").strip()
+        niche = (row.get("niche_description") or "").strip()
+        if not name or not niche:
+            raise ValueError(f"{path}: job {line_no} needs website_name and niche_description")
+        jobs.append({"website_name": name, "niche_description": niche})
+    return jobs
+
+
+def run_job(job: Dict[str, str], output_root: str = "", resume: bool = False) -> Dict:
+    """Run a single generation in its own crew and summarize the outcome.
+
+    With resume, the latest checkpointed job for the same site is continued instead, so only
+    the stages it had not completed are generated.
+    """
+    started = time.perf_counter()
+    result = {
+        "website_name": job["website_name"],
+        "niche_description": job["niche_description"],
+        "status": "failed",
+        "error": None,
+        "output_dir": None,
+        "files": {},
+        "generated_code": None,
+        "usage": None,
+    }
+    try:
+        store = JobStore.from_env(os.path.join(os.path.abspath(output_root), STATE_DIR_NAME)) if resume else None
+        previous = store.latest_job(job["website_name"], job["niche_description"]) if store else None
+        if previous:
+            crew = LandingPageCrew.from_job(previous["id"], output_root=output_root)
+            result["resumed"] = True
+            output = crew.resume()
+        else:
+            crew = LandingPageCrew(job["website_name"], job["niche_description"], output_root=output_root)
+            output = crew.run()
+        result["job_id"] = crew.job_id
+        if crew.usage_report:
+            result["usage"] = crew.usage_report["total"]
+        if output:
+            generated_code = output.get("generated_code", {})
+            result["status"] = "succeeded"
+            result["output_dir"] = output.get("output_dir")
+            result["generated_code"] = generated_code
+            result["files"] = {k: len(v) for k, v in generated_code.items() if isinstance(v, dict)}
+        else:
+            result["error"] = "generation returned no output"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc()
+    result["duration"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+class BatchRunner:
+    def __init__(self, jobs: List[Dict[str, str]], workers: int = 4, mode: str = "thread", output_root: str = "",
+                 resume: bool = False):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown batch mode: {mode}")
+        self.jobs = jobs
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.output_root = output_root
+        self.resume = resume
+        self.results = []
+
+    def run(self) -> Dict:
+        """Run every job on a bounded worker pool and return a throughput report."""
+        print(f"\nStarting batch of {len(self.jobs)} sites ({self.workers} {self.mode} workers)")
+        started = time.perf_counter()
+
+        # Output directories are derived from the website name, so duplicates would clobber each other
+        seen = set()
+        runnable = []
+        for job in self.jobs:
+            key = job["website_name"].lower()
+            if key in seen:
+                self.results.append({**job, "status": "failed", "error": "duplicate website_name in manifest", "duration": 0.0})
+                print(f"⚠ Skipped duplicate job: {job['website_name']}")
+                continue
+            seen.add(key)
+            runnable.append(job)
+
+        pool_cls = ThreadPoolExecutor if self.mode == "thread" else ProcessPoolExecutor
+        with pool_cls(max_workers=self.workers) as pool:
+            futures = {pool.submit(run_job, job, self.output_root, self.resume): job for job in runnable}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Only reachable when a worker process dies outright
+                    result = {**job, "status": "failed", "error": f"{type(e).__name__}: {e}", "duration": 0.0}
+                self.results.append(result)
+                if result["status"] == "succeeded":
+                    print(f"✓ {result['website_name']} generated in {result['duration']:.1f}s")
+                else:
+                    print(f"⚠ {result['website_name']} failed: {result['error']}")
+
+        elapsed = time.perf_counter() - started
+        succeeded = sum(1 for r in self.results if r["status"] == "succeeded")
+        usages = [r["usage"] for r in self.results if r.get("usage")]
+        report = {
+            "jobs": len(self.jobs),
+            "succeeded": succeeded,
+            "failed": len(self.jobs) - succeeded,
+            "workers": self.workers,
+            "mode": self.mode,
+            "elapsed_seconds": round(elapsed, 3),
+            "sites_per_minute": round(succeeded / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            "total_tokens": sum(u["total_tokens"] for u in usages),
+            "total_cost": round(sum(u["cost"] for u in usages), 6),
+            "results": [{k: v for k, v in r.items() if k != "generated_code"} for r in self.results],
+        }
+
+        print("\nBatch summary:")
+        print(f"  Succeeded: {succeeded}/{len(self.jobs)}")
+        print(f"  Elapsed: {elapsed:.1f}s")
+        print(f"  Throughput: {report['sites_per_minute']} sites/minute")
+        print(f"  LLM usage: {report['total_tokens']} tokens, ${report['total_cost']:.4f}")
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate many landing pages from a JSONL or CSV manifest.")
+    parser.add_argument("manifest", help="JSONL or CSV file with website_name and niche_description columns")
+    parser.add_argument("--workers", type=int, default=4, help="Number of concurrent generations")
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread", help="Worker pool type")
+    parser.add_argument("--output-root", default="", help="Directory that receives the <name>_generated folders")
+    parser.add_argument("--report", default="batch_report.json", help="Where to write the per-job report")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue each site's latest checkpointed job, skipping the stages it completed")
+    args = parser.parse_args()
+
+    if args.output_root:
+        os.makedirs(args.output_root, exist_ok=True)
+
+    runner = BatchRunner(load_manifest(args.manifest), workers=args.workers, mode=args.mode, output_root=args.output_root,
+                         resume=args.resume)
+    report = runner.run()
+    with open(args.report, "w", encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"  Report: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Benchmarks for the Python-side hot paths of LandingPageCrew.
+
+Covers extract_json_from_string, validate_image_url, store_generated_content for every
+task type, validate_files and write_output_to_files, on synthetic task outputs from 1 KB /
+5 files up to 1 MB / 500 files. Run from the repository root:
+
+    python benchmarks/bench_crew.py              # print results
+    python benchmarks/bench_crew.py --save       # record benchmarks/baseline.json
+    python benchmarks/bench_crew.py --compare    # fail if any case regressed past --threshold
+"""
+import os
+import sys
+import json
+import shutil
+import timeit
+import argparse
+import platform
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The crew reads its endpoint from the environment; nothing here talks to it
+os.environ.setdefault("OPENROUTER_API_KEY", "benchmark")
+os.environ.setdefault("LLM_CACHE_MODE", "off")
+# write_output_to_files also builds dist/ now; the baseline measures writing the site alone
+os.environ.setdefault("BUILD_DIST", "0")
+
+from crew import LandingPageCrew  # noqa: E402
+from validators import validate_files  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# (label, number of files, approximate output size in bytes)
+SIZES = [
+    ("1kb-5f", 5, 1_000),
+    ("50kb-50f", 50, 50_000),
+    ("1mb-500f", 500, 1_000_000),
+]
+
+HTML_SNIPPET = ('<section class="block" aria-labelledby="block-title"><h2 id="block-title">Ship faster</h2>'
+                '<p>Track activation and revenue in one place.</p></section>\n')
+CSS_SNIPPET = '.block { padding: clamp(2rem, 5vw, 4rem); display: grid; gap: 1rem; color: var(--ink); }\n'
+JS_SNIPPET = ("export function init(root) {\n  if (!root) return;\n"
+              "  root.addEventListener('click', (event) => event.target.classList.toggle('is-open'));\n}\n")
+
+
+def fill(snippet, size):
+    # Whole snippets only, so every synthetic file is syntactically valid
+    return snippet * max(1, round(size / len(snippet)))
+
+
+def wrap(files):
+    """Wrap a JSON payload the way agents answer: prose, a fenced block, more prose."""
+    return ("Thought: I now can give a great answer\nFinal Answer: ```json\n"
+            + json.dumps(files, indent=2) + "\n```\nAll files follow the BEM naming convention.")
+
+
+def setup_output(count, size):
+    per_file = size // count
+    files = {}
+    for i in range(count):
+        kind = ("html", "css", "js")[i % 3]
+        snippet = {"html": HTML_SNIPPET, "css": CSS_SNIPPET, "js": JS_SNIPPET}[kind]
+        name = {"html": f"page{i}.html", "css": f"styles/base{i}.css", "js": f"js/boot{i}.js"}[kind]
+        files[name] = fill(snippet, per_file)
+    return wrap({"directory_structure": files})
+
+
+def image(i):
+    return {
+        "url": f"https://images.unsplash.com/photo-{1500000000000 + i}-abcdef",
+        "thumbnail": f"https://images.unsplash.com/photo-{1500000000000 + i}-abcdef?w=400",
+        "attribution": f"Photographer {i} on Unsplash",
+        "license": "Unsplash License",
+        "alt": f"Product screenshot number {i}",
+        "sizes": {"desktop": {"width": 1920, "height": 1080, "format": "webp"}},
+        "loading": "lazy",
+    }
+
+
+def assets_output(count, size):
+    # Image metadata is small, so asset outputs scale with the number of images only
+    images = {"hero": image(0), "features": [], "testimonials": []}
+    for i in range(1, count):
+        images["features" if i % 2 else "testimonials"].append(image(i))
+    return wrap({"images": images})
+
+
+def components_output(count, size):
+    per_file = size // count
+    files = {}
+    for i in range(count):
+        if i % 2:
+            files[f"styles/components/section{i}.css"] = fill(CSS_SNIPPET, per_file)
+        else:
+            files[f"components/section{i}.html"] = fill(HTML_SNIPPET, per_file)
+    return wrap(files)
+
+
+def js_output(count, size):
+    per_file = size // count
+    return wrap({f"js/modules/module{i}.js": fill(JS_SNIPPET, per_file) for i in range(count)})
+
+
+OUTPUTS = {
+    "setup": setup_output,
+    "assets": assets_output,
+    "components": components_output,
+    "js_modules": js_output,
+}
+
+IMAGE_URLS = [
+    "https://images.unsplash.com/photo-1551288049-bebda4e38f71",
+    "https://images.pexels.com/photos/3184291/pexels-photo.jpeg",
+    "https://pixabay.com/get/g1a2b3c-analytics",
+    "https://source.unsplash.com/random-team",
+    "https://example.com/placeholder.jpg",
+    "https://images.unsplash.com/photo-...",
+    "https://cdn.example.org/hero.webp",
+    "",
+]
+
+
+def make_crew(output_dir):
+    crew = LandingPageCrew("Bench", "A SaaS platform for benchmarking")
+    crew.output_dir = output_dir
+    return crew
+
+
+def measure(fn, repeat=5):
+    """Best per-call time in milliseconds, with the call count picked by timeit.autorange."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1000
+
+
+def run_benchmarks():
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="bench_crew_")
+    crew = make_crew(os.path.join(workdir, "site"))
+    try:
+        # The crew reports progress with print; keep it off the terminal but still pay for it
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results["validate_image_url"] = measure(lambda: [crew.validate_image_url(url) for url in IMAGE_URLS])
+
+            outputs = {label: {task: make(count, size) for task, make in OUTPUTS.items()}
+                       for label, count, size in SIZES}
+
+            for label, _, _ in SIZES:
+                text = outputs[label]["components"]
+                results[f"extract_json_from_string/{label}"] = measure(lambda: crew.extract_json_from_string(text))
+
+            for label, _, _ in SIZES:
+                for task, text in outputs[label].items():
+                    results[f"store_generated_content/{task}/{label}"] = measure(
+                        lambda: crew.store_generated_content(text, task))
+
+            for label, _, _ in SIZES:
+                crew.generated_code = {}
+                for task, text in outputs[label].items():
+                    crew.store_generated_content(text, task)
+                output = {"generated_code": dict(crew.generated_code)}
+                sources = {**crew.generated_code["html_components"], **crew.generated_code["css_components"],
+                           **crew.generated_code["js_modules"]}
+                results[f"validate_files/{label}"] = measure(lambda: validate_files(sources), repeat=3)
+                results[f"write_output_to_files/{label}"] = measure(
+                    lambda: crew.write_output_to_files(output), repeat=3)
+                shutil.rmtree(crew.output_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print each case against the baseline and return the names of regressed cases."""
+    regressions = []
+    for name, ms in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<48} {ms:>10.3f} ms  (new)")
+            continue
+        ratio = ms / base
+        flag = ""
+        if ratio > threshold:
+            flag = "  ⚠ REGRESSION"
+            regressions.append(name)
+        print(f"{name:<48} {ms:>10.3f} ms  baseline {base:>10.3f} ms  {ratio:>5.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LandingPageCrew parsing, validation and write paths.")
+    parser.add_argument("--save", action="store_true", help=f"Write results to {os.path.relpath(BASELINE_PATH)}")
+    parser.add_argument("--compare", action="store_true", help="Compare against the stored baseline")
+    parser.add_argument("--threshold", type=float, default=1.5,
+                        help="Slowdown ratio that counts as a regression (default: 1.5)")
+    args = parser.parse_args()
+
+    results = run_benchmarks()
+
+    if args.compare:
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n⚠ {len(regressions)} case(s) slower than {args.threshold}x baseline")
+            sys.exit(1)
+        print("\n✓ No regressions against baseline")
+    else:
+        for name, ms in results.items():
+            print(f"{name:<48} {ms:>10.3f} ms")
+
+    if args.save:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "results": results},
+                      f, indent=2)
+        print(f"\n✓ Baseline written to {BASELINE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
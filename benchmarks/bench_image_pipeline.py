@@ -0,0 +1,68 @@
+"""Throughput of the image download and variant pipeline against the local fixture server.
+
+Serves deterministic images from stub_server.py with a configurable per-request latency and
+runs ImagePipeline over synthetic asset metadata at several concurrency limits. Requires
+Pillow. Run from the repository root:
+
+    python benchmarks/bench_image_pipeline.py --images 48 --latency fixed:0.2
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_index import ImageIndex  # noqa: E402
+from image_pipeline import ImagePipeline  # noqa: E402
+from stub_server import StubServerThread  # noqa: E402
+
+SIZES = {
+    "desktop": {"width": 1920, "height": 1080, "format": "webp"},
+    "tablet": {"width": 1024, "height": 768, "format": "webp"},
+    "mobile": {"width": 640, "height": 480, "format": "webp"},
+}
+
+
+def make_assets(count):
+    return {"gallery": [{"url": f"https://images.unsplash.com/photo-{1500000000000 + i}", "alt": f"Photo {i}",
+                         "sizes": SIZES, "loading": "lazy"} for i in range(count)]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ImagePipeline throughput by concurrency limit.")
+    parser.add_argument("--images", type=int, default=48)
+    parser.add_argument("--latency", default="fixed:0.2", help="Fixture server latency per image request")
+    parser.add_argument("--image-size", default="1600x1000")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    if not ImagePipeline.available():
+        sys.exit("Pillow is required: pip install -r requirements.txt")
+
+    server = StubServerThread(port=args.port, image_latency=args.latency, image_size=args.image_size).start()
+    try:
+        mirror = [("https://images.unsplash.com/", f"http://127.0.0.1:{args.port}/images/")]
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            with tempfile.TemporaryDirectory() as index_dir:
+                # A fresh index per run, so every image is really downloaded and rendered
+                pipeline = ImagePipeline(ImageIndex(index_dir), concurrency=concurrency, mirrors=mirror)
+                started = time.perf_counter()
+                files = pipeline.run(make_assets(args.images))
+                elapsed = time.perf_counter() - started
+                print(f"concurrency {concurrency:>3}: {args.images} images, {len(files)} variants in {elapsed:6.2f}s "
+                      f"({args.images / elapsed:6.1f} images/s, {pipeline.stats['bytes_out'] // 1024} KB out)")
+
+                # The same assets again are served entirely from the index
+                started = time.perf_counter()
+                pipeline.run(make_assets(args.images))
+                print(f"{'':>16}  warm index: {time.perf_counter() - started:6.2f}s, "
+                      f"{pipeline.stats['downloaded']} downloads, {pipeline.stats['variants']} renders")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
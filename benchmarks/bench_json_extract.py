@@ -0,0 +1,93 @@
+"""Micro-benchmark: legacy regex JSON extraction vs the single-pass scanner in json_extract.
+
+Run from the repository root:
+
+    python benchmarks/bench_json_extract.py
+"""
+import os
+import re
+import sys
+import json
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_extract import extract_json  # noqa: E402
+
+
+def legacy_extract(s):
+    """The extraction steps of LandingPageCrew.extract_json_from_string before the scanner."""
+    match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', s, re.DOTALL | re.IGNORECASE)
+    if match:
+        json_str = match.group(1)
+    else:
+        start = s.find('{')
+        end = s.rfind('}')
+        if start == -1 or end == -1 or start >= end:
+            return None
+        json_str = s[start:end + 1]
+    try:
+        return json.loads(json_str)
+    except json.JSONDecodeError:
+        try:
+            cleaned = re.sub(r'(?<!\\)\\(?!["\\/bfnrtu])', '\\\\', json_str)
+            # This look-behind is not fixed-width, so re raises and the old code fell through to None
+            cleaned = re.sub(r'(?<=":\s*")([^"\\]|\\.)*(?<!\\)\n', '\\n', cleaned)
+            return json.loads(cleaned)
+        except (re.error, json.JSONDecodeError):
+            return None
+
+
+SECTION_HTML = '''<section class="{name}" aria-labelledby="{name}-title">
+  <div class="{name}__inner container">
+    <h2 id="{name}-title" class="{name}__title">Built for teams that ship</h2>
+    <p class="{name}__lead">Track activation, retention and revenue in one dashboard.</p>
+    <ul class="{name}__list">
+      <li class="{name}__item"><img src="images/{name}-1.webp" alt="Revenue chart" loading="lazy"></li>
+      <li class="{name}__item"><img src="images/{name}-2.webp" alt="Cohort table" loading="lazy"></li>
+    </ul>
+    <a class="button button--primary" href="#contact">Start free trial</a>
+  </div>
+</section>
+'''
+
+SECTION_CSS = '''.{name} {{ padding: clamp(3rem, 6vw, 6rem) 1.5rem; background: var(--surface); }}
+.{name}__title {{ font-size: var(--step-3); line-height: 1.1; color: var(--ink); }}
+.{name}__list {{ display: grid; gap: 1.5rem; grid-template-columns: repeat(auto-fit, minmax(16rem, 1fr)); }}
+@media (min-width: 48rem) {{ .{name}__inner {{ display: grid; grid-template-columns: 1fr 1fr; }} }}
+'''
+
+
+def make_component_output(target_bytes, raw_newlines=False, fenced=True):
+    """Build an agent-style component response of roughly target_bytes."""
+    files = {}
+    i = 0
+    while len(json.dumps(files)) < target_bytes:
+        name = f"section{i}"
+        files[f"components/{name}.html"] = SECTION_HTML.format(name=name) * 3
+        files[f"styles/components/{name}.css"] = SECTION_CSS.format(name=name) * 3
+        i += 1
+    body = json.dumps(files, indent=2)
+    if raw_newlines:
+        # Models often emit literal newlines inside JSON strings
+        body = body.replace("\\n", "\n")
+    prose = "Thought: I will wrap each section in {section} blocks and keep the {BEM} naming.\nFinal Answer: "
+    if fenced:
+        return prose + "```json\n" + body + "\n```\nAll components follow the {block}__{element} convention."
+    return prose + body + "\nAll components follow the {block}__{element} convention."
+
+
+def bench(label, text, number):
+    legacy = timeit.timeit(lambda: legacy_extract(text), number=number) / number
+    scanner = timeit.timeit(lambda: extract_json(text), number=number) / number
+    legacy_ok = legacy_extract(text) is not None
+    scanner_ok = extract_json(text) is not None
+    print(f"{label:<28} {len(text) / 1024:>7.1f} KB  legacy {legacy * 1000:>8.2f} ms ({'ok' if legacy_ok else 'FAIL'})"
+          f"  scanner {scanner * 1000:>7.2f} ms ({'ok' if scanner_ok else 'FAIL'})  {legacy / scanner:>5.1f}x")
+
+
+if __name__ == "__main__":
+    for size in (10_000, 50_000, 100_000):
+        bench(f"valid JSON, {size // 1000} KB", make_component_output(size), 50)
+        bench(f"raw newlines, {size // 1000} KB", make_component_output(size, raw_newlines=True), 20)
+        bench(f"unfenced + prose, {size // 1000} KB", make_component_output(size, fenced=False), 50)
@@ -0,0 +1,85 @@
+"""Connection reuse and per-call overhead of LLM clients built per crew versus shared per process.
+
+Simulates a batch: many short-lived crews, several running at a time, each building its
+ChatOpenAI and making a few calls against the local stub server. In `per-crew` mode every crew
+gets a client pool of its own, as before the shared pools; in `shared` mode they all draw from
+one ClientPool. Run from the repository root:
+
+    python benchmarks/bench_llm_clients.py --crews 60 --parallel 6 --calls 4
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+
+from langchain_openai import ChatOpenAI  # noqa: E402
+
+from llm_clients import ClientPool  # noqa: E402
+from stub_server import StubServerThread  # noqa: E402
+
+
+def run(mode, args, base_url):
+    pools = []
+    latencies = []
+
+    def crew(_):
+        if mode == "shared":
+            pool = ClientPool.shared(base_url, "stub")
+        else:
+            pool = ClientPool(base_url, "stub")
+            pools.append(pool)
+        llm = ChatOpenAI(model_name="gpt-3.5-turbo", openai_api_base=base_url, openai_api_key="stub", cache=False,
+                         **pool.chat_openai_clients())
+        for _ in range(args.calls):
+            started = time.perf_counter()
+            llm.invoke("Write a one-line tagline for a landing page.")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        list(executor.map(crew, range(args.crews)))
+    wall = time.perf_counter() - started
+    if mode == "shared":
+        pools = [ClientPool.shared(base_url, "stub")]
+    snapshots = [pool.snapshot() for pool in pools]
+    latencies.sort()
+    return {
+        "mode": mode,
+        "calls": len(latencies),
+        "connections": sum(s["connections_opened"] for s in snapshots),
+        "wall": wall,
+        "median_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-crew and shared LLM client pools.")
+    parser.add_argument("--crews", type=int, default=60)
+    parser.add_argument("--parallel", type=int, default=6, help="Crews running at a time")
+    parser.add_argument("--calls", type=int, default=4, help="LLM calls per crew")
+    parser.add_argument("--latency", default="fixed:0.02", help="Stub time per call")
+    parser.add_argument("--port", type=int, default=8095)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_RATE_LIMIT", "off")
+    stub = StubServerThread(port=args.port, latency=args.latency, seed=0).start()
+    try:
+        rows = [run(mode, args, stub.base_url) for mode in ("per-crew", "shared")]
+    finally:
+        stub.stop()
+
+    print(f"{args.crews} crews x {args.calls} calls, {args.parallel} at a time, stub latency {args.latency}")
+    print(f"{'mode':<10}{'calls':>7}{'connections':>13}{'wall s':>9}{'median ms':>11}{'p95 ms':>9}")
+    for row in rows:
+        print(f"{row['mode']:<10}{row['calls']:>7}{row['connections']:>13}{row['wall']:>9.2f}"
+              f"{row['median_ms']:>11.1f}{row['p95_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Sustained throughput of LLM calls against a capacity-limited endpoint, with and without the
+client-side rate limiter.
+
+Runs several processes, each with several threads making chat completion calls the way the
+crews do, against the local stub server configured to answer 429 above a number of requests
+in flight. Without the governor the callers retry on their own and storm the endpoint; with
+it they share one concurrency limit through the host-wide state file. Run from the
+repository root:
+
+    python benchmarks/bench_rate_limit.py --processes 3 --threads 6 --calls 10 --capacity 6
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+
+from stub_server import StubServerThread  # noqa: E402
+
+
+def worker(base_url, governed, state_path, threads, calls, results):
+    # Imported in the child so every process builds its own governor from the environment
+    os.environ["LLM_RATE_LIMIT"] = "on" if governed else "off"
+    os.environ["LLM_RATE_STATE"] = state_path
+    from langchain_openai import ChatOpenAI
+    from rate_limiter import RateLimiter
+    from llm_clients import ClientPool
+
+    limiter = RateLimiter.from_env(base_url)
+    pool = ClientPool.shared(base_url, "stub", limiter=limiter)
+    llm = ChatOpenAI(model_name="gpt-3.5-turbo", openai_api_base=base_url, openai_api_key="stub", cache=False,
+                     **pool.chat_openai_clients())
+
+    errors = []
+
+    def call(_):
+        try:
+            llm.invoke("Write a one-line tagline for a landing page.")
+            return True
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}"[:200])
+            return False
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(call, range(threads * calls)))
+    results.put({"ok": sum(outcomes), "failed": len(outcomes) - sum(outcomes),
+                 "limit": limiter.snapshot()["limit"] if limiter else None,
+                 "errors": errors[:3]})
+
+
+def run(mode, args, stub):
+    governed = mode == "governed"
+    state_path = os.path.join(tempfile.mkdtemp(), "ratelimit.json")
+    before = dict(stub.stub.stats)
+    results = multiprocessing.Queue()
+    started = time.perf_counter()
+    processes = [multiprocessing.Process(target=worker, args=(stub.base_url, governed, state_path, args.threads,
+                                                              args.calls, results))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - started
+    ok = sum(o["ok"] for o in outcomes)
+    return {
+        "mode": mode,
+        "ok": ok,
+        "failed": sum(o["failed"] for o in outcomes),
+        "requests": stub.stub.stats["requests"] - before["requests"],
+        "429": stub.stub.stats["429"] - before["429"],
+        "wall": wall,
+        "throughput": ok / wall,
+        "limit": outcomes[0]["limit"],
+        "errors": [error for o in outcomes for error in o["errors"]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare LLM call throughput with and without the rate limiter.")
+    parser.add_argument("--processes", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=6, help="Concurrent callers per process")
+    parser.add_argument("--calls", type=int, default=10, help="Calls per caller")
+    parser.add_argument("--capacity", type=int, default=6, help="Requests in flight the stub accepts")
+    parser.add_argument("--latency", default="fixed:0.3", help="Stub time per call")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--modes", default="direct,governed")
+    parser.add_argument("--port", type=int, default=8096)
+    args = parser.parse_args()
+
+    stub = StubServerThread(port=args.port, latency=args.latency, max_concurrency=args.capacity,
+                            retry_after=args.retry_after, seed=0).start()
+    try:
+        rows = [run(mode, args, stub) for mode in args.modes.split(",")]
+    finally:
+        stub.stop()
+
+    print(f"{args.processes} processes x {args.threads} threads x {args.calls} calls, "
+          f"stub capacity {args.capacity} in flight, latency {args.latency}")
+    print(f"{'mode':<10}{'ok':>6}{'failed':>8}{'requests':>10}{'429s':>7}{'wall s':>9}{'calls/s':>9}{'limit':>7}")
+    for row in rows:
+        limit = f"{row['limit']:.1f}" if row["limit"] is not None else "-"
+        print(f"{row['mode']:<10}{row['ok']:>6}{row['failed']:>8}{row['requests']:>10}{row['429']:>7}"
+              f"{row['wall']:>9.2f}{row['throughput']:>9.2f}{limit:>7}")
+    for row in rows:
+        for error in sorted(set(row["errors"])):
+            print(f"  {row['mode']}: {error}")
+
+
+if __name__ == "__main__":
+    main()
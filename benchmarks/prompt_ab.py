@@ -0,0 +1,136 @@
+"""A/B comparison of the verbose and compact prompt profiles.
+
+Runs full generations with each profile, alternating between them so drift in the endpoint
+affects both alike, and reports how often each stage's output was accepted (on the first
+attempt and at all), tokens sent and received, and latency. By default it runs against the
+local stub server with a prefill rate, so prompt size shows up in time to first token; pass
+--base-url to compare the profiles against a real endpoint (OPENROUTER_API_KEY must be set).
+Run from the repository root:
+
+    python benchmarks/prompt_ab.py --runs 5
+    python benchmarks/prompt_ab.py --runs 10 --base-url https://openrouter.ai/api/v1 --json ab.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Only the LLM stages are compared; downloads and the production build would just add noise
+os.environ.setdefault("IMAGE_FETCH", "0")
+os.environ.setdefault("BUILD_DIST", "0")
+os.environ.setdefault("TASK_RETRY_BACKOFF", "0")
+
+from crew import LandingPageCrew  # noqa: E402
+from prompts import PROFILES  # noqa: E402
+from stub_server import StubServerThread  # noqa: E402
+
+STAGES = list(LandingPageCrew.TASK_DEPENDENCIES)
+
+
+def run_once(profile, website_name, niche_description, output_root, quiet=True):
+    crew = LandingPageCrew(website_name, niche_description, output_root=output_root, cache_mode="off",
+                           prompt_profile=profile)
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+        output = crew.run()
+    wall = time.perf_counter() - started
+    usage = crew.usage_report or {"total": {}, "stages": {}}
+    return {
+        "profile": profile,
+        "succeeded": output is not None,
+        "wall_seconds": wall,
+        "static_prompt_tokens": sum(crew.prompt_tokens.values()),
+        "prompt_tokens": usage["total"].get("prompt_tokens", 0),
+        "completion_tokens": usage["total"].get("completion_tokens", 0),
+        "calls": usage["total"].get("calls", 0),
+        "llm_seconds": usage["total"].get("llm_seconds", 0.0),
+        "stages": {stage: {"completed": crew.task_states[stage]["completed"],
+                           "retries": crew.task_states[stage]["retries"]} for stage in STAGES},
+    }
+
+
+def summarize(runs):
+    stages = [entry for run in runs for entry in run["stages"].values()]
+    walls = sorted(run["wall_seconds"] for run in runs)
+    calls = sum(run["calls"] for run in runs) or 1
+    return {
+        "runs": len(runs),
+        "succeeded": sum(run["succeeded"] for run in runs),
+        "first_attempt_acceptance": sum(e["completed"] and e["retries"] == 0 for e in stages) / len(stages),
+        "acceptance": sum(e["completed"] for e in stages) / len(stages),
+        "static_prompt_tokens": statistics.mean(run["static_prompt_tokens"] for run in runs),
+        "prompt_tokens": statistics.mean(run["prompt_tokens"] for run in runs),
+        "completion_tokens": statistics.mean(run["completion_tokens"] for run in runs),
+        "seconds_per_call": sum(run["llm_seconds"] for run in runs) / calls,
+        "wall_p50": statistics.median(walls),
+        "wall_max": walls[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare acceptance rate and latency of the prompt profiles.")
+    parser.add_argument("--runs", type=int, default=3, help="Generations per profile")
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--website-name", default="DataPulse")
+    parser.add_argument("--niche", default="analytics SaaS that helps product teams understand user behaviour")
+    parser.add_argument("--base-url", default=None, help="Endpoint to test against instead of the stub server")
+    parser.add_argument("--port", type=int, default=8097)
+    parser.add_argument("--latency", default="fixed:0.05", help="Stub time to first token before prefill")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=20000.0, help="Stub prefill rate")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Stub completion token rate")
+    parser.add_argument("--rate-malformed", type=float, default=0.0, help="Stub fraction of truncated completions")
+    parser.add_argument("--verbose", action="store_true", help="Show the crew's output")
+    parser.add_argument("--json", dest="json_path", help="Write every run and the summary to this file")
+    args = parser.parse_args()
+
+    profiles = args.profiles.split(",")
+    server = None
+    if args.base_url:
+        os.environ["OPENROUTER_BASE_URL"] = args.base_url
+    else:
+        server = StubServerThread(port=args.port, latency=args.latency, tokens_per_second=args.tokens_per_second,
+                                  prompt_tokens_per_second=args.prompt_tokens_per_second,
+                                  rate_malformed=args.rate_malformed, seed=0).start()
+        os.environ["OPENROUTER_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENROUTER_API_KEY", "stub")
+
+    runs = {profile: [] for profile in profiles}
+    try:
+        with tempfile.TemporaryDirectory() as output_root:
+            for n in range(args.runs):
+                for profile in profiles:
+                    run = run_once(profile, args.website_name, args.niche, output_root, quiet=not args.verbose)
+                    runs[profile].append(run)
+                    print(f"run {n + 1}/{args.runs} {profile:<8} {'ok    ' if run['succeeded'] else 'FAILED'} "
+                          f"{run['wall_seconds']:6.2f}s {run['prompt_tokens']:>7} prompt tokens")
+    finally:
+        if server:
+            server.stop()
+
+    summary = {profile: summarize(profile_runs) for profile, profile_runs in runs.items()}
+    print(f"\n{'profile':<10}{'ok':>6}{'1st try':>9}{'accept':>8}{'static':>8}{'prompt':>9}{'compl.':>8}"
+          f"{'s/call':>8}{'p50 s':>8}{'max s':>8}")
+    for profile, s in summary.items():
+        print(f"{profile:<10}{s['succeeded']:>3}/{s['runs']:<2}{s['first_attempt_acceptance']:>9.0%}"
+              f"{s['acceptance']:>8.0%}{s['static_prompt_tokens']:>8.0f}{s['prompt_tokens']:>9.0f}"
+              f"{s['completion_tokens']:>8.0f}{s['seconds_per_call']:>8.2f}{s['wall_p50']:>8.2f}{s['wall_max']:>8.2f}")
+    if len(profiles) == 2:
+        a, b = (summary[p] for p in profiles)
+        if a["prompt_tokens"] and a["wall_p50"]:
+            print(f"\n{profiles[1]} vs {profiles[0]}: {1 - b['prompt_tokens'] / a['prompt_tokens']:.0%} fewer prompt tokens, "
+                  f"{1 - b['wall_p50'] / a['wall_p50']:.0%} lower median latency, "
+                  f"{b['first_attempt_acceptance'] - a['first_attempt_acceptance']:+.0%} first-attempt acceptance")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
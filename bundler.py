@@ -0,0 +1,529 @@
+import os
+import re
+import sys
+import json
+import gzip
+import hashlib
+import argparse
+import posixpath
+from typing import Dict, List, Optional, Tuple, Union
+
+from site_writer import SiteWriter
+from validators import starts_regex
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; without it only .gz siblings are written
+    brotli = None
+
+# Files of the generated project that are documentation or bookkeeping, not part of the site
+EXCLUDED = {"SETUP.md", "usage_report.json"}
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg", ".txt", ".xml", ".md"}
+# Precompressing tiny files saves nothing once headers are counted
+MIN_COMPRESS_BYTES = 256
+ENTRY_POINT = "js/main.js"
+
+# Punctuation that needs no surrounding whitespace
+JS_TIGHT = set("{}()[];,:=!&|?")
+CSS_TIGHT = set("{};,>")
+JS_TYPES = {"module", "text/javascript", "application/javascript"}
+
+
+class BundleError(Exception):
+    """The module graph uses a feature the bundler does not rewrite."""
+
+
+def _scan_string(src: str, i: int) -> int:
+    """Index just past the string, template or regex literal starting at src[i]."""
+    quote, n = src[i], len(src)
+    i += 1
+    in_class = False
+    while i < n:
+        c = src[i]
+        if c == "\\":
+            i += 2
+            continue
+        if quote == "/":
+            if c == "[":
+                in_class = True
+            elif c == "]":
+                in_class = False
+            elif c == "/" and not in_class:
+                i += 1
+                while i < n and (src[i].isalnum() or src[i] == "_"):
+                    i += 1
+                return i
+            elif c == "\n":
+                return i
+        elif c == quote:
+            return i + 1
+        elif quote == "`" and src.startswith("${", i):
+            # Template substitutions may contain strings and templates of their own
+            depth, i = 1, i + 2
+            while i < n and depth:
+                if src[i] in "\"'`":
+                    i = _scan_string(src, i)
+                    continue
+                depth += {"{": 1, "}": -1}.get(src[i], 0)
+                i += 1
+            continue
+        elif c == "\n" and quote != "`":
+            return i
+        i += 1
+    return n
+
+
+def _squeeze(code: str, tight: set, keep_newlines: bool) -> str:
+    """Collapse whitespace in a run of code (no literals) and drop it next to punctuation."""
+    if keep_newlines:
+        code = re.sub(r"[ \t\f\r]*\n\s*", "\n", code)
+        code = re.sub(r"[ \t\f\r]+", " ", code)
+    else:
+        code = re.sub(r"\s+", " ", code)
+    out = []
+    for i, c in enumerate(code):
+        if c == " " and ((out and out[-1] in tight) or (i + 1 < len(code) and code[i + 1] in tight)):
+            continue
+        out.append(c)
+    return "".join(out)
+
+
+def minify_js(src: str) -> str:
+    """Remove comments and redundant whitespace from JavaScript.
+
+    Conservative by design: identifiers are never renamed and line breaks are kept, so
+    automatic semicolon insertion behaves exactly as in the source. "/*!" license comments
+    are preserved.
+    """
+    out: List[str] = []
+    i, n, start = 0, len(src), 0
+
+    def flush(end):
+        if end > start:
+            out.append(_squeeze(src[start:end], JS_TIGHT, keep_newlines=True))
+
+    while i < n:
+        c = src[i]
+        if c == "/" and src.startswith("//", i):
+            flush(i)
+            end = src.find("\n", i)
+            i = start = n if end == -1 else end
+        elif c == "/" and src.startswith("/*", i):
+            flush(i)
+            end = src.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            comment = src[i:end]
+            out.append(comment if comment.startswith("/*!") else "\n" if "\n" in comment else " ")
+            i = start = end
+        elif c in "\"'`" or (c == "/" and starts_regex((out[-1][-64:] if out else "") + src[max(start, i - 64):i])):
+            flush(i)
+            end = _scan_string(src, i)
+            out.append(src[i:end])
+            i = start = end
+        else:
+            i += 1
+    flush(n)
+    # Comments removed above can leave blank lines and stray spaces at line ends
+    return re.sub(r"[ \t]*\n[ \t\n]*", "\n", "".join(out)).strip() + "\n"
+
+
+def minify_css(src: str) -> str:
+    """Remove comments and redundant whitespace from a stylesheet.
+
+    Spaces before ":" are kept because "a :hover" and "a:hover" are different selectors,
+    and spaces around "+" and "-" because calc() needs them.
+    """
+    out: List[str] = []
+    i, n, start = 0, len(src), 0
+
+    def flush(end):
+        chunk = _squeeze(src[start:end], CSS_TIGHT, keep_newlines=False)
+        out.append(re.sub(r": ", ":", chunk).replace(";}", "}"))
+
+    while i < n:
+        c = src[i]
+        if c == "/" and src.startswith("/*", i):
+            flush(i)
+            end = src.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            if src.startswith("/*!", i):
+                out.append(src[i:end])
+            else:
+                out.append(" ")
+            i = start = end
+        elif c in "\"'":
+            flush(i)
+            end = _scan_string(src, i)
+            out.append(src[i:end])
+            i = start = end
+        else:
+            i += 1
+    flush(n)
+    return "".join(out).strip() + "\n"
+
+
+def minify_html(src: str) -> str:
+    """Remove comments and collapse whitespace between tags.
+
+    Tags themselves are left as written. Whitespace runs become a single space, or a single
+    newline when they contained one, so inline elements keep their separation. <pre> and
+    <textarea> are untouched; inline <script> and <style> are minified with their own minifier.
+    """
+    out = []
+    pos = 0
+    pattern = re.compile(r"<!--(?!\[if).*?-->|<(pre|textarea|script|style)\b([^>]*)>(.*?)</\1\s*>|<[^>]+>",
+                         re.S | re.I)
+    for match in pattern.finditer(src):
+        out.append(_collapse_text(src[pos:match.start()]))
+        pos = match.end()
+        token = match.group(0)
+        if token.startswith("<!--"):
+            continue
+        tag = (match.group(1) or "").lower()
+        script_type = re.search(r"type\s*=\s*[\"']?([^\"'\s>]+)", match.group(2) or "", re.I)
+        if tag == "script" and (not script_type or script_type.group(1).lower() in JS_TYPES):
+            body = minify_js(match.group(3)).strip() if match.group(3).strip() else ""
+            token = f"<{match.group(1)}{match.group(2)}>{body}</{match.group(1)}>"
+        elif tag == "style":
+            token = f"<{match.group(1)}{match.group(2)}>{minify_css(match.group(3)).strip()}</{match.group(1)}>"
+        out.append(token)
+    out.append(_collapse_text(src[pos:]))
+    return "".join(out).strip() + "\n"
+
+
+def _collapse_text(text: str) -> str:
+    return re.sub(r"\s+", lambda m: "\n" if "\n" in m.group(0) else " ", text)
+
+
+def content_hashed(path: str, content: bytes, length: int = 8) -> str:
+    """"styles/main.css" -> "styles/main.3f2a91c0.css"."""
+    root, ext = posixpath.splitext(path)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:length]}{ext}"
+
+
+def resolve(base: str, reference: str) -> Optional[str]:
+    """Site-relative path of a relative reference made from the file `base`, or None for
+    external, absolute, fragment and data references."""
+    if re.match(r"^([a-z][a-z0-9+.-]*:|//|#|/)", reference, re.I):
+        return None
+    path = re.split(r"[?#]", reference, 1)[0]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), path)) if path else None
+
+
+def relative(base: str, target: str) -> str:
+    return posixpath.relpath(target, posixpath.dirname(base) or ".")
+
+
+# Modules are minified before they are parsed, so "import{a}from'./a.js'" must match too
+IMPORT_RE = re.compile(r"^[ \t]*import(?=[\s{*\"'])\s*(?:([\w$*{][^;]*?)\s*from\s*)?([\"'])([^\"']+)\2[ \t]*;?", re.M)
+HTML_REFERENCE_RE = r"(\s(?:src|href)\s*=\s*[\"']?)([^\"'\s>]+)"
+EXPORT_RE = re.compile(
+    r"^[ \t]*export(?=[\s{*])\s*(?:"
+    r"(?P<default>default\b\s*(?:(?P<dkind>(?:async\s+)?function\*?|class)\s+(?P<dname>[\w$]+))?)"
+    r"|(?P<kind>(?:async\s+)?function\*?|class|const|let|var)\s+(?P<name>[\w$]+)"
+    r"|\{(?P<names>[^}]*)\}[ \t]*(?P<from>from\b)?[^;\n]*;?"
+    r"|(?P<star>\*)"
+    r"|(?P<other>\S))", re.M)
+
+
+def _more_declarators(src: str, i: int, path: str) -> List[str]:
+    """Names declared after the first by the const/let/var statement that continues at src[i]:
+    "export const A = 1, B = 2" exports B as well."""
+    names, depth, n = [], 0, len(src)
+    while i < n:
+        c = src[i]
+        if c in "\"'`" or (c == "/" and starts_regex(src[max(0, i - 64):i])):
+            i = _scan_string(src, i)
+            continue
+        if c in "([{":
+            depth += 1
+        elif c in ")]}":
+            if not depth:
+                break
+            depth -= 1
+        elif not depth and c == ";":
+            break
+        elif not depth and c == "\n":
+            # Minified code keeps line breaks, so a statement may only continue over one
+            # after a comma or before one
+            if not src[max(0, i - 1):i].endswith(",") and not src.startswith(",", i + 1):
+                break
+        elif not depth and c == ",":
+            declarator = re.match(r"\s*([A-Za-z_$][\w$]*)\s*(?=[=,;\n]|$)", src[i + 1:i + 256])
+            if not declarator:
+                raise BundleError(f"{path} exports a destructured declaration the bundler does not rewrite")
+            names.append(declarator.group(1))
+        i += 1
+    return names
+
+
+def bundle_modules(files: Dict[str, str], entry: str = ENTRY_POINT) -> Tuple[str, List[str]]:
+    """Bundle an ES module and everything it imports into one script.
+
+    Each module becomes a function scope registered under its path, dependencies first,
+    and imports become reads from that registry. Supports named, default and namespace
+    imports and exports declared in the module itself; re-exports, dynamic import(),
+    import.meta, import cycles and destructured exports raise BundleError. Returns the
+    bundle and the modules it contains.
+    """
+    order: List[str] = []
+    visiting = set()
+    bodies: Dict[str, Tuple[str, List[str]]] = {}
+
+    def visit(path: str):
+        if path in order:
+            return
+        if path in visiting:
+            raise BundleError(f"import cycle through {path}")
+        if path not in files:
+            raise BundleError(f"{path} is imported but was not generated")
+        visiting.add(path)
+        # Comments are stripped first so commented-out imports are not followed
+        source = minify_js(files[path])
+        if re.search(r"\bimport\s*\(|\bimport\.meta\b", source):
+            raise BundleError(f"{path} uses dynamic import() or import.meta")
+
+        def rewrite_import(match):
+            clause, target = match.group(1), resolve(path, match.group(3))
+            if target is None:
+                raise BundleError(f"{path} imports the external module {match.group(3)}")
+            visit(target)
+            module = f"__modules__[{target!r}]"
+            if not clause:
+                return ""
+            statements = []
+            for part in re.findall(r"\{[^}]*\}|[^,{}]+", clause):
+                part = part.strip()
+                if not part:
+                    continue
+                if part.startswith("{"):
+                    names = [re.sub(r"\s+as\s+", ": ", name.strip()) for name in part[1:-1].split(",") if name.strip()]
+                    statements.append(f"const {{ {', '.join(names)} }} = {module};")
+                elif part.startswith("*"):
+                    statements.append(f"const {part.split()[-1]} = {module};")
+                else:
+                    statements.append(f"const {part} = {module}.default;")
+            return " ".join(statements)
+
+        body = IMPORT_RE.sub(rewrite_import, source)
+        exports: List[str] = []
+
+        def rewrite_export(match):
+            prefix = match.group(0)[:match.group(0).index("export")]
+            if match.group("default") is not None:
+                if match.group("dname"):
+                    exports.append(f"default: {match.group('dname')}")
+                    return f"{prefix}{match.group('dkind')} {match.group('dname')}"
+                exports.append("default: __default__")
+                return f"{prefix}const __default__ = "
+            if match.group("kind"):
+                exports.append(match.group("name"))
+                if match.group("kind") in ("const", "let", "var"):
+                    exports.extend(_more_declarators(match.string, match.end(), path))
+                return f"{prefix}{match.group('kind')} {match.group('name')}"
+            if match.group("names") is not None and not match.group("from"):
+                for name in filter(None, (n.strip() for n in match.group("names").split(","))):
+                    local, _, exported = name.partition(" as ")
+                    exports.append(f"{exported.strip()}: {local.strip()}" if exported else local.strip())
+                return prefix
+            raise BundleError(f"{path} uses a re-export or destructured export the bundler does not rewrite")
+
+        body = EXPORT_RE.sub(rewrite_export, body)
+        bodies[path] = (body.strip(), exports)
+        visiting.discard(path)
+        order.append(path)
+
+    visit(entry)
+    parts = ["(() => {", '"use strict";', "const __modules__ = {};"]
+    for path in order[:-1]:
+        body, exports = bodies[path]
+        parts.append(f"// {path}\n__modules__[{path!r}] = (() => {{\n{body}\nreturn {{ {', '.join(exports)} }};\n}})();")
+    # Nothing imports the entry point, so its exports are dropped
+    parts.append(f"// {entry}\n{{\n{bodies[entry][0]}\n}}")
+    parts.append("})();")
+    return minify_js("\n".join(parts)), order
+
+
+def precompress(content: bytes) -> Dict[str, bytes]:
+    """.gz (and .br when Brotli is installed) siblings that are smaller than the original."""
+    siblings = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        siblings[".br"] = brotli.compress(content, quality=11)
+    return {ext: data for ext, data in siblings.items() if len(data) < len(content)}
+
+
+class Bundler:
+    """Builds the production copy of a generated site that is published in `<site>/dist`.
+
+    HTML, CSS, JavaScript and JSON are minified, the module graph of js/main.js is bundled into a
+    single script, stylesheets and scripts get content-hashed names (references to them in
+    HTML and CSS are rewritten) so they can be cached forever, and text assets get
+    precompressed .gz and .br siblings. The dist files are returned rather than written, so
+    they are staged with the rest of the site and published by the same SiteWriter swap:
+    unchanged ones are hard-linked from the previous build, and images and other files passed
+    through as is are hard links to the site's own copies.
+    """
+
+    DIST_DIR = "dist"
+
+    def __init__(self, workers: int = 8):
+        self.workers = workers
+        self.report: List[Dict] = []
+
+    @classmethod
+    def read_site(cls, site_dir: str) -> Dict[str, bytes]:
+        """Every file of a site on disk except its dist/."""
+        files = {}
+        for root, dirs, names in os.walk(site_dir):
+            rel_root = os.path.relpath(root, site_dir).replace(os.sep, "/")
+            if rel_root == ".":
+                dirs[:] = [d for d in dirs if d != cls.DIST_DIR]
+                rel_root = ""
+            for name in names:
+                with open(os.path.join(root, name), "rb") as f:
+                    files[posixpath.join(rel_root, name)] = f.read()
+        return files
+
+    def dist_files(self, files: Dict[str, Union[str, bytes]]) -> Dict[str, bytes]:
+        """The dist/ files, by site-relative path, built from the site files (path -> content)."""
+        site = {path: data.encode("utf-8") if isinstance(data, str) else data for path, data in files.items()
+                if path not in EXCLUDED and not path.startswith(self.DIST_DIR + "/")}
+        return {posixpath.join(self.DIST_DIR, path): data for path, data in self.build_files(site).items()}
+
+    def build_files(self, files: Dict[str, bytes]) -> Dict[str, bytes]:
+        """Turn site files into dist files and fill in the size report."""
+        texts = {path: data.decode("utf-8") for path, data in files.items()
+                 if posixpath.splitext(path)[1] in (".html", ".css", ".js")}
+        renamed: Dict[str, str] = {}
+        dist: Dict[str, bytes] = {}
+        sources: Dict[str, List[str]] = {}
+
+        # Files the HTML loads directly are shipped even when they are also part of the bundle
+        referenced = {resolve(path, match.group(2)) for path, text in texts.items() if path.endswith(".html")
+                      for match in re.finditer(HTML_REFERENCE_RE, text)}
+        bundled = set()
+        if ENTRY_POINT in texts:
+            try:
+                bundle, modules = bundle_modules(texts, ENTRY_POINT)
+                data = bundle.encode("utf-8")
+                renamed[ENTRY_POINT] = content_hashed(ENTRY_POINT, data)
+                dist[renamed[ENTRY_POINT]] = data
+                sources[renamed[ENTRY_POINT]] = modules
+                # A module the HTML loads directly still needs the modules it imports
+                kept = {path for path in modules if path in referenced and path != ENTRY_POINT}
+                pending = list(kept)
+                while pending:
+                    module = pending.pop()
+                    for match in IMPORT_RE.finditer(minify_js(texts[module])):
+                        target = resolve(module, match.group(3))
+                        if target in texts and target != ENTRY_POINT and target not in kept:
+                            kept.add(target)
+                            pending.append(target)
+                bundled.update(set(modules) - kept)
+            except BundleError as e:
+                print(f"⚠ Could not bundle {ENTRY_POINT}, shipping modules separately: {e}")
+
+        for path, text in texts.items():
+            if path.endswith(".js") and path not in bundled:
+                # Unbundled modules import each other by name, so only standalone scripts are renamed
+                data = minify_js(text).encode("utf-8")
+                target = path if re.search(r"^\s*(import|export)\b", text, re.M) else content_hashed(path, data)
+                renamed[path] = target
+                dist[target] = data
+                sources[target] = [path]
+
+        def build_css(path: str, seen=()) -> str:
+            if path in renamed:
+                return renamed[path]
+            if path in seen:
+                raise BundleError(f"@import cycle through {path}")
+            css = minify_css(texts[path])
+            css = self._rewrite(path, css, r"(@import\s*(?:url\()?\s*[\"']?)([^\"')\s;]+)",
+                                lambda target: build_css(target, seen + (path,)) if target in texts else None)
+            data = css.encode("utf-8")
+            renamed[path] = content_hashed(path, data)
+            dist[renamed[path]] = data
+            sources[renamed[path]] = [path]
+            return renamed[path]
+
+        for path in texts:
+            if path.endswith(".css"):
+                build_css(path)
+
+        for path, text in texts.items():
+            if path.endswith(".html"):
+                html = self._rewrite(path, minify_html(text), HTML_REFERENCE_RE,
+                                     lambda target: renamed.get(target))
+                dist[path] = html.encode("utf-8")
+                sources[path] = [path]
+
+        for path, data in files.items():
+            if path.endswith(".json"):
+                try:
+                    data = json.dumps(json.loads(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                except ValueError:
+                    pass
+            if path not in texts:
+                dist[path] = data
+                sources[path] = [path]
+
+        self.report = []
+        for path in sorted(dist):
+            data = dist[path]
+            entry = {"path": path, "source_bytes": sum(len(files[s]) for s in sources[path]),
+                     "bytes": len(data), "gz": None, "br": None}
+            if posixpath.splitext(path)[1] in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES:
+                for ext, compressed in precompress(data).items():
+                    dist[path + ext] = compressed
+                    entry[ext[1:]] = len(compressed)
+            self.report.append(entry)
+        return dist
+
+    @staticmethod
+    def _rewrite(base: str, text: str, pattern: str, lookup) -> str:
+        """Point references matched by `pattern` (prefix group, reference group) at renamed files."""
+        def replace(match):
+            target = resolve(base, match.group(2))
+            new = lookup(target) if target else None
+            if not new:
+                return match.group(0)
+            suffix = match.group(2)[len(re.split(r"[?#]", match.group(2), 1)[0]):]
+            return match.group(1) + relative(base, new) + suffix
+        return re.sub(pattern, replace, text)
+
+    def build(self, site_dir: str) -> Dict:
+        """Rebuild dist/ of a site on disk and republish the site with it in one swap.
+        Returns the size report and write statistics."""
+        files = self.read_site(site_dir)
+        files.update(self.dist_files(files))
+        stats = SiteWriter(site_dir, workers=self.workers).write(files)
+        return {"assets": self.report, "write": stats}
+
+    def format_report(self) -> List[str]:
+        def kb(size):
+            return "-" if size is None else f"{size / 1024:.1f} KB"
+
+        lines = [f"  {'asset':<40} {'source':>10} {'minified':>10} {'gzip':>10} {'brotli':>10}"]
+        for entry in self.report:
+            lines.append(f"  {entry['path']:<40} {kb(entry['source_bytes']):>10} {kb(entry['bytes']):>10} "
+                         f"{kb(entry['gz']):>10} {kb(entry['br']):>10}")
+        source = sum(e["source_bytes"] for e in self.report)
+        minified = sum(e["bytes"] for e in self.report)
+        gz = sum(e["gz"] or e["bytes"] for e in self.report)
+        lines.append(f"  {'total':<40} {kb(source):>10} {kb(minified):>10} {kb(gz):>10}")
+        return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a minified, bundled and precompressed dist/ for a generated site.")
+    parser.add_argument("site_dir", help="Directory of a generated landing page")
+    args = parser.parse_args()
+    if not os.path.isdir(args.site_dir):
+        sys.exit(f"No such site: {args.site_dir}")
+    bundler = Bundler()
+    bundler.build(args.site_dir)
+    print("\n".join(bundler.format_report()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,118 @@
 import os
+import sys
+import copy
 import json
 from dotenv import load_dotenv
 from crewai import Agent, Task, Crew
-from langchain_openai import ChatOpenAI
-from typing import Dict, List
+from crewai.tasks.task_output import TaskOutput
+from typing import Any, Dict, List, Optional, Sequence, Union
 import re
-import string
+import time
+import uuid
+import random
 from string import Template
-from typing import Optional, Union
-
-# Import regex
+from concurrent.futures import ThreadPoolExecutor
+from scheduler import TaskGraph, summarize_timeline, format_timeline
+from llm_cache import CachedChatOpenAI, DiskLLMCache
+from rate_limiter import RateLimiter
+from llm_clients import ClientPool
+from json_extract import PLACEHOLDER_RE, PlaceholderContentError, StreamingPlaceholderGuard, extract_json, find_placeholders, format_path
+from usage import UsageTracker, BudgetExceededError
+from site_writer import STATE_DIR_NAME, SiteWriter, site_path, state_dir_for
+from manifest import RunManifest, hash_payload
+from job_store import JobStore
+from image_pipeline import ImagePipeline
+from image_liveness import LivenessChecker, apply_liveness, candidate_urls
+from bundler import Bundler
+from assembler import PageAssembler, design_tokens, section_images
+import prompts
+import validators
+from validators import format_diagnostic, validate_files
 
 # Load environment variables
 load_dotenv()
 
 class LandingPageCrew:
-    def __init__(self, website_name, niche_description):
+    # Bump whenever task descriptions change in a way that should invalidate stored stage outputs
+    PROMPT_VERSION = "1"
+    MODEL_NAME = "gpt-3.5-turbo"
+
+    # Landing page sections, in page order
+    SECTIONS = ["hero", "features", "testimonials", "pricing", "contact"]
+
+    # Stages that must finish before a stage starts; everything else runs concurrently
+    TASK_DEPENDENCIES = {
+        "setup": [],
+        "assets": [],
+        "components": ["setup", "assets"],
+        "js_modules": ["setup"],
+    }
+
+    # Keys of generated_code that each stage fills in
+    STAGE_OUTPUT_KEYS = {
+        "setup": ["directory_structure"],
+        "assets": ["images"],
+        "components": ["html_components", "css_components"],
+        "js_modules": ["js_modules"],
+    }
+
+    # Agent that runs each stage, for labelling the usage report
+    STAGE_AGENTS = {
+        "setup": "setup_dev",
+        "assets": "asset_dev",
+        "components": "component_dev",
+        "js_modules": "js_dev",
+    }
+
+    RETRY_NOTE = """
+
+            NOTE (attempt {attempt}): the previous response was rejected because it was not valid JSON,
+            was missing required files, contained placeholder content or had syntax errors. Return the
+            complete JSON object with every file fully implemented.
+            """
+
+    REPAIR_NOTE = """
+            NOTE (attempt {attempt}): return only the files listed above, fully implemented.
+            """
+
+    # Stages whose output is a set of files, accepted file by file
+    FILE_STAGES = ("setup", "components", "js_modules")
+
+    def __init__(self, website_name, niche_description, output_root=None, cache_mode=None, streaming=None,
+                 prompt_profile=None, job_id=None):
         self.website_name = website_name
         self.niche_description = niche_description
-        self.llm = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
+        # "verbose" or "compact" task and agent prompts (default: PROMPT_PROFILE)
+        self.prompt_profile = prompts.resolve_profile(prompt_profile)
+        # Tokens each stage sends before upstream context, filled in by create_tasks
+        self.prompt_tokens = {}
+        self.output_dir = os.path.join(output_root or "", website_name.lower() + "_generated")
+        # Responses are cached on disk; cache_mode "refresh" regenerates, "off" bypasses (default: LLM_CACHE_MODE)
+        self.llm_cache = DiskLLMCache.from_env(mode=cache_mode)
+        # Files of a stage accepted so far and the rejected ones with the reason; a retry asks only
+        # for the rejected files (FILE_REPAIR=0 asks for the whole stage again)
+        self.file_repair = os.getenv("FILE_REPAIR", "1") == "1"
+        # Streaming parses responses as they arrive and cancels one at its first placeholder; the files
+        # finished before it are kept (LLM_STREAMING=0 waits for the full response)
+        self.streaming = os.getenv("LLM_STREAMING", "1") == "1" if streaming is None else streaming
+        self.stream_guard = StreamingPlaceholderGuard()
+        # Tokens, cost and latency of every LLM call, with per-run budgets (RUN_TOKEN_BUDGET, RUN_TIME_BUDGET_SECONDS)
+        self.usage = UsageTracker.from_env(model=self.MODEL_NAME)
+        # Requests, tokens and concurrency of LLM calls are governed for every crew on the host and
+        # 429s are retried after Retry-After (LLM_RATE_LIMIT=off sends calls straight through)
+        self.rate_limiter = RateLimiter.from_env(os.getenv('OPENROUTER_BASE_URL'))
+        # HTTP clients and their keep-alive connections are shared by every crew in the process
+        self.llm_pool = ClientPool.shared(os.getenv('OPENROUTER_BASE_URL'), os.getenv('OPENROUTER_API_KEY'),
+                                          default_headers={"HTTP-Referer": "https://github.com/joaomdmoura/crewAI"},
+                                          limiter=self.rate_limiter)
+        self.llm = CachedChatOpenAI(
+            model_name=self.MODEL_NAME,
             openai_api_base=os.getenv('OPENROUTER_BASE_URL'),
             openai_api_key=os.getenv('OPENROUTER_API_KEY'),
-            default_headers={"HTTP-Referer": "https://github.com/joaomdmoura/crewAI"}
+            cache=self.llm_cache,
+            streaming=self.streaming,
+            callbacks=[self.usage] + ([self.stream_guard] if self.streaming else []),
+            **self.llm_pool.chat_openai_clients()
         )
         self.generated_code = {}
         self.code_templates = {
@@ -68,7 +158,55 @@ body {
             "components": {"completed": False, "retries": 0},
             "js_modules": {"completed": False, "retries": 0}
         }
+        # Normalized URLs of the images downloaded and rendered for this site
         self.processed_images = set()
+        self.timeline = {}
+        self.usage_report = None
+        # Stage input/output hashes of this run, persisted for incremental regeneration
+        self.state_dir = state_dir_for(self.output_dir)
+        self.manifest = RunManifest(self.state_dir)
+        # Every accepted stage is checkpointed to the job store (LANDING_JOB_DB) so a crashed run can be resumed
+        self.job_id = job_id or uuid.uuid4().hex
+        self.job_store = JobStore.from_env(os.path.dirname(self.state_dir))
+        # Stages whose new output is merged into what is already stored instead of replacing it
+        self.merge_stages = set()
+        # Images are downloaded and rendered into responsive WebP variants once assets are chosen (IMAGE_FETCH=0 disables)
+        self.fetch_images = os.getenv("IMAGE_FETCH", "1") == "1"
+        # Downloads and variants are indexed beside the sites, so every site under the same root shares them
+        self.image_pipeline = ImagePipeline.from_env(os.path.dirname(self.state_dir))
+        self.image_files = {}
+        self.image_metadata = None
+        # "pattern" only checks URL shapes; "network" also checks every URL resolves (IMAGE_VALIDATION)
+        self.image_validation = os.getenv("IMAGE_VALIDATION", "pattern")
+        self.liveness = LivenessChecker.from_env(os.path.dirname(self.state_dir))
+        # "strict" rejects output with syntax errors so the stage is retried, "warn" only reports them,
+        # "off" skips validation (CODE_VALIDATION); large outputs are checked on a process pool
+        self.code_validation = os.getenv("CODE_VALIDATION", "strict")
+        self.validation_workers = int(os.getenv("CODE_VALIDATION_WORKERS", "0")) or None
+        # Diagnostics of the latest output of each stage, by file
+        self.validation_report = {}
+        # The components stage runs as one subtask per section plus one for the page shell and shared
+        # styles, concurrently and retried independently (COMPONENT_FANOUT=0 asks for everything at once)
+        self.component_fanout = os.getenv("COMPONENT_FANOUT", "1") == "1"
+        # Accepted files of each component subtask, merged once all of them are done
+        self.part_files = {}
+        # Section partials are stitched into index.html with critical CSS inlined (ASSEMBLE_INDEX=0 disables)
+        self.assemble_index = os.getenv("ASSEMBLE_INDEX", "1") == "1"
+        # A minified, bundled and precompressed copy of the site is built in dist/ (BUILD_DIST=0 disables)
+        self.build_dist = os.getenv("BUILD_DIST", "1") == "1"
+        self.build_report = None
+        # JSON paths of placeholder values found in the latest output of each stage
+        self.placeholder_paths = {}
+        self.accepted_files = {}
+        self.rejected_files = {}
+        # Files a repair attempt of a stage was asked for
+        self.repair_requests = {}
+        # File each stage's latest response was cancelled in, and the stages whose response was
+        # cancelled before it reached every file, whose repair also asks for the files still missing
+        self.cancelled_files = {}
+        self.unfinished_stages = set()
+        # Base delay in seconds before retrying a rejected stage; doubles on every retry
+        self.retry_backoff = float(os.getenv("TASK_RETRY_BACKOFF", "2"))
         
     def validate_image_url(self, url: str) -> bool:
         """Validate if an image URL is real and accessible."""
@@ -103,138 +241,89 @@ body {
         print(f"⚠ {task_type} task needs retry (Attempt {state['retries'] + 1})")
         return True  # Retry needed
         
-    def create_agents(self):
-        # Project Setup Agent
-        setup_dev = Agent(
-            role='Project Setup Developer',
-            goal='''
-            Create a clean, organized project structure for a static HTML website by:
-            - Setting up proper directory structure for HTML, CSS, and JS files
-            - Creating a development environment without external dependencies
-            - Setting up asset organization for images and media
-            - Establishing coding standards and best practices
-            - Ensuring cross-browser compatibility
-            ''',
-            backstory='''
-            A veteran web developer with 15 years of experience in pure HTML, CSS, and JavaScript.
-            Expert in creating high-performance static websites without frameworks.
-            Known for implementing sophisticated features using vanilla web technologies.
-            Pioneer of the "Zero Dependencies" web development movement.
-            Has built enterprise-level websites using only native web technologies.
-            Regular speaker on web performance and maintainability.
-            Author of "Pure Web Development: No Frameworks Needed".
-            ''',
-            verbose=True,
-            allow_delegation=True,
-            llm=self.llm
-        )
+    def validate_html(self, content: str, path: str = "") -> List[Dict]:
+        """Structural diagnostics for one generated HTML file."""
+        return validators.validate_html(content, path)
 
-        # Component Developer
-        component_dev = Agent(
-            role='Component Developer',
-            goal='''
-            Create visually stunning and accessible web components by:
-            - Writing semantic HTML5 markup
-            - Implementing modern CSS layouts and animations
-            - Finding and optimizing relevant images for each section
-            - Ensuring responsive design across all devices
-            - Maintaining WCAG accessibility standards
-            - Creating visual consistency throughout the site
-            ''',
-            backstory='''
-            A creative technologist with 12 years of experience in UI/UX and visual design.
-            Expert in crafting beautiful web experiences without frameworks.
-            Specialized in finding and optimizing perfect images for websites.
-            Created award-winning designs for major brands using pure HTML/CSS.
-            Pioneer in responsive image techniques and lazy loading.
-            Regular contributor to web design publications.
-            Known for the "Visual-First Web Development" methodology.
-            ''',
-            verbose=True,
-            allow_delegation=True,
-            llm=self.llm
-        )
+    def validate_css(self, content: str, path: str = "") -> List[Dict]:
+        """Tokenizer-level diagnostics for one generated stylesheet."""
+        return validators.validate_css(content, path)
 
-        # JavaScript Developer
-        js_dev = Agent(
-            role='JavaScript Developer',
-            goal='''
-            Develop robust vanilla JavaScript solutions by:
-            - Writing clean, modular JavaScript without frameworks
-            - Implementing smooth animations and interactions
-            - Creating responsive image loading mechanisms
-            - Building efficient state management
-            - Ensuring cross-browser compatibility
-            - Optimizing performance and load times
-            ''',
-            backstory='''
-            A JavaScript purist with 10 years of experience in vanilla JS development.
-            Expert in creating complex functionality without external libraries.
-            Developed popular vanilla JS utilities used by thousands of developers.
-            Specialized in creating smooth animations and dynamic image galleries.
-            Performance optimization expert focusing on Core Web Vitals.
-            Regular speaker at JavaScript conferences.
-            Author of "Pure JavaScript: Beyond Libraries and Frameworks".
-            ''',
-            verbose=True,
-            allow_delegation=True,
-            llm=self.llm
-        )
+    def validate_js(self, content: str, path: str = "") -> List[Dict]:
+        """Syntax diagnostics for one generated JavaScript module."""
+        return validators.validate_js(content, path)
 
-        # Asset Specialist
-        asset_dev = Agent(
-            role='Asset Specialist',
-            goal='''
-            Source and optimize website assets by:
-            - Finding relevant, free-to-use images for the website
-            - Optimizing images for web performance
-            - Creating image variants for different devices
-            - Managing asset organization and naming
-            - Ensuring proper image attribution
-            - Documenting asset usage guidelines
-            ''',
-            backstory='''
-            An asset optimization specialist with 8 years of experience in web media.
-            Expert in finding and curating perfect images for websites.
-            Specialized in image optimization and responsive image delivery.
-            Created automated image optimization workflows used by major websites.
-            Pioneer in modern image format adoption (WebP, AVIF).
-            Regular speaker on web performance and image optimization.
-            Maintains relationships with major free image providers.
-            ''',
-            verbose=True,
-            allow_delegation=True,
-            llm=self.llm
-        )
+    def validate_generated_files(self, task_type: str, files: Dict[str, str]) -> bool:
+        """Syntax-check generated files and record their diagnostics.
 
-        return setup_dev, component_dev, js_dev, asset_dev
+        Returns False when a file has errors and CODE_VALIDATION is "strict".
+        """
+        if self.code_validation == "off":
+            return True
+        results = validate_files(files, workers=self.validation_workers)
+        self.validation_report[task_type] = {path: found for path, found in results.items() if found}
+        errors = [d for found in results.values() for d in found if d["severity"] == "error"]
+        warnings = sum(len(found) for found in results.values()) - len(errors)
+        if not errors:
+            print(f"✓ Validated {len(results)} files ({warnings} warnings)")
+            return True
+        print(f"⚠ {len(errors)} syntax errors in {task_type} output:")
+        for entry in errors[:5]:
+            print(f"  {format_diagnostic(entry)}")
+        return self.code_validation != "strict"
 
-    def store_generated_content(self, task_output, task_type):
-        """Store generated content in the appropriate collection, parsing JSON robustly"""
+    def create_agent(self, name: str) -> Agent:
+        # Delegation stays off: stages run concurrently and an agent must not be driven from two threads
+        return Agent(**prompts.agent_prompt(self.prompt_profile, name), verbose=True, allow_delegation=False, llm=self.llm)
+
+    def create_agents(self):
+        return tuple(self.create_agent(name) for name in ("setup_dev", "component_dev", "js_dev", "asset_dev"))
+
+    def store_generated_content(self, task_output, task_type) -> bool:
+        """Store generated content in the appropriate collection, parsing JSON robustly.
+
+        Returns True when the output was accepted and stored.
+        """
         
         print(f"\nProcessing {task_type} task output...")
         
         # For empty or invalid output
         if not task_output:
             print(f"⚠ No content received for {task_type} task")
-            return
+            return False
             
-        # Extract JSON from the output
-        parsed_json = self.extract_json_from_string(task_output)
+        # Extract JSON from the output; placeholders in generated files only reject those files
+        parsed_json = self.extract_json_from_string(task_output, task_type,
+                                                    allow_placeholders=task_type in self.FILE_STAGES)
         if not parsed_json:
             print(f"⚠ Failed to parse JSON for {task_type} task")
-            return
+            return False
 
         try:
             # Handle each task type
             if task_type == "setup":
-                if "directory_structure" in parsed_json:
-                    self.generated_code["directory_structure"] = parsed_json["directory_structure"]
-                    print("✓ Stored project structure")
-                    
+                structure = parsed_json.get("directory_structure")
+                if structure is None and task_type in self.repair_requests:
+                    # A repair answers with just the requested files
+                    structure = parsed_json
+                if structure is not None:
+                    if not isinstance(structure, dict):
+                        self.generated_code["directory_structure"] = structure
+                        print("✓ Stored project structure")
+                        return True
+                    structure = self.accept_files(task_type, structure)
+                    if structure:
+                        self.generated_code["directory_structure"] = structure
+                        print(f"✓ Stored project structure ({len(structure)} files)")
+                    return bool(structure) and not self.rejected_files[task_type]
+                print("⚠ No directory_structure found in output")
+                return False
+
             elif task_type == "assets":
                 if "images" in parsed_json:
                     image_data = parsed_json["images"]
+                    if self.image_validation == "network":
+                        image_data = self.check_image_liveness(image_data)
                     valid_urls = 0
                     # Validate each image URL
                     for key, value in image_data.items():
@@ -247,99 +336,190 @@ body {
                     if valid_urls > 0:
                         self.generated_code["images"] = image_data
                         print(f"✓ Stored {valid_urls} valid image assets")
-                    else:
-                        print("⚠ No valid image URLs found in assets")
-                    
+                        return True
+                    print("⚠ No valid image URLs found in assets")
+                return False
+
             elif task_type == "components":
+                files = self.accept_files(task_type, {k: v for k, v in parsed_json.items()
+                                                      if k.endswith(('.html', '.css'))})
                 # Store HTML files
-                html_files = {k: v for k, v in parsed_json.items() if k.endswith(('.html'))}
+                html_files = {k: v for k, v in files.items() if k.endswith(('.html'))}
+                css_files = {k: v for k, v in files.items() if k.endswith(('.css'))}
+                if task_type in self.merge_stages:
+                    # Section regeneration returns only the files it replaces
+                    html_files = {**self.generated_code.get("html_components", {}), **html_files} if html_files else {}
+                    css_files = {**self.generated_code.get("css_components", {}), **css_files} if css_files else {}
                 if html_files:
                     self.generated_code["html_components"] = html_files
                     print(f"✓ Stored {len(html_files)} HTML components")
                 
                 # Store CSS files
-                css_files = {k: v for k, v in parsed_json.items() if k.endswith(('.css'))}
                 if css_files:
                     self.generated_code["css_components"] = css_files
                     print(f"✓ Stored {len(css_files)} CSS files")
                 
                 if not html_files and not css_files:
-                    print("⚠ No HTML or CSS components found in output")
-                    
+                    if not self.rejected_files[task_type]:
+                        print("⚠ No HTML or CSS components found in output")
+                    return False
+                return not self.rejected_files[task_type]
+
             elif task_type == "js_modules":
-                # Store JavaScript modules
-                js_files = {k: v for k, v in parsed_json.items() if k.endswith(('.js'))}
+                # Store JavaScript modules; placeholder implementations were rejected by accept_files
+                js_files = self.accept_files(task_type, {k: v for k, v in parsed_json.items() if k.endswith(('.js'))})
                 if js_files:
-                    # Check for actual implementations
-                    placeholder_count = sum(1 for content in js_files.values() 
-                                         if any(ph in content for ph in ["// Implementation", "// TODO", "..."]))
-                    
-                    if placeholder_count == 0:
-                        self.generated_code["js_modules"] = js_files
-                        print(f"✓ Stored {len(js_files)} complete JavaScript modules")
-                    else:
-                        print(f"⚠ Found {placeholder_count} placeholder implementations in JavaScript modules")
-                else:
+                    self.generated_code["js_modules"] = js_files
+                    print(f"✓ Stored {len(js_files)} complete JavaScript modules")
+                    return not self.rejected_files[task_type]
+                if not self.rejected_files[task_type]:
                     print("⚠ No JavaScript modules found in output")
-                
+                return False
+
         except Exception as e:
             print(f"⚠ Error processing {task_type} task output: {str(e)}")
             print("Raw output:", task_output[:200] + "..." if len(str(task_output)) > 200 else task_output)
+        return False
             
-    def extract_json_from_string(self, s: str) -> Dict | None:
-        """Extracts the first valid JSON object found within a string."""
+    def component_parts(self) -> Dict[str, List[str]]:
+        """Files each subtask of the fanned-out components stage must return."""
+        parts = {"shell": ["index.html", "styles/main.css"]}
+        for name in self.SECTIONS:
+            parts[name] = [f"components/{name}.html", f"styles/components/{name}.css"]
+        return parts
+
+    def store_part(self, task_output, task_type: str, part: str) -> bool:
+        """Accept the files of one subtask of a fanned-out stage; they are merged once every
+        subtask has finished."""
+        key = f"{task_type}/{part}"
+        print(f"\nProcessing {key} task output...")
+        parsed_json = self.extract_json_from_string(task_output, key, allow_placeholders=True) if task_output else None
+        if not parsed_json:
+            print(f"⚠ Failed to parse JSON for {key} task")
+            return False
+        expected = self.component_parts()[part]
+        files = self.accept_files(key, {path: parsed_json[path] for path in expected
+                                        if isinstance(parsed_json.get(path), str)}, required=expected)
+        self.part_files[part] = files
+        if self.rejected_files[key]:
+            return False
+        print(f"✓ Stored {len(files)} files for {part}")
+        return True
+
+    def accept_files(self, key: str, files: Dict[str, Any], required: Sequence[str] = ()) -> Dict[str, Any]:
+        """Accept a stage's files one by one and return every file of the stage accepted so far.
+
+        Files that are missing from required, contain placeholder content, were cut off by a
+        cancelled response or, with CODE_VALIDATION=strict, have syntax errors are recorded with the reason in
+        self.rejected_files[key]; files accepted by an earlier attempt that left some rejected
+        are kept.
+        """
+        requested = self.repair_requests.get(key)
+        if requested is not None:
+            # A repair only replaces the files it was asked for, and adds those a cancelled response never reached
+            open_ended = key in self.unfinished_stages
+            files = {path: content for path, content in files.items() if path in requested
+                     or (open_ended and path not in self.accepted_files.get(key, {}))}
+        rejected = {path: "missing from the response" for path in (requested or required) if path not in files}
+        cancelled = self.cancelled_files.pop(key, None)
+        if cancelled:
+            rejected[cancelled] = "placeholder content, the response was cancelled there"
+        # Only rescanned when extract_json_from_string found placeholders somewhere in the output
+        for path in find_placeholders(files) if self.placeholder_paths.get(key) else ():
+            content = files[path[0]]
+            match = PLACEHOLDER_RE.search(content) if isinstance(content, str) else None
+            rejected.setdefault(path[0], f'placeholder content ("{match.group(0)}")' if match
+                                else f"placeholder content at {format_path(path)}")
+
+        # Files accepted earlier are kept while the stage still waits for the rejected ones
+        previous = self.accepted_files.get(key, {}) if self.rejected_files.get(key) else {}
+        report = dict(self.validation_report.get(key, {})) if previous else {}
+        self.validate_generated_files(key, files)
+        for path in files:
+            found = self.validation_report.get(key, {}).get(path)
+            errors = [d for d in found or () if d["severity"] == "error"]
+            if errors and self.code_validation == "strict":
+                rejected.setdefault(path, f"line {errors[0]['line']}, column {errors[0]['column']}: {errors[0]['message']}")
+            if path not in previous or path not in rejected:
+                # Diagnostics follow the version of each file that is kept
+                report.pop(path, None)
+                if found:
+                    report[path] = found
+        if self.code_validation != "off":
+            self.validation_report[key] = report
+
+        accepted = {**previous, **{path: content for path, content in files.items() if path not in rejected}}
+        self.accepted_files[key] = accepted
+        self.rejected_files[key] = {path: reason for path, reason in rejected.items() if path not in accepted}
+        if self.rejected_files[key]:
+            shown = "; ".join(f"{path}: {reason}" for path, reason in list(self.rejected_files[key].items())[:5])
+            print(f"⚠ Rejected {len(self.rejected_files[key])} {key} files, keeping {len(accepted)}: {shown}")
+        return accepted
+
+    def store_cancelled(self, task_type: str, part: Optional[str], error: PlaceholderContentError):
+        """Keep the files a response finished before it was cancelled at a placeholder.
+
+        The file it stopped in is rejected, so the retry repairs it along with any file the
+        response never reached.
+        """
+        key = f"{task_type}/{part}" if part else task_type
+        self.cancelled_files[key] = error.path[-1]
+        if not part:
+            # A subtask knows its files; a whole stage only learns the rest from the repair
+            self.unfinished_stages.add(key)
+        if error.partial:
+            partial = json.dumps(error.partial)
+            if part:
+                self.store_part(partial, task_type, part)
+            else:
+                self.store_generated_content(partial, task_type)
+        self.cancelled_files.pop(key, None)
+
+    def create_repair_task(self, key: str, task: Task, attempt: int) -> Task:
+        """A retry that asks only for the rejected files of a stage, without upstream context."""
+        description = prompts.repair_prompt(self.prompt_profile, self.website_name, self.niche_description, key,
+                                            tuple(self.rejected_files[key].items()),
+                                            tuple(sorted(self.accepted_files[key])),
+                                            unfinished=key in self.unfinished_stages)
+        return Task(description=description + self.REPAIR_NOTE.format(attempt=attempt),
+                    expected_output=prompts.EXPECTED_OUTPUTS["part"], agent=task.agent)
+
+    def stage_result(self, key: str) -> str:
+        """Result of a stage rebuilt from its accepted files, in the shape the stage returns."""
+        files = self.accepted_files.get(key, {})
+        return json.dumps({"directory_structure": files} if key == "setup" else files, indent=2)
+
+    def extract_json_from_string(self, s: str, task_type: Optional[str] = None,
+                                 allow_placeholders: bool = False) -> Dict | None:
+        """Extracts the largest valid JSON object found within a string.
+
+        When task_type is given, the JSON paths of any placeholder values are recorded in
+        self.placeholder_paths[task_type]. Output with placeholders is rejected unless
+        allow_placeholders is set, for callers that accept its files one by one.
+        """
         if not isinstance(s, str):
             return None
             
-        def is_placeholder_content(content: str) -> bool:
-            """Check if content is just a placeholder."""
-            placeholder_patterns = [
-                r'\.{3}',  # ...
-                r'Implementation',
-                r'Placeholder',
-                r'Example',
-                r'TODO',
-                r'// *$',  # Empty comments
-                r'Full implementation',
-            ]
-            return any(re.search(pattern, content, re.IGNORECASE) for pattern in placeholder_patterns)
-        
-        # Try to find JSON enclosed in ```json ... ``` or ``` ... ```
-        match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', s, re.DOTALL | re.IGNORECASE)
-        if match:  # Removed unnecessary parentheses
-            json_str = match.group(1)
-        else:
-            # Fallback: find the first '{' and the last '}' 
-            start = s.find('{')
-            end = s.rfind('}')
-            if start != -1 and end != -1 and start < end:  # Removed unnecessary parentheses
-                json_str = s[start:end + 1]
-            else:
+        try:
+            # Single pass over the output: locate balanced objects, decode with orjson and
+            # repair only the strings from the first failing one onwards
+            parsed = extract_json(s)
+            if parsed is None:
                 print(f"⚠ Could not find JSON structure in output.")
                 return None
 
-        try:
-            # Try parsing directly first
-            try:
-                parsed = json.loads(json_str)
-            except json.JSONDecodeError as e:
-                print(f"Initial JSON parse failed: {e}. Attempting cleanup...")
-                # Clean up common issues
-                cleaned_json_str = re.sub(r'(?<!\\)\\(?!["\\/bfnrtu])', '\\\\', json_str)
-                cleaned_json_str = re.sub(r'(?<=":\s*")([^"\\]|\\.)*(?<!\\)\n', '\\n', cleaned_json_str)
-                parsed = json.loads(cleaned_json_str)
-            
-            # Check for placeholder content in values
-            for key, value in parsed.items():
-                if isinstance(value, str) and is_placeholder_content(value):
-                    print(f"⚠ Placeholder content detected in '{key}'. Requesting regeneration.")
+            # Check every value, however deeply nested, for placeholder content in one pass
+            placeholder_paths = find_placeholders(parsed)
+            if task_type:
+                self.placeholder_paths[task_type] = placeholder_paths
+            if placeholder_paths:
+                shown = ", ".join(f"'{format_path(path)}'" for path in placeholder_paths[:5])
+                more = f" and {len(placeholder_paths) - 5} more" if len(placeholder_paths) > 5 else ""
+                if not allow_placeholders:
+                    print(f"⚠ Placeholder content detected in {shown}{more}. Requesting regeneration.")
                     return None
-                elif isinstance(value, dict):
-                    for subkey, subvalue in value.items():
-                        if isinstance(subvalue, str) and is_placeholder_content(subvalue):
-                            print(f"⚠ Placeholder content detected in '{key}.{subkey}'. Requesting regeneration.")
-                            return None
-            
+                print(f"⚠ Placeholder content detected in {shown}{more}")
+
             return parsed
 
         except Exception as e:
@@ -347,362 +527,44 @@ body {
             return None
 
     def create_tasks(self, setup_dev, component_dev, js_dev, asset_dev):
+        def describe(stage):
+            return prompts.task_prompt(self.prompt_profile, stage, self.website_name, self.niche_description,
+                                       tuple(self.SECTIONS))
+
         # Task 1: Generate Project Structure
-        setup_task = Task(
-            description=f"""
-            Generate a COMPLETE, production-ready project structure for {self.website_name} ({self.niche_description}).
-            Return a JSON object containing FULLY IMPLEMENTED files - NO PLACEHOLDERS.
-
-            Required structure and implementations:
-
-            1. index.html:
-                Must include:
-                - Complete HTML5 structure
-                - Meta tags (charset, viewport, description)
-                - SEO tags specific to {self.niche_description}
-                - Stylesheet links
-                - Module script tags
-                - Basic layout structure
-                Example:
-                <!DOCTYPE html>
-                <html lang="en">
-                <head>
-                    <meta charset="UTF-8">
-                    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                    <title>{self.website_name}</title>
-                    ...
-                </head>
-                <body>...</body>
-                </html>
-
-            2. styles/main.css:
-                Must include:
-                - Modern CSS reset
-                - Root variables for:
-                    * Colors (primary, secondary, accent)
-                    * Typography (font sizes, weights)
-                    * Spacing scale
-                    * Breakpoints
-                - Base styles
-                - Grid system
-                - Utility classes
-                Example:
-                :root {{
-                    --primary-color: #2563eb;
-                    --spacing-unit: 0.25rem;
-                    ...
-                }}
-
-            3. js/main.js:
-                Must include:
-                - Module imports
-                - App initialization
-                - Error handling
-                Example:
-                import {{ initComponents }} from './modules/index.js';
-                document.addEventListener('DOMContentLoaded', () => {{
-                    initComponents();
-                }});
-
-            Example output structure:
-            {{
-                "directory_structure": {{
-                    "index.html": "<!DOCTYPE html>\\n<html lang=\\"en\\">...",
-                    "styles/main.css": ":root {{ --primary-color: #2563eb; }}...",
-                    "js/main.js": "import {{ initComponents }} from './modules/index.js';..."
-                }}
-            }}
-
-            Requirements:
-            - Write complete, working implementations
-            - Include actual content specific to: {self.niche_description}
-            - NO placeholder content
-            - NO external dependencies
-            """,
-            expected_output="JSON object with complete project structure.",
-            agent=setup_dev
-        )
+        setup_task = Task(description=describe("setup"), expected_output=prompts.EXPECTED_OUTPUTS["setup"],
+                          agent=setup_dev)
 
         # Task 2: Asset Collection and Optimization
-        asset_task = Task(
-            description=f"""
-            Find and optimize relevant images for {self.website_name} ({self.niche_description}).
-            Use free image sources like Unsplash, Pexels, or Pixabay.
-            Return a JSON object containing:
-            
-            1. List of required images with exact URLs:
-                - Hero section: Analytics dashboard or tech visualization
-                - Features: Tech-related icons and illustrations
-                - Team/testimonials: Professional team photos
-                - Product: Dashboard screenshots or mockups
-                - Logo/branding: Tech-focused logo ideas
-            
-            2. For each image provide:
-                - Direct image URL (no placeholders)
-                - Photographer/creator name and platform
-                - License type (must be free to use)
-                - Alt text for accessibility
-                - Recommended dimensions and formats
-                - Loading strategy (eager/lazy)
-            
-            Example structure:
-            {{
-                "images": {{
-                    "hero": {{
-                        "url": "https://images.unsplash.com/actual-image-id",
-                        "thumbnail": "https://images.unsplash.com/actual-image-id?w=400",
-                        "attribution": "John Doe on Unsplash",
-                        "license": "Unsplash License",
-                        "alt": "Modern analytics dashboard showing real-time data visualization",
-                        "sizes": {{
-                            "desktop": {{
-                                "width": 1920,
-                                "height": 1080,
-                                "format": "webp"
-                            }},
-                            "tablet": {{
-                                "width": 1024,
-                                "height": 768,
-                                "format": "webp"
-                            }},
-                            "mobile": {{
-                                "width": 640,
-                                "height": 480,
-                                "format": "webp"
-                            }}
-                        }},
-                        "loading": "eager"
-                    }},
-                    "features": [
-                        {{
-                            "url": "https://images.pexels.com/actual-image-id",
-                            "thumbnail": "https://images.pexels.com/actual-image-id?w=200",
-                            "attribution": "Jane Smith on Pexels",
-                            "license": "Pexels License",
-                            "alt": "AI-powered data analysis illustration",
-                            "sizes": {{
-                                "width": 800,
-                                "height": 600,
-                                "format": "webp"
-                            }},
-                            "loading": "lazy"
-                        }}
-                    ]
-                }}
-            }}
-
-            Search for images that specifically match: {self.niche_description}
-            Each image must have a direct, working URL - no placeholders allowed.
-            Include at least 2-3 alternative images for each section.
-            """,
-            expected_output="JSON object with complete image assets information.",
-            agent=asset_dev
-        )
+        asset_task = Task(description=describe("assets"), expected_output=prompts.EXPECTED_OUTPUTS["assets"],
+                          agent=asset_dev)
 
         # Task 3: Generate HTML and CSS Components
-        component_task = Task(
-            description=f"""
-            Generate COMPLETE, production-ready HTML components with responsive CSS for {self.website_name}.
-            Each component must work without any external dependencies.
-            The components should match this niche: {self.niche_description}
-
-            Required files and their COMPLETE implementations:
-
-            1. index.html:
-                Must include:
-                - Doctype and UTF-8 encoding
-                - Viewport meta tag
-                - SEO meta tags (description, keywords)
-                - OpenGraph tags
-                - Favicon links
-                - CSS imports in head
-                - Deferred JS imports
-                - Header with navigation
-                - Main content sections
-                - Footer with social links
-                - Actual content (no lorem ipsum)
-
-            2. components/:
-                hero.html:
-                    - Full viewport height hero section
-                    - H1 heading with clear value proposition
-                    - Subheading explaining benefits
-                    - CTA button with clear action text
-                    - Background image with gradient overlay
-                    
-                features.html:
-                    - Grid/flex layout of 4-6 key features
-                    - Icon or image for each feature
-                    - Feature title and description
-                    - CSS Grid or Flexbox layout
-                    
-                testimonials.html:
-                    - Carousel/grid of 3-4 testimonials
-                    - Customer photo, name, company
-                    - Quote with specific feedback
-                    - Navigation controls if carousel
-                    
-                pricing.html:
-                    - 3-4 pricing tiers
-                    - Most popular plan highlighted
-                    - Feature comparison list
-                    - Price with billing period
-                    - CTA button for each plan
-                    
-                contact.html:
-                    - Contact form with validation
-                    - Name, email, message fields
-                    - Submit button with loading state
-                    - Success/error messages
-                    - Company contact details
-
-            3. styles/:
-                main.css:
-                    - CSS custom properties for colors
-                    - Typography scale with rem units
-                    - Responsive breakpoints
-                    - Grid system with named areas
-                    - Utility classes for spacing
-                    - Dark/light mode support
-                    
-                components/*.css:
-                    - BEM naming convention
-                    - Mobile-first media queries
-                    - Fluid typography
-                    - CSS Grid/Flexbox layouts
-                    - Smooth transitions
-                    - Accessible focus states
-
-            Example output structure (use this exact format):
-            {{
-                "index.html": "<!DOCTYPE html>\\n<html lang=\\"en\\">\\n<head>\\n<meta charset=\\"UTF-8\\">...",
-                "components/hero.html": "<section class=\\"hero\\" aria-label=\\"Welcome\\">...",
-                "components/features.html": "<section class=\\"features\\" aria-label=\\"Features\\">...",
-                "styles/main.css": ":root {{ --primary-color: #007bff; }}...",
-                "styles/components/hero.css": ".hero {{ min-height: 100vh; }}..."
-            }}
-
-            Requirements:
-            - Use semantic HTML5 elements
-            - Include WAI-ARIA attributes
-            - Add proper alt text for images
-            - Use native lazy loading
-            - Include actual content specific to: {self.niche_description}
-            - NO placeholder content or lorem ipsum
-            - NO external dependencies
-            """,
-            expected_output="JSON object with complete HTML/CSS implementations.",
-            agent=component_dev
-        )
+        component_task = Task(description=describe("components"),
+                              expected_output=prompts.EXPECTED_OUTPUTS["components"],
+                              agent=component_dev, context=[setup_task, asset_task])
 
         # Task 4: Generate JavaScript Functionality
-        js_task = Task(
-            description=f"""
-            Create COMPLETE, production-ready vanilla JavaScript modules for {self.website_name}.
-            No external dependencies or placeholders allowed.
-            The code should implement functionality specific to: {self.niche_description}
-
-            Required modules and their full implementations:
-
-            1. js/main.js:
-                Must include:
-                - ES6 module imports
-                - DOMContentLoaded listener
-                - Feature detection
-                - Error handling setup
-                - Analytics initialization
-                - Performance monitoring
-
-            2. js/modules/imageLoader.js:
-                Must implement:
-                - Intersection Observer for lazy loading
-                - Progressive image loading
-                - Fallback for older browsers
-                - Error handling for failed loads
-                - WebP support detection
-                - Responsive image switching
-                Example: 
-                export class ImageLoader {{
-                    constructor() {{
-                        this.observer = new IntersectionObserver(...);
-                    }}
-                    init() {{
-                        // Full implementation
-                    }}
-                }}
-
-            3. js/modules/carousel.js:
-                Must implement:
-                - Touch-enabled slider
-                - Keyboard navigation
-                - A11y announcements
-                - Auto-play with pause
-                - Progress indicators
-                - Smooth animations
-
-            4. js/modules/navigation.js:
-                Must implement:
-                - Mobile menu toggle
-                - Smooth scroll to sections
-                - Active section highlighting
-                - Scroll progress indicator
-                - Sticky header logic
-                - Keyboard navigation
-
-            5. js/modules/form.js:
-                Must implement:
-                - Real-time validation
-                - Custom error messages
-                - AJAX form submission
-                - Loading states
-                - Success/error handling
-                - Input masking
-
-            6. js/modules/animations.js:
-                Must implement:
-                - Scroll-triggered animations
-                - Intersection Observer usage
-                - Performance throttling
-                - Reduced motion support
-                - CSS class toggling
-                - Animation sequences
-
-            7. js/utils/:
-                analytics.js:
-                    - Page view tracking
-                    - Event tracking
-                    - Performance monitoring
-                validation.js:
-                    - Email validation
-                    - Input sanitization
-                    - Error message handling
-                api.js:
-                    - Fetch wrapper
-                    - Error handling
-                    - Retry logic
-
-            Example structure (use this exact format):
-            {{
-                "js/main.js": "import {{ ImageLoader }} from './modules/imageLoader.js';\\n\\ndocument.addEventListener('DOMContentLoaded', () => {{\\n  // Full implementation\\n}});",
-                "js/modules/imageLoader.js": "export class ImageLoader {{\\n  constructor() {{\\n    // Full implementation\\n  }}\\n}}",
-                "js/modules/carousel.js": "export class Carousel {{\\n  // Full implementation\\n}}",
-                "js/utils/analytics.js": "export const trackEvent = (category, action, label) => {{\\n  // Full implementation\\n}}"
-            }}
-
-            Requirements:
-            - Use ES6+ features (classes, modules, async/await)
-            - Include error handling for all async operations
-            - Add performance monitoring
-            - Ensure cross-browser compatibility
-            - Include JSDoc comments
-            - NO placeholder implementations
-            - NO external dependencies
-            """,
-            expected_output="JSON object with complete JavaScript implementations.",
-            agent=js_dev
-        )
+        js_task = Task(description=describe("js_modules"), expected_output=prompts.EXPECTED_OUTPUTS["js_modules"],
+                       agent=js_dev, context=[setup_task])
 
-        return [setup_task, asset_task, component_task, js_task]
+        tasks = [setup_task, asset_task, component_task, js_task]
+        for task_type, task in zip(("setup", "assets", "components", "js_modules"), tasks):
+            self.prompt_tokens[task_type] = prompts.stage_prompt_tokens(
+                task.description, prompts.agent_prompt(self.prompt_profile, self.STAGE_AGENTS[task_type]),
+                self.MODEL_NAME)
+        return tasks
+
+    def create_section_task(self, component_dev, sections: List[str], context: List[Task]) -> Task:
+        """A components task limited to the given sections, for regenerating them on their own."""
+        existing = sorted(self.generated_code.get("html_components", {})) + sorted(self.generated_code.get("css_components", {}))
+        return Task(
+            description=prompts.section_prompt(self.prompt_profile, self.website_name, self.niche_description,
+                                               tuple(sections), tuple(existing)),
+            expected_output=prompts.EXPECTED_OUTPUTS["sections"],
+            agent=component_dev,
+            context=context
+        )
 
     def compile_output(self, task_results): # Changed parameter name for clarity
         """Compile the generated code and instructions into a structured format"""
@@ -711,222 +573,549 @@ body {
         return {
             'project_name': self.website_name,
             'description': self.niche_description,
+            'output_dir': self.output_dir,
             'setup_instructions': self.setup_instructions, # Basic setup steps
             'generated_code': self.generated_code, # Contains config, components, types
+            'timeline': self.timeline, # Per-stage timing and critical path
+            'task_states': self.task_states, # Completion and retry count per stage
+            'usage': self.usage_report['total'] if self.usage_report else None, # Tokens, cost and latency
+            'validation': self.validation_report, # Syntax diagnostics per stage and file
+            'prompts': {'profile': self.prompt_profile, 'tokens': self.prompt_tokens}, # Prompt size per stage
             'documentation': documentation_content # Full markdown docs
         }
 
-    def run(self):
+    def execute_stage(self, task_type: str, task: Task, part: Optional[str] = None):
+        """Run a single task in its own crew, retrying only this stage until its output is accepted.
+
+        part names one subtask of a fanned-out stage, which is accepted and retried on its own
+        under the task state "<task_type>/<part>".
+        """
+        key = f"{task_type}/{part}" if part else task_type
+        self.task_states.setdefault(key, {"completed": False, "retries": 0})
+        self.accepted_files.pop(key, None)
+        self.rejected_files.pop(key, None)
+        # Drop context from upstream stages that produced nothing so the task still runs
+        if task.context:
+            task.context = [t for t in task.context if t.output] or None
+
+        base_description = task.description
+        current = task
+        while True:
+            result = None
+            accepted = False
+            attempt = self.task_states[key]["retries"] + 1
+            try:
+                with self.usage.stage(task_type, attempt):
+                    stage_crew = Crew(agents=[current.agent], tasks=[current], verbose=2)
+                    result = stage_crew.kickoff()
+                if result:
+                    print(f"✓ {key} task completed by agent")
+                    if part:
+                        accepted = self.store_part(result, task_type, part)
+                    else:
+                        accepted = self.store_generated_content(result, task_type)
+                else:
+                    print(f"⚠ {key} task returned no result")
+                # A complete response has reached every file the stage returns
+                self.unfinished_stages.discard(key)
+            except BudgetExceededError as e:
+                # Retrying cannot help once the run is out of budget
+                print(f"⚠ {key} task aborted: {str(e)}")
+                self.repair_requests.pop(key, None)
+                task.output = None
+                raise
+            except PlaceholderContentError as e:
+                print(f"⚠ {key} response cancelled: {str(e)}")
+                if self.file_repair and task_type in self.FILE_STAGES:
+                    self.store_cancelled(task_type, part, e)
+            except Exception as e:
+                print(f"⚠ Error during {key} task execution: {str(e)}")
+
+            if not self.update_task_state(key, accepted):
+                break
+
+            retries = self.task_states[key]["retries"]
+            delay = self.retry_backoff * (2 ** (retries - 1)) * random.uniform(0.75, 1.25)
+            print(f"  Retrying {key} task in {delay:.1f}s")
+            time.sleep(delay)
+            # A changed prompt keeps the retry from being served the rejected response from the LLM cache
+            if self.file_repair and self.rejected_files.get(key) and self.accepted_files.get(key):
+                # Only the rejected files are asked for again; the accepted ones are kept
+                current = self.create_repair_task(key, task, retries + 1)
+                self.repair_requests[key] = set(self.rejected_files[key])
+                print(f"  Repairing only {', '.join(self.rejected_files[key])}")
+            else:
+                current = task
+                self.repair_requests.pop(key, None)
+                task.description = base_description + self.RETRY_NOTE.format(attempt=retries + 1)
+
+        self.repair_requests.pop(key, None)
+        self.unfinished_stages.discard(key)
+        if not accepted:
+            # Downstream stages should not build on output that was rejected
+            task.output = None
+            return None
+        if current is not task:
+            # The stage's result stands for all of its files, not just the repaired ones
+            result = self.stage_result(key)
+            task.output = TaskOutput(description=task.description, result=result)
+        return result
+
+    def execute_components_fanout(self, task: Task):
+        """Run the components stage as concurrent subtasks, one per section plus one for the page
+        shell and shared styles, and merge their files into html_components and css_components.
+
+        Every subtask gets the design tokens of the setup stylesheets and the images of its own
+        section instead of the whole upstream output, and a rejected subtask is retried alone.
+        The stage is accepted once every subtask is; otherwise the accepted files are still kept
+        for this run's output but the stage is not recorded as complete.
+        """
+        setup_files = self.generated_code.get("directory_structure")
+        tokens = design_tokens(setup_files) if isinstance(setup_files, dict) else {}
+        token_text = "; ".join(f"{name}: {value}" for name, value in tokens.items()) or "none yet, define them on :root"
+        images = section_images(self.generated_code.get("images"))
+        parts = self.component_parts()
+        subtasks = {}
+        for part in parts:
+            section_images_text = ""
+            if images.get(part):
+                # Alternatives only matter to the image pipeline
+                section_images_text = json.dumps([{k: v for k, v in image.items() if k != "alternatives"}
+                                                  for image in images[part]])
+            subtasks[part] = Task(
+                description=prompts.part_prompt(self.prompt_profile, self.website_name, self.niche_description, part,
+                                                tuple(self.SECTIONS), token_text, section_images_text),
+                expected_output=prompts.EXPECTED_OUTPUTS["part"],
+                agent=self.create_agent("component_dev"),
+            )
+
+        self.part_files = {}
+        for part in parts:
+            self.task_states[f"components/{part}"] = {"completed": False, "retries": 0}
+        print(f"\nGenerating components as {len(parts)} concurrent subtasks ({len(tokens)} design tokens shared)")
+        with ThreadPoolExecutor(max_workers=len(parts)) as pool:
+            futures = {part: pool.submit(self.execute_stage, "components", subtask, part)
+                       for part, subtask in subtasks.items()}
+            errors = {}
+            for part, future in futures.items():
+                try:
+                    future.result()
+                except BudgetExceededError as e:
+                    errors[part] = e
+        failed = [part for part in parts if not self.task_states[f"components/{part}"]["completed"]]
+
+        html_files, css_files = {}, {}
+        for part in parts:
+            for path, content in self.part_files.get(part, {}).items():
+                (html_files if path.endswith(".html") else css_files)[path] = content
+        if html_files:
+            self.generated_code["html_components"] = html_files
+        if css_files:
+            self.generated_code["css_components"] = css_files
+        state = self.task_states["components"]
+        state["retries"] = max(self.task_states[f"components/{part}"]["retries"] for part in parts)
+        if errors:
+            raise next(iter(errors.values()))
+        if failed:
+            print(f"⚠ components stage incomplete: {', '.join(failed)} failed, keeping the "
+                  f"{len(parts) - len(failed)} accepted parts for this run")
+            task.output = None
+            return None
+
+        state["completed"] = True
+        print(f"✓ Stored {len(html_files)} HTML components and {len(css_files)} CSS files from {len(parts)} subtasks")
+        result = json.dumps({**html_files, **css_files}, indent=2)
+        task.output = TaskOutput(description=task.description, result=result)
+        return result
+
+    def check_image_liveness(self, image_data):
+        """Replace images whose URL does not resolve with a live alternative, or drop them."""
+        urls = [url for url in candidate_urls(image_data) if self.validate_image_url(url)]
+        alive = self.liveness.check(urls)
+        image_data, replaced, dropped = apply_liveness(image_data, alive)
+        stats = self.liveness.stats
+        print(f"✓ Checked {len(alive)} image URLs ({stats['cached']} cached, {stats['dead']} dead): "
+              f"{replaced} replaced by alternatives, {dropped} dropped")
+        if stats["unknown"]:
+            print(f"⚠ {stats['unknown']} image URLs could not be checked (network or server errors); kept as they are")
+        return image_data
+
+    def fetch_assets(self):
+        """Download the chosen images and render their responsive variants."""
+        if "images" not in self.generated_code:
+            print("⚠ No image assets to download")
+            return None
+        # Annotate a copy so the stored asset output (and its hash) stays as the agent returned it
+        images = copy.deepcopy(self.generated_code["images"])
+        self.image_files = self.image_pipeline.run(images)
+        if not self.image_files:
+            return None
+        self.image_metadata = images
+        self.processed_images = self.image_pipeline.processed
+        stats = self.image_pipeline.stats
+        print(f"✓ Downloaded {stats['downloaded']} images into {stats['variants']} variants "
+              f"({stats['bytes_in'] // 1024} KB in, {stats['bytes_out'] // 1024} KB out)")
+        print(f"  {stats['reused']} images and {stats['variants_reused']} variants reused from the image index, "
+              f"{stats['duplicates']} duplicate sections moved to an alternative")
+        return stats
+
+    def stage_input_hash(self, task_type: str, task: Task) -> str:
+        """Hash of everything that determines a stage's output: its prompt, the prompt version,
+        the model and the outputs of the stages it depends on."""
+        return hash_payload({
+            "stage": task_type,
+            "description": task.description,
+            "expected_output": task.expected_output,
+            "prompt_version": self.PROMPT_VERSION,
+            "model": self.MODEL_NAME,
+            # Fan-out asks for the same files with different prompts
+            **({"fanout": True} if task_type == "components" and self.component_fanout else {}),
+            "upstream": {dep: (self.manifest.stage(dep) or {}).get("output_hash")
+                         for dep in self.TASK_DEPENDENCIES[task_type]},
+        })
+
+    def record_stage(self, task_type: str, input_hash: str, result: str):
+        output = {key: self.generated_code[key] for key in self.STAGE_OUTPUT_KEYS[task_type] if key in self.generated_code}
+        self.manifest.record_stage(task_type, input_hash, str(result), output)
+        if self.job_store:
+            try:
+                self.job_store.save_stage(self.job_id, task_type, input_hash, str(result), output)
+            except Exception as e:
+                # Losing a checkpoint only costs a rerun of this stage on resume
+                print(f"⚠ Could not checkpoint {task_type}: {type(e).__name__} {e}")
+
+    def run_stage(self, task_type: str, task: Task, previous: Optional[RunManifest] = None,
+                  force: bool = False, sections: Optional[List[str]] = None):
+        """Run a stage, or reuse its output from the previous run when its inputs are unchanged."""
+        input_hash = self.stage_input_hash(task_type, task)
+        cached = previous.stage(task_type) if previous else None
+
+        if cached and not force and cached["input_hash"] == input_hash:
+            for key, value in cached["output"].items():
+                self.generated_code[key] = value
+            task.output = TaskOutput(description=task.description, result=cached["result"])
+            self.task_states[task_type]["completed"] = True
+            self.task_states[task_type]["reused"] = True
+            print(f"✓ {task_type} inputs unchanged, reusing previous output")
+            result = cached["result"]
+
+            if sections and task_type == "components":
+                section_task = self.create_section_task(task.agent, sections, task.context or [])
+                self.merge_stages.add(task_type)
+                try:
+                    section_result = self.execute_stage(task_type, section_task)
+                finally:
+                    self.merge_stages.discard(task_type)
+                if section_result is None:
+                    print(f"⚠ Keeping the previous {', '.join(sections)} section(s)")
+                else:
+                    # The stored result stands for the whole stage, so rebuild it from the merged files
+                    result = json.dumps({**self.generated_code.get("html_components", {}),
+                                         **self.generated_code.get("css_components", {})}, indent=2)
+                    task.output = TaskOutput(description=task.description, result=result)
+        elif task_type == "components" and self.component_fanout:
+            result = self.execute_components_fanout(task)
+        else:
+            result = self.execute_stage(task_type, task)
+
+        if result:
+            self.record_stage(task_type, input_hash, result)
+        return result
+
+    def regenerate(self, stages: Optional[List[str]] = None, sections: Optional[List[str]] = None):
+        """Regenerate the site, rerunning only the stages whose inputs changed since the last run.
+
+        stages forces the named stages to rerun; sections regenerates only those landing page
+        sections (e.g. ["pricing"]) and keeps the other components. Falls back to a full run
+        when there is no previous run to build on.
+        """
+        unknown = [s for s in stages or [] if s not in self.TASK_DEPENDENCIES]
+        unknown += [s for s in sections or [] if s not in self.SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown stages or sections: {', '.join(unknown)}")
+
+        previous = RunManifest.load(self.state_dir)
+        if previous is None:
+            print("⚠ No previous run found, generating from scratch")
+            return self.run()
+        return self.run(previous=previous, force=stages, sections=sections)
+
+    @classmethod
+    def from_job(cls, job_id: str, output_root=None) -> "LandingPageCrew":
+        """Rebuild the crew of a checkpointed job from the job store under output_root."""
+        store = JobStore.from_env(os.path.join(os.path.abspath(output_root or ""), STATE_DIR_NAME))
+        job = store.job(job_id) if store else None
+        if job is None:
+            raise ValueError(f"Unknown job: {job_id}")
+        return cls(job["website_name"], job["niche_description"], output_root=os.path.dirname(job["output_dir"]),
+                   prompt_profile=job["prompt_profile"], job_id=job_id)
+
+    def resume(self):
+        """Continue this crew's job, reusing every stage it already completed and rerunning the rest."""
+        if self.job_store is None:
+            raise ValueError("Checkpoints are disabled (LANDING_JOB_DB=off), there is nothing to resume")
+        previous = self.job_store.manifest(self.job_id, self.state_dir)
+        done = ", ".join(previous.stages) or "none"
+        print(f"Resuming job {self.job_id} for {self.website_name} (completed stages: {done})")
+        return self.run(previous=previous)
+
+    def finish_job(self, status: str, error: Optional[str] = None):
+        if self.job_store:
+            try:
+                self.job_store.finish_job(self.job_id, status, error)
+            except Exception as e:
+                print(f"⚠ Could not record job status: {type(e).__name__} {e}")
+
+    def cancel(self, reason: str = "cancelled by request"):
+        """Abort the run from another thread. LLM calls already in flight finish; the next one
+        raises, so no stage is retried and run() returns None."""
+        self.usage.cancel(reason)
+
+    def run(self, previous: Optional[RunManifest] = None, force: Optional[List[str]] = None,
+            sections: Optional[List[str]] = None):
         try:
+            self.usage.reset()
+            self.manifest = RunManifest(self.state_dir)
+            if self.job_store:
+                try:
+                    self.job_store.start_job(self.job_id, self.website_name, self.niche_description,
+                                             os.path.abspath(self.output_dir), self.prompt_profile)
+                except Exception as e:
+                    print(f"⚠ Job store unavailable, running without checkpoints: {type(e).__name__} {e}")
+                    self.job_store = None
+
             # Create agents
             setup_dev, component_dev, js_dev, asset_dev = self.create_agents()
 
             # Create tasks
             tasks = self.create_tasks(setup_dev, component_dev, js_dev, asset_dev)
+            task_types = ["setup", "assets", "components", "js_modules"]
 
-            # Create crew
-            crew = Crew(
-                agents=[setup_dev, component_dev, js_dev, asset_dev],
-                tasks=tasks,
-                verbose=2
-            )
+            # Build the task graph so independent stages run concurrently
+            graph = TaskGraph()
+            for task_type, task in zip(task_types, tasks):
+                graph.add(task_type,
+                          lambda t=task_type, task=task: self.run_stage(t, task, previous, t in (force or []), sections),
+                          depends_on=self.TASK_DEPENDENCIES[task_type])
+            if self.fetch_images:
+                graph.add("asset_fetch", self.fetch_assets, depends_on=["assets"])
 
             print("\nStarting landing page generation for:", self.website_name)
             print("Description:", self.niche_description)
+            print("Job:", self.job_id)
+            print(f"Prompts ({self.prompt_profile}): " + ", ".join(f"{stage} {tokens}"
+                                                             for stage, tokens in self.prompt_tokens.items()) + " tokens")
 
             # Let the agents do their work through CrewAI
-            try:
-                results = crew.kickoff()
-                
-                # Process results based on task order
-                task_types = ["setup", "assets", "components", "js_modules"]
-                for i, task_type in enumerate(task_types):
-                    result = results[i] if isinstance(results, list) and i < len(results) else None
-                    if result:
-                        print(f"✓ {task_type} task completed by agent")
-                        self.store_generated_content(result, task_type)
-                    else:
-                        print(f"⚠ {task_type} task returned no result")
+            timeline = graph.run()
+            for entry in timeline.values():
+                if entry["error"]:
+                    print(f"⚠ Error during {entry['stage']} task execution: {entry['error']}")
 
-            except Exception as e:
-                print(f"⚠ Error during task execution: {str(e)}")
+            self.timeline = summarize_timeline(timeline)
+            print("\nTask timeline:")
+            print("\n".join(format_timeline(self.timeline)))
+
+            cache_stats = self.llm_cache.stats()
+            print(f"  LLM cache ({cache_stats['mode']}): {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+            if self.rate_limiter:
+                governor = self.rate_limiter.snapshot()
+                print(f"  Rate limiter: concurrency limit {governor['limit']}, {governor['throttled']} calls throttled "
+                      f"and {governor['wait_seconds']:.1f}s spent waiting in this process")
+            pool = self.llm_pool.snapshot()
+            print(f"  LLM connections: {pool['connections_opened']} opened for {pool['requests']} requests "
+                  f"in this process ({'HTTP/2' if pool['http2'] else 'HTTP/1.1'}, peak {pool['peak_in_flight']} in flight)")
+
+            self.usage_report = self.usage.summary(agents=self.STAGE_AGENTS)
+            print("\nLLM usage:")
+            for stage, stats in self.usage_report["stages"].items():
+                print(f"  {stage:<12} {stats['calls']} calls, {stats['total_tokens']} tokens, "
+                      f"${stats['cost']:.4f}, {stats['llm_seconds']:.1f}s, {stats['retries']} retries")
+            total = self.usage_report["total"]
+            print(f"  {'total':<12} {total['calls']} calls, {total['total_tokens']} tokens, ${total['cost']:.4f}")
+
+            if self.usage_report["budget_exceeded"] or not any(entry["result"] for entry in timeline.values()):
+                if self.usage_report["budget_exceeded"]:
+                    print(f"⚠ Generation aborted: {self.usage_report['budget_exceeded']}")
+                else:
+                    print("⚠ No task produced any output")
+                # Nothing is published, but the usage of the failed run is still recorded beside the site
+                report_path = os.path.join(self.state_dir, "usage_report.json")
+                self.usage.write_report(report_path, agents=self.STAGE_AGENTS)
+                print(f"  Usage report of the failed run: {report_path}")
+                self.finish_job("cancelled" if self.usage.cancelled else "failed",
+                                self.usage_report["budget_exceeded"] or "no task produced any output")
                 return None
 
             # Compile final output
-            output = self.compile_output(results if isinstance(results, list) else [results])
+            output = self.compile_output([timeline[t]["result"] for t in task_types])
 
             # Write files
             print("\nWriting generated files...")
-            self.write_output_to_files(output)
+            if self.write_output_to_files(output) is not None:
+                self.manifest.data["inputs"] = {
+                    "website_name": self.website_name,
+                    "niche_description": self.niche_description,
+                    "prompt_version": self.PROMPT_VERSION,
+                    "prompt_profile": self.prompt_profile,
+                    "model": self.MODEL_NAME,
+                }
+                self.manifest.save()
 
             print(f"\n✓ Landing page generation completed for {self.website_name}")
+            self.finish_job("succeeded")
             return output
 
         except Exception as e:
             print(f"\n⚠ Error during landing page generation: {str(e)}")
             import traceback
             traceback.print_exc()
+            self.finish_job("failed", f"{type(e).__name__}: {e}")
             return None
 
+    def collect_output_files(self, output) -> Dict[str, str]:
+        """Map every file of the generated site to its path relative to the site root."""
+        files = {}
+
+        # Setup instructions
+        setup_instructions = [
+            "# Project Setup Instructions",
+            "",
+            "1. Set up project directories:",
+            f"   - Create directory: {self.website_name.lower()}",
+            "   - Create subdirectories: styles/, js/, images/, components/",
+            "",
+            "2. Copy website files:",
+            "   - Place HTML files in the root directory",
+            "   - Copy CSS files to styles/",
+            "   - Copy JavaScript files to js/",
+            "",
+            "3. Set up images:",
+            *([
+                "   - Responsive WebP variants are already in images/",
+                "   - Use the src and srcset of each image in images/images.json in the HTML",
+            ] if self.image_files else [
+                "   - Download the images from URLs in images/images.json",
+                "   - Place them in the images/ directory",
+                "   - Update HTML files with correct image paths",
+            ]),
+            "",
+            "4. Start development:",
+            "   - Open index.html in a web browser",
+            "   - Test all components and features",
+            "   - Verify responsive design",
+            "   - Check image loading performance"
+        ]
+        files["SETUP.md"] = "\n".join(setup_instructions)
+
+        generated_code = output.get("generated_code", {})
+
+        # Project structure files
+        for filepath, content in generated_code.get("directory_structure", {}).items():
+            files[site_path(filepath)] = content if isinstance(content, str) else str(content)
+
+        # Image assets index and attribution
+        if "images" in generated_code:
+            files["images/images.json"] = json.dumps(self.image_metadata or generated_code["images"], indent=2)
+            files.update(self.image_files)
+            attribution_md = ["# Image Attributions", ""]
+            for section, images in generated_code["images"].items():
+                if isinstance(images, dict):
+                    attribution_md.extend([
+                        f"## {section.title()}",
+                        f"- Source: {images.get('url', 'Unknown')}",
+                        f"- Attribution: {images.get('attribution', 'Unknown')}",
+                        f"- License: {images.get('license', 'Unknown')}",
+                        ""
+                    ])
+                elif isinstance(images, list):
+                    attribution_md.append(f"## {section.title()}")
+                    for img in images:
+                        attribution_md.extend([
+                            f"- Source: {img.get('url', 'Unknown')}",
+                            f"  Attribution: {img.get('attribution', 'Unknown')}",
+                            f"  License: {img.get('license', 'Unknown')}",
+                            ""
+                        ])
+            files["images/ATTRIBUTION.md"] = "\n".join(attribution_md)
+
+        # Usage report of the run that produced this version of the site
+        if self.usage_report:
+            files["usage_report.json"] = json.dumps(self.usage_report, indent=2)
+
+        # Components, styles and scripts; agents return root-relative paths such as
+        # "components/hero.html", so only bare file names get the category folder
+        for category, folder in (("html_components", "components"), ("css_components", "styles"), ("js_modules", "js")):
+            for name, content in generated_code.get(category, {}).items():
+                files[site_path(name, folder)] = content
+
+        if self.assemble_index and any(path.startswith("components/") for path in files):
+            assembler = PageAssembler(self.SECTIONS, self.image_metadata or generated_code.get("images"))
+            files["index.html"] = assembler.assemble(files, title=self.website_name)
+            stats = assembler.stats
+            print(f"✓ Assembled index.html from {stats['sections']} sections "
+                  f"({stats['critical_bytes']} bytes of critical CSS inlined, "
+                  f"{stats['deferred_stylesheets']} stylesheets deferred, {stats['images']} images hinted)")
+
+        return files
+
+    def build_production(self, files: Dict[str, Union[str, bytes]]) -> Dict[str, bytes]:
+        """The dist/ files of the production copy of the site, to be written with it; prints the size report."""
+        print("\nBuilding production assets...")
+        bundler = Bundler(workers=int(os.getenv("SITE_WRITER_WORKERS", "8")))
+        try:
+            dist = bundler.dist_files(files)
+        except Exception as e:
+            # The unminified site is published either way, so a failed build is not fatal
+            print(f"⚠ Production build failed: {type(e).__name__} {e}")
+            return {}
+        self.build_report = {"assets": bundler.report}
+        print("\n".join(bundler.format_report()))
+        return dist
+
     def write_output_to_files(self, output):
         """Write the generated code and documentation to files"""
-        output_dir = self.website_name.lower() + "_generated"
-        os.makedirs(output_dir, exist_ok=True)
+        output_dir = self.output_dir
         print("\nAttempting to write generated files to: " + output_dir)
 
         try:
-            # Write setup instructions
-            setup_md_path = os.path.join(output_dir, "SETUP.md")
-            setup_instructions = [
-                "# Project Setup Instructions",
-                "",
-                "1. Set up project directories:",
-                f"   - Create directory: {self.website_name.lower()}",
-                "   - Create subdirectories: styles/, js/, images/, components/",
-                "",
-                "2. Copy website files:",
-                "   - Place HTML files in the root directory",
-                "   - Copy CSS files to styles/",
-                "   - Copy JavaScript files to js/",
-                "",
-                "3. Set up images:",
-                "   - Download the images from URLs in images/images.json",
-                "   - Place them in the images/ directory",
-                "   - Update HTML files with correct image paths",
-                "",
-                "4. Start development:",
-                "   - Open index.html in a web browser",
-                "   - Test all components and features",
-                "   - Verify responsive design",
-                "   - Check image loading performance"
-            ]
-            with open(setup_md_path, "w", encoding='utf-8') as f:
-                f.write("\n".join(setup_instructions))
-            print("  - Wrote " + setup_md_path)
-
-            generated_code = output.get("generated_code", {})
-
-            # Write project structure files
-            if "directory_structure" in generated_code:
-                for filepath, content in generated_code["directory_structure"].items():
-                    full_path = os.path.join(output_dir, filepath)
-                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                    try:
-                        with open(full_path, "w", encoding='utf-8') as f:
-                            f.write(content if isinstance(content, str) else str(content))
-                        print(f"  ✓ Created file: {filepath}")
-                    except Exception as e:
-                        print(f"  ⚠ Error writing file {filepath}: {str(e)}")
-
-            # Write image assets information
-            if "images" in generated_code:
-                images_dir = os.path.join(output_dir, "images")
-                os.makedirs(images_dir, exist_ok=True)
-                
-                # Write image metadata
-                images_json_path = os.path.join(images_dir, "images.json")
-                try:
-                    with open(images_json_path, "w", encoding='utf-8') as f:
-                        json.dump(generated_code["images"], f, indent=2)
-                    print("  ✓ Created image assets index: images.json")
-                    
-                    # Create image attribution file
-                    attribution_md = ["# Image Attributions", ""]
-                    for section, images in generated_code["images"].items():
-                        if isinstance(images, dict):
-                            attribution_md.extend([
-                                f"## {section.title()}",
-                                f"- Source: {images.get('url', 'Unknown')}",
-                                f"- Attribution: {images.get('attribution', 'Unknown')}",
-                                f"- License: {images.get('license', 'Unknown')}",
-                                ""
-                            ])
-                        elif isinstance(images, list):
-                            attribution_md.append(f"## {section.title()}")
-                            for img in images:
-                                attribution_md.extend([
-                                    f"- Source: {img.get('url', 'Unknown')}",
-                                    f"  Attribution: {img.get('attribution', 'Unknown')}",
-                                    f"  License: {img.get('license', 'Unknown')}",
-                                    ""
-                                ])
-                    
-                    attribution_path = os.path.join(images_dir, "ATTRIBUTION.md")
-                    with open(attribution_path, "w", encoding='utf-8') as f:
-                        f.write("\n".join(attribution_md))
-                    print("  ✓ Created image attribution file: images/ATTRIBUTION.md")
-                    
-                except Exception as e:
-                    print(f"  ⚠ Error writing image assets: {str(e)}")
-
-            # Write HTML components
-            if "html_components" in generated_code:
-                components_dir = os.path.join(output_dir, "components")
-                os.makedirs(components_dir, exist_ok=True)
-                for name, content in generated_code["html_components"].items():
-                    filepath = os.path.join(components_dir, name)
-                    try:
-                        with open(filepath, "w", encoding='utf-8') as f:
-                            f.write(content)
-                        print(f"  ✓ Created component: {name}")
-                    except Exception as e:
-                        print(f"  ⚠ Error writing component {name}: {str(e)}")
-
-            # Write CSS files
-            if "css_components" in generated_code:
-                styles_dir = os.path.join(output_dir, "styles")
-                os.makedirs(styles_dir, exist_ok=True)
-                for name, content in generated_code["css_components"].items():
-                    filepath = os.path.join(styles_dir, name)
-                    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-                    try:
-                        with open(filepath, "w", encoding='utf-8') as f:
-                            f.write(content)
-                        print(f"  ✓ Created CSS: {name}")
-                    except Exception as e:
-                        print(f"  ⚠ Error writing CSS {name}: {str(e)}")
-
-            # Write JavaScript modules
-            if "js_modules" in generated_code:
-                js_dir = os.path.join(output_dir, "js")
-                os.makedirs(js_dir, exist_ok=True)
-                for name, content in generated_code["js_modules"].items():
-                    filepath = os.path.join(js_dir, name)
-                    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-                    try:
-                        with open(filepath, "w", encoding='utf-8') as f:
-                            f.write(content)
-                        print(f"  ✓ Created JS module: {name}")
-                    except Exception as e:
-                        print(f"  ⚠ Error writing JS module {name}: {str(e)}")
+            files = self.collect_output_files(output)
+            dist = self.build_production(files) if self.build_dist else {}
+
+            # Files, dist/ included, are staged in a temporary directory and swapped into place in
+            # one step; files identical to the previous run are reused rather than rewritten
+            writer = SiteWriter(output_dir, workers=int(os.getenv("SITE_WRITER_WORKERS", "8")))
+            stats = writer.write({**files, **dist})
+            for filepath in sorted(files):
+                print(f"  ✓ Created file: {filepath}")
+            if dist:
+                print(f"  ✓ Production build: {len(dist)} files in {os.path.join(output_dir, Bundler.DIST_DIR)}")
 
             # Print summary
             print("\nFile generation summary:")
             print(f"  Project root: {output_dir}")
-            print("  Structure:")
-            print("    ├── index.html")
-            print("    ├── components/")
-            print("    │   ├── hero.html")
-            print("    │   ├── features.html")
-            print("    │   ├── testimonials.html")
-            print("    │   └── contact.html")
-            print("    ├── styles/")
-            print("    │   ├── main.css")
-            print("    │   └── components/")
-            print("    ├── js/")
-            print("    │   ├── main.js")
-            print("    │   └── modules/")
-            print("    └── images/")
-            print("        ├── images.json")
-            print("        └── ATTRIBUTION.md")
+            print(f"  Files: {stats['written']} written, {stats['unchanged']} unchanged, "
+                  f"{stats['duplicates']} linked duplicates, {stats['removed']} removed ({stats['bytes_written']} bytes in {stats['seconds']:.2f}s)")
             print("\n✓ File generation completed successfully")
+            return stats
 
         except Exception as e:
             print("Error during file writing: " + str(e))
             import traceback
             traceback.print_exc()
+            return None
+
+def resume(job_id: str, output_root=None):
+    """Resume a generation that stopped part way, rerunning only the stages it had not completed."""
+    return LandingPageCrew.from_job(job_id, output_root=output_root).resume()
+
 
 if __name__ == "__main__": 
+    if len(sys.argv) > 2 and sys.argv[1] == "--resume":
+        # python crew.py --resume <job_id> [output_root]
+        print(resume(sys.argv[2], *sys.argv[3:4]))
+        sys.exit(0)
+
     # Example usage
     website_name = "TechTrend"
     niche_description = "A SaaS platform for tech startups offering AI-driven analytics"
@@ -0,0 +1,161 @@
+import io
+import os
+import json
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it only exact URL and content matches are found
+    Image = None
+
+# Query parameters that only select a size, crop, format or tracking id of the same photo
+VARIANT_PARAMS = {"w", "h", "q", "fit", "crop", "auto", "fm", "dpr", "cs", "ixlib", "ixid", "width", "height",
+                  "quality", "format"}
+
+_file_lock = threading.Lock()
+
+
+@lru_cache(maxsize=4096)
+def normalize_url(url: str) -> str:
+    """Reduce an image URL to the photo it names.
+
+    Scheme and host are lowercased, default ports, fragments and trailing slashes dropped,
+    and size/format/tracking parameters removed, so "https://images.unsplash.com/photo-1?w=800"
+    and "https://IMAGES.unsplash.com/photo-1?w=1600&q=80" are the same key.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if parts.port and not (parts.scheme == "http" and parts.port == 80 or parts.scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in VARIANT_PARAMS and not k.lower().startswith("utm_"))
+    return urlunsplit((parts.scheme.lower(), host, parts.path.rstrip("/") or "/", urlencode(query), ""))
+
+
+def dhash(data: bytes) -> Optional[int]:
+    """64-bit difference hash: which of each pair of horizontally adjacent pixels is brighter
+    in a 9x8 grayscale thumbnail. Re-encoded, resized or lightly recompressed copies of a
+    photo differ in only a few bits."""
+    if Image is None:
+        return None
+    with Image.open(io.BytesIO(data)) as source:
+        source.draft("L", (64, 64))
+        pixels = list(source.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class ImageIndex:
+    """Persistent store of downloaded images and their rendered variants, shared by every site
+    generated under the same output root.
+
+    Images are keyed by content hash. Each normalized URL maps to the key of the image it
+    returned, and an image whose perceptual hash is within `max_distance` bits of an indexed
+    one maps to that image instead of being stored again. Sources and variants are kept as
+    files beside index.json, so each unique image is downloaded, resized and stored once.
+    """
+
+    def __init__(self, root: str, max_distance: int = 5):
+        self.root = root
+        self.max_distance = max_distance
+        self.data = self._read()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.root, "index.json")
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"urls": {}, "images": {}}
+
+    def _write_blob(self, name: str, data: bytes):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _read_blob(self, name: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.root, name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Key of the stored image a URL resolved to, if its source is still on disk."""
+        key = self.data["urls"].get(normalize_url(url))
+        image = self.data["images"].get(key) if key else None
+        if image and os.path.exists(os.path.join(self.root, image["source"])):
+            return key
+        return None
+
+    def similar(self, phash: Optional[int]) -> Optional[str]:
+        if phash is None:
+            return None
+        best, best_distance = None, self.max_distance + 1
+        for key, image in self.data["images"].items():
+            if image.get("phash") is None:
+                continue
+            distance = hamming(phash, int(image["phash"], 16))
+            if distance < best_distance:
+                best, best_distance = key, distance
+        return best
+
+    def add(self, url: str, data: bytes, phash: Optional[int]) -> Tuple[str, bool]:
+        """Record that `url` returned `data`. Returns the image key and whether it was already
+        stored, either byte for byte or as a perceptual duplicate."""
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        key = digest if digest in self.data["images"] else self.similar(phash)
+        known = key is not None
+        if not known:
+            key = digest
+            self._write_blob(f"{key}.src", data)
+            self.data["images"][key] = {"url": url, "phash": None if phash is None else f"{phash:016x}",
+                                        "source": f"{key}.src", "bytes": len(data), "variants": {}}
+        self.data["urls"][normalize_url(url)] = key
+        return key, known
+
+    def source(self, key: str) -> Optional[bytes]:
+        return self._read_blob(self.data["images"][key]["source"])
+
+    def variant(self, key: str, spec: str) -> Optional[Tuple[bytes, int, int]]:
+        stored = self.data["images"][key]["variants"].get(spec)
+        content = self._read_blob(stored["file"]) if stored else None
+        return (content, stored["width"], stored["height"]) if content is not None else None
+
+    def put_variant(self, key: str, spec: str, content: bytes, width: int, height: int):
+        name = f"{key}-{spec}"
+        self._write_blob(name, content)
+        self.data["images"][key]["variants"][spec] = {"file": name, "width": width, "height": height}
+
+    def save(self):
+        """Merge with whatever other runs wrote since we loaded, then replace the file atomically."""
+        with _file_lock:
+            merged = self._read()
+            merged["urls"].update(self.data["urls"])
+            for key, image in self.data["images"].items():
+                existing = merged["images"].setdefault(key, image)
+                if existing is not image:
+                    existing["variants"].update(image["variants"])
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(merged, f)
+            os.replace(tmp_path, self.path)
+            self.data = merged
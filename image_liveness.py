@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from image_pipeline import candidates, iter_images, mirror_url, parse_mirrors, with_alternative
+
+# Statuses that mean the server does not support HEAD, so a ranged GET is tried instead
+HEAD_UNSUPPORTED = {403, 405, 501}
+
+_file_lock = threading.Lock()
+
+
+class LivenessCache:
+    """Persistent URL -> alive/dead results with separate TTLs for positive and negative entries.
+
+    The file is shared by every site generated under the same output root, so an image used
+    by several sites or sections is checked once per TTL.
+    """
+
+    def __init__(self, path: str, ttl_alive: float = 7 * 24 * 3600, ttl_dead: float = 24 * 3600):
+        self.path = path
+        self.ttl_alive = ttl_alive
+        self.ttl_dead = ttl_dead
+        self.entries: Dict[str, Dict[str, Any]] = self._read()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, url: str) -> Optional[bool]:
+        entry = self.entries.get(url)
+        if not entry:
+            return None
+        ttl = self.ttl_alive if entry["alive"] else self.ttl_dead
+        if time.time() - entry["checked"] > ttl:
+            return None
+        return entry["alive"]
+
+    def put(self, url: str, alive: bool, status: Optional[int]):
+        self.entries[url] = {"alive": alive, "status": status, "checked": time.time()}
+
+    def save(self):
+        """Merge with whatever other runs wrote since we loaded, then replace the file atomically."""
+        with _file_lock:
+            merged = self._read()
+            for url, entry in self.entries.items():
+                if url not in merged or merged[url]["checked"] < entry["checked"]:
+                    merged[url] = entry
+            now = time.time()
+            merged = {url: e for url, e in merged.items()
+                      if now - e["checked"] <= (self.ttl_alive if e["alive"] else self.ttl_dead)}
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(merged, f)
+            os.replace(tmp_path, self.path)
+            self.entries = merged
+
+
+class LivenessChecker:
+    """Checks that image URLs resolve, concurrently and through a persistent result cache.
+
+    Each URL gets a HEAD request; servers that reject HEAD get a GET for the first byte
+    instead. A URL is dead only on a definitive answer: a 4xx, or a 2xx that is not an image.
+    Network errors, timeouts and server errors leave it unknown (None), which is neither
+    cached nor treated as dead.
+    """
+
+    def __init__(self, cache: LivenessCache, concurrency: int = 16, timeout: float = 10.0,
+                 mirrors: Optional[List[Tuple[str, str]]] = None):
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.mirrors = mirrors or []
+        self.stats = {"checked": 0, "cached": 0, "dead": 0, "unknown": 0}
+
+    @classmethod
+    def from_env(cls, state_root: str) -> "LivenessChecker":
+        """Build a checker from IMAGE_LIVENESS_* variables, caching under state_root."""
+        cache = LivenessCache(
+            os.path.join(state_root, "url_liveness.json"),
+            ttl_alive=float(os.getenv("IMAGE_LIVENESS_TTL_HOURS", "168")) * 3600,
+            ttl_dead=float(os.getenv("IMAGE_LIVENESS_DEAD_TTL_HOURS", "24")) * 3600,
+        )
+        return cls(
+            cache,
+            concurrency=int(os.getenv("IMAGE_LIVENESS_CONCURRENCY", "16")),
+            timeout=float(os.getenv("IMAGE_LIVENESS_TIMEOUT", "10")),
+            mirrors=parse_mirrors(os.getenv("IMAGE_FETCH_MIRROR", "")),
+        )
+
+    async def probe(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str):
+        target = mirror_url(url, self.mirrors)
+        status = None
+        async with semaphore:
+            try:
+                async with session.head(target, allow_redirects=True) as response:
+                    status = response.status
+                    content_type = response.headers.get("Content-Type", "")
+                if status in HEAD_UNSUPPORTED:
+                    async with session.get(target, headers={"Range": "bytes=0-0"}, allow_redirects=True) as response:
+                        status = response.status
+                        content_type = response.headers.get("Content-Type", "")
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                # Network errors say nothing about the URL itself
+                return url, None, None
+        if 200 <= status < 300:
+            alive = (not content_type or content_type.startswith("image/")
+                     or content_type.startswith("application/octet-stream"))
+        elif 400 <= status < 500:
+            alive = False
+        else:
+            # Server errors and unresolved redirects may be transient
+            return url, None, status
+        self.cache.put(url, alive, status)
+        return url, alive, status
+
+    async def check_async(self, urls: List[str]) -> Dict[str, Optional[bool]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            results = await asyncio.gather(*(self.probe(session, semaphore, url) for url in urls))
+        return {url: alive for url, alive, _ in results}
+
+    def check(self, urls: Iterable[str]) -> Dict[str, Optional[bool]]:
+        """Return url -> alive (None when unknown) for every URL, probing only those without a
+        fresh cached result."""
+        self.stats = {"checked": 0, "cached": 0, "dead": 0, "unknown": 0}
+        results = {}
+        pending = []
+        for url in dict.fromkeys(u for u in urls if u):
+            cached = self.cache.get(url)
+            if cached is None:
+                pending.append(url)
+            else:
+                results[url] = cached
+                self.stats["cached"] += 1
+        if pending:
+            results.update(asyncio.run(self.check_async(pending)))
+            self.stats["checked"] += len(pending)
+            self.cache.save()
+        self.stats["dead"] = sum(1 for alive in results.values() if alive is False)
+        self.stats["unknown"] = sum(1 for alive in results.values() if alive is None)
+        return results
+
+
+def candidate_urls(images: Dict[str, Any]) -> List[str]:
+    return [option["url"] for _, entry in iter_images(images) for option in candidates(entry) if option.get("url")]
+
+
+def apply_liveness(images: Dict[str, Any], alive: Dict[str, Optional[bool]]) -> Tuple[Dict[str, Any], int, int]:
+    """Swap dead primary images for their first live alternative and drop images with none.
+    URLs whose state is unknown count as live, so a network failure does not drop images.
+
+    Returns the updated image metadata, the number of replaced images and the number dropped.
+    """
+    replaced = dropped = 0
+
+    def resolve(entry):
+        nonlocal replaced, dropped
+        for index, option in enumerate(candidates(entry)):
+            if option.get("url") and alive.get(option["url"]) is not False:
+                if index == 0:
+                    return entry
+                replaced += 1
+                return with_alternative(entry, option)
+        dropped += 1
+        return None
+
+    result = {}
+    for section, value in images.items():
+        if isinstance(value, dict):
+            resolved = resolve(value)
+            if resolved is not None:
+                result[section] = resolved
+        elif isinstance(value, list):
+            result[section] = [r for r in (resolve(e) for e in value if isinstance(e, dict)) if r is not None]
+        else:
+            result[section] = value
+    return result, replaced, dropped
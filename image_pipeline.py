@@ -0,0 +1,302 @@
+import io
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Dict, Iterator, List, Optional, Set, Tuple
+
+import aiohttp
+
+from image_index import ImageIndex, dhash, normalize_url
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it images are kept as remote URLs
+    Image = None
+
+# Variant served when a width descriptor is missing from the asset metadata
+DEFAULT_VARIANT = {"width": 1280, "height": None, "format": "webp"}
+
+
+def iter_images(images: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (slug, entry) for every image in the asset metadata, e.g. ("features-2", {...})."""
+    for section, value in images.items():
+        if isinstance(value, dict):
+            yield section, value
+        elif isinstance(value, list):
+            for index, entry in enumerate(value, start=1):
+                if isinstance(entry, dict):
+                    yield f"{section}-{index}", entry
+
+
+def requested_variants(entry: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Normalize "sizes" to {variant: {width, height, format}}.
+
+    Agents return either one size per breakpoint ({"desktop": {...}, "mobile": {...}})
+    or a single flat size ({"width": 800, "height": 600}).
+    """
+    sizes = entry.get("sizes")
+    if not isinstance(sizes, dict) or not sizes:
+        return {"default": dict(DEFAULT_VARIANT)}
+    if "width" in sizes:
+        return {"default": sizes}
+    return {name: size for name, size in sizes.items() if isinstance(size, dict) and size.get("width")}
+
+
+def parse_mirrors(spec: str) -> List[Tuple[str, str]]:
+    """Parse "prefix=replacement,..." pairs used to fetch images from a mirror or fixture server."""
+    mirrors = []
+    for pair in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, replacement = pair.partition("=")
+        mirrors.append((prefix, replacement))
+    return mirrors
+
+
+def mirror_url(url: str, mirrors: List[Tuple[str, str]]) -> str:
+    for prefix, replacement in mirrors:
+        if url.startswith(prefix):
+            return replacement + url[len(prefix):]
+    return url
+
+
+def render_variant(data: bytes, width: int, height: Optional[int], fmt: str, quality: int) -> Tuple[bytes, int, int]:
+    """Resize an image to a variant and encode it.
+
+    Crops to the requested aspect ratio when a height is given and never upscales: a source
+    smaller than the variant produces a proportionally smaller one.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ("RGB", "RGBA"):
+            source = source.convert("RGBA" if "transparency" in source.info else "RGB")
+        if height:
+            shrink = min(1.0, source.width / width, source.height / height)
+            target = (max(1, round(width * shrink)), max(1, round(height * shrink)))
+            image = ImageOps.fit(source, target, Image.LANCZOS)
+        else:
+            shrink = min(1.0, width / source.width)
+            image = source.resize((max(1, round(source.width * shrink)), max(1, round(source.height * shrink))),
+                                  Image.LANCZOS)
+
+        fmt = fmt.upper().replace("JPG", "JPEG")
+        options = {"quality": quality}
+        if fmt == "WEBP":
+            options["method"] = 4
+        elif fmt == "JPEG" and image.mode == "RGBA":
+            image = image.convert("RGB")
+        out = io.BytesIO()
+        image.save(out, format=fmt, **options)
+        return out.getvalue(), image.width, image.height
+
+
+def candidates(entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The primary image followed by its alternatives, each as a dict with at least a url."""
+    options = [entry]
+    for alternative in entry.get("alternatives") or []:
+        if isinstance(alternative, str):
+            options.append({"url": alternative})
+        elif isinstance(alternative, dict) and alternative.get("url"):
+            options.append(alternative)
+    return options
+
+
+def with_alternative(entry: Dict[str, Any], option: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace an image by one of its alternatives, keeping the rest as alternatives."""
+    # The alternative's own fields win; alt text, sizes and loading carry over
+    resolved = {k: v for k, v in entry.items() if k not in ("url", "thumbnail", "attribution", "license")}
+    resolved.update({k: v for k, v in option.items() if k != "alternatives"})
+    resolved["alternatives"] = [o for o in candidates(entry)[1:] if o is not option]
+    return resolved
+
+
+class ImagePipeline:
+    """Downloads the images chosen by the asset stage and renders their responsive variants.
+
+    Downloads share one pooled aiohttp session and are limited to `concurrency` in flight;
+    decoding, resizing and WebP encoding run on a thread pool. Every image goes through an
+    ImageIndex, so a photo already downloaded or rendered by an earlier section, run or site
+    is reused rather than fetched again, and a section whose photo is already on the page
+    gets its first alternative that is not. The result maps site paths to encoded variants,
+    and every image entry gains "src", "srcset" and "variants" fields.
+    """
+
+    def __init__(self, index: ImageIndex, concurrency: int = 8, timeout: float = 30.0, quality: int = 80,
+                 mirrors: Optional[List[Tuple[str, str]]] = None, images_dir: str = "images"):
+        self.index = index
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.quality = quality
+        self.mirrors = mirrors or []
+        self.images_dir = images_dir
+        self.processed: Set[str] = set()
+        self.stats = self._empty_stats()
+
+    @classmethod
+    def from_env(cls, state_root: str) -> "ImagePipeline":
+        """Build a pipeline from IMAGE_FETCH_* environment variables, indexing under state_root."""
+        return cls(
+            ImageIndex(os.path.join(state_root, "image_index"),
+                       max_distance=int(os.getenv("IMAGE_DEDUP_DISTANCE", "5"))),
+            concurrency=int(os.getenv("IMAGE_FETCH_CONCURRENCY", "8")),
+            timeout=float(os.getenv("IMAGE_FETCH_TIMEOUT", "30")),
+            quality=int(os.getenv("IMAGE_WEBP_QUALITY", "80")),
+            mirrors=parse_mirrors(os.getenv("IMAGE_FETCH_MIRROR", "")),
+        )
+
+    @staticmethod
+    def available() -> bool:
+        return Image is not None
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, int]:
+        return {"downloaded": 0, "reused": 0, "failed": 0, "duplicates": 0, "variants": 0,
+                "variants_reused": 0, "bytes_in": 0, "bytes_out": 0}
+
+    async def download(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str) -> Optional[bytes]:
+        async with semaphore:
+            try:
+                async with session.get(mirror_url(url, self.mirrors)) as response:
+                    response.raise_for_status()
+                    data = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.stats["failed"] += 1
+                reason = f"HTTP {e.status}" if isinstance(e, aiohttp.ClientResponseError) else f"{type(e).__name__} {e}"
+                print(f"  ⚠ Could not download {url}: {reason}")
+                return None
+        self.stats["downloaded"] += 1
+        self.stats["bytes_in"] += len(data)
+        return data
+
+    def _once(self, key, factory):
+        # Sections asking for the same URL or variant at the same time share one task
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.ensure_future(factory())
+        return self._tasks[key]
+
+    async def _load_source(self, session, semaphore, executor, url: str) -> Optional[str]:
+        key = self.index.lookup(url)
+        if key:
+            self.stats["reused"] += 1
+            return key
+        data = await self.download(session, semaphore, url)
+        if data is None:
+            return None
+        try:
+            phash = await asyncio.get_running_loop().run_in_executor(executor, dhash, data)
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"  ⚠ Could not decode {url}: {type(e).__name__} {e}")
+            return None
+        key, known = self.index.add(url, data, phash)
+        if known:
+            self.stats["reused"] += 1
+        return key
+
+    def source(self, session, semaphore, executor, url: str) -> Awaitable[Optional[str]]:
+        """Index key of the image at `url`, downloading it only if the index has never seen it."""
+        return self._once(("source", normalize_url(url)),
+                          lambda: self._load_source(session, semaphore, executor, url))
+
+    async def choose(self, session, semaphore, executor, entry: Dict[str, Any],
+                     used: Set[str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Pick the first candidate that loads and is not already on the page.
+
+        Falls back to the first candidate that loads when every one of them is a duplicate.
+        """
+        fallback = (None, None)
+        for position, option in enumerate(candidates(entry)):
+            key = await self.source(session, semaphore, executor, option["url"]) if option.get("url") else None
+            if key is None:
+                continue
+            resolved = entry if position == 0 else with_alternative(entry, option)
+            if key not in used:
+                if fallback[1] is not None:
+                    self.stats["duplicates"] += 1
+                return resolved, key
+            if fallback[1] is None:
+                fallback = (resolved, key)
+        return fallback
+
+    async def _render(self, executor, key: str, spec: str, size: Dict[str, Any]):
+        stored = self.index.variant(key, spec)
+        if stored:
+            self.stats["variants_reused"] += 1
+            return stored
+        data = self.index.source(key)
+        rendered = await asyncio.get_running_loop().run_in_executor(
+            executor, render_variant, data, int(size["width"]), int(size["height"]) if size.get("height") else None,
+            size.get("format") or "webp", self.quality)
+        self.index.put_variant(key, spec, *rendered)
+        self.stats["variants"] += 1
+        return rendered
+
+    async def process(self, executor, entry: Dict[str, Any], key: str, files: Dict[str, bytes]):
+        variants = requested_variants(entry)
+        jobs = []
+        for size in variants.values():
+            ext = (size.get("format") or "webp").lower().replace("jpeg", "jpg")
+            spec = f"{int(size['width'])}x{int(size['height']) if size.get('height') else 'auto'}-q{self.quality}.{ext}"
+            jobs.append(self._once(("variant", key, spec), lambda spec=spec, size=size: self._render(executor, key, spec, size)))
+        try:
+            rendered = await asyncio.gather(*jobs)
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"  ⚠ Could not process {entry.get('url')}: {type(e).__name__} {e}")
+            return
+
+        entry_variants = []
+        for (name, size), (content, width, height) in zip(variants.items(), rendered):
+            ext = (size.get("format") or "webp").lower().replace("jpeg", "jpg")
+            # Named by image rather than section, so a photo used twice is published once
+            path = f"{self.images_dir}/{key[:12]}-{width}x{height}.{ext}"
+            if path not in files:
+                files[path] = content
+                self.stats["bytes_out"] += len(content)
+            entry_variants.append({"name": name, "src": path, "width": width, "height": height, "bytes": len(content)})
+
+        entry_variants.sort(key=lambda variant: variant["width"])
+        entry["variants"] = entry_variants
+        entry["src"] = entry_variants[-1]["src"]
+        entry["srcset"] = ", ".join(f"{v['src']} {v['width']}w" for v in entry_variants)
+
+    async def run_async(self, images: Dict[str, Any]) -> Dict[str, bytes]:
+        files: Dict[str, bytes] = {}
+        self._tasks = {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        entries = [entry for _, entry in iter_images(images)]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, os.cpu_count() or 4)) as executor:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                # Every primary image is fetched up front; alternatives only when a section needs one
+                await asyncio.gather(*(self.source(session, semaphore, executor, entry["url"])
+                                       for entry in entries if entry.get("url")))
+                # Sections claim images in page order, so the hero keeps its photo and later sections
+                # move to alternatives
+                used: Set[str] = set()
+                chosen = []
+                for entry in entries:
+                    resolved, key = await self.choose(session, semaphore, executor, entry, used)
+                    if key is None:
+                        continue
+                    if resolved is not entry:
+                        entry.clear()
+                        entry.update(resolved)
+                    used.add(key)
+                    chosen.append((entry, key))
+                await asyncio.gather(*(self.process(executor, entry, key, files) for entry, key in chosen))
+        self.processed = {normalize_url(entry["url"]) for entry, _ in chosen}
+        return files
+
+    def run(self, images: Dict[str, Any]) -> Dict[str, bytes]:
+        """Download and render every image; entries in `images` are annotated in place.
+
+        Returns site-relative paths mapped to encoded variant bytes.
+        """
+        if not self.available():
+            print("⚠ Pillow is not installed; images stay as remote URLs")
+            return {}
+        self.stats = self._empty_stats()
+        try:
+            return asyncio.run(self.run_async(images))
+        finally:
+            self.index.save()
@@ -0,0 +1,146 @@
+import os
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import (JSON, Column, Float, Integer, MetaData, String, Table, Text, create_engine, event,
+                        insert, select, update)
+from sqlalchemy.engine import Engine
+
+from manifest import RunManifest
+
+metadata = MetaData()
+
+jobs_table = Table(
+    "jobs", metadata,
+    Column("id", String(32), primary_key=True),
+    Column("website_name", Text, nullable=False),
+    Column("niche_description", Text, nullable=False),
+    Column("output_dir", Text, nullable=False),
+    Column("prompt_profile", String(16)),
+    Column("status", String(16), nullable=False),
+    Column("error", Text),
+    Column("runs", Integer, nullable=False, default=1),
+    Column("created", Float, nullable=False),
+    Column("updated", Float, nullable=False),
+)
+
+stages_table = Table(
+    "stages", metadata,
+    Column("job_id", String(32), primary_key=True),
+    Column("stage", String(32), primary_key=True),
+    Column("input_hash", String(64), nullable=False),
+    Column("result", Text, nullable=False),
+    Column("output", JSON, nullable=False),
+    Column("completed", Float, nullable=False),
+)
+
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(url: str) -> Engine:
+    """One engine, and so one connection pool, per database for the whole process."""
+    with _engines_lock:
+        if url not in _engines:
+            engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 30}
+                                   if url.startswith("sqlite") else {})
+            if url.startswith("sqlite"):
+                @event.listens_for(engine, "connect")
+                def configure(connection, record):
+                    # WAL lets readers run while a stage checkpoints; every commit still reaches the disk
+                    cursor = connection.cursor()
+                    cursor.execute("PRAGMA journal_mode=WAL")
+                    cursor.execute("PRAGMA synchronous=FULL")
+                    cursor.close()
+            metadata.create_all(engine)
+            _engines[url] = engine
+        return _engines[url]
+
+
+class JobStore:
+    """Checkpoints of generation jobs in a SQLite database.
+
+    Each stage's raw result and parsed output are committed as soon as the stage is accepted,
+    so a run that dies part way (timeout, OOM, restart) can be resumed with only the
+    unfinished stages rerun.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = get_engine(url)
+
+    @classmethod
+    def from_env(cls, state_root: str) -> Optional["JobStore"]:
+        """Open LANDING_JOB_DB (a file path or SQLAlchemy URL, "off" disables checkpoints),
+        by default jobs.db in the state directory shared by the sites under an output root."""
+        location = os.getenv("LANDING_JOB_DB", os.path.join(state_root, "jobs.db"))
+        if location == "off":
+            return None
+        if "://" not in location:
+            os.makedirs(os.path.dirname(os.path.abspath(location)), exist_ok=True)
+            location = f"sqlite:///{os.path.abspath(location)}"
+        return cls(location)
+
+    def start_job(self, job_id: str, website_name: str, niche_description: str, output_dir: str,
+                  prompt_profile: Optional[str] = None):
+        """Record that a job is running, creating it on its first run."""
+        now = time.time()
+        with self.engine.begin() as conn:
+            updated = conn.execute(update(jobs_table).where(jobs_table.c.id == job_id).values(
+                status="running", error=None, runs=jobs_table.c.runs + 1, updated=now)).rowcount
+            if not updated:
+                conn.execute(insert(jobs_table).values(
+                    id=job_id, website_name=website_name, niche_description=niche_description,
+                    output_dir=output_dir, prompt_profile=prompt_profile, status="running", runs=1,
+                    created=now, updated=now))
+
+    def finish_job(self, job_id: str, status: str, error: Optional[str] = None):
+        with self.engine.begin() as conn:
+            conn.execute(update(jobs_table).where(jobs_table.c.id == job_id)
+                         .values(status=status, error=error, updated=time.time()))
+
+    def save_stage(self, job_id: str, stage: str, input_hash: str, result: str, output: Dict[str, Any]):
+        """Commit an accepted stage, replacing any earlier checkpoint of it."""
+        with self.engine.begin() as conn:
+            conn.execute(stages_table.delete().where(stages_table.c.job_id == job_id, stages_table.c.stage == stage))
+            conn.execute(insert(stages_table).values(job_id=job_id, stage=stage, input_hash=input_hash,
+                                                     result=result, output=output, completed=time.time()))
+            conn.execute(update(jobs_table).where(jobs_table.c.id == job_id).values(updated=time.time()))
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            row = conn.execute(select(jobs_table).where(jobs_table.c.id == job_id)).mappings().first()
+        return dict(row) if row else None
+
+    def latest_job(self, website_name: str, niche_description: str) -> Optional[Dict[str, Any]]:
+        """Most recent job that generated this site, if any."""
+        with self.engine.connect() as conn:
+            row = conn.execute(select(jobs_table)
+                               .where(jobs_table.c.website_name == website_name,
+                                      jobs_table.c.niche_description == niche_description)
+                               .order_by(jobs_table.c.created.desc()).limit(1)).mappings().first()
+        return dict(row) if row else None
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Jobs that never finished, because their process died while they ran."""
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(jobs_table).where(jobs_table.c.status == "running")
+                                .order_by(jobs_table.c.created)).mappings()
+            return [dict(row) for row in rows]
+
+    def stages(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(stages_table).where(stages_table.c.job_id == job_id)
+                                .order_by(stages_table.c.completed)).mappings()
+            return {row["stage"]: dict(row) for row in rows}
+
+    def manifest(self, job_id: str, state_dir: str) -> RunManifest:
+        """The completed stages of a job as a run manifest, for LandingPageCrew.run(previous=...)."""
+        job = self.job(job_id)
+        manifest = RunManifest(state_dir)
+        if job:
+            manifest.data["inputs"] = {key: job[key] for key in ("website_name", "niche_description", "prompt_profile")}
+        for name, stage in self.stages(job_id).items():
+            manifest.record_stage(name, stage["input_hash"], stage["result"], stage["output"])
+        return manifest
@@ -0,0 +1,398 @@
+import re
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Patterns that mark a value as placeholder content rather than a real implementation
+PLACEHOLDER_PATTERNS = [
+    r'\.{3}',  # ...
+    r'Implementation',
+    r'Placeholder',
+    r'Example',
+    r'TODO',
+    r'// *$',  # Empty comments
+    r'Full implementation',
+]
+
+# Every pattern in one case-insensitive alternation, so each value is scanned once
+PLACEHOLDER_RE = re.compile('|'.join(PLACEHOLDER_PATTERNS), re.IGNORECASE)
+
+# Keys whose string values are generated files
+FILE_KEY_RE = re.compile(r'\.(?:html|css|js|json|md)$', re.IGNORECASE)
+
+# Unanchored patterns can be checked against a value that is still streaming; '$' can only be
+# judged once the value is complete
+_STREAMING_PLACEHOLDER_RE = re.compile(
+    '|'.join(p for p in PLACEHOLDER_PATTERNS if not p.endswith('$')), re.IGNORECASE)
+_STREAMING_OVERLAP = max(len(p) for p in PLACEHOLDER_PATTERNS)
+
+_STRING_SPECIAL_RE = re.compile(r'["\\]')
+_BRACE_SCAN_RE = re.compile(r'[{}"]')
+_INVALID_ESCAPE_RE = re.compile(r'(?<!\\)(?:\\\\)*\\(?!["\\/bfnrtu])')
+_BAD_ESCAPE_RE = re.compile(r'\\(?:[^"/bfnrtu]|$)')
+_CONTROL_CHAR_RE = re.compile(r'[\x00-\x1f]')
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def is_placeholder_content(content: str) -> bool:
+    """Check if content is just a placeholder."""
+    return PLACEHOLDER_RE.search(content) is not None
+
+
+def find_placeholders(data: Any) -> List[Tuple]:
+    """Walk arbitrarily nested dicts and lists once and return the path of every placeholder value.
+
+    Paths are tuples of keys and list indexes, e.g. ('images', 'features', 0, 'url').
+    """
+    found = []
+    stack = [((), data)]
+    while stack:
+        path, value = stack.pop()
+        if isinstance(value, str):
+            if PLACEHOLDER_RE.search(value):
+                found.append(path)
+        elif isinstance(value, dict):
+            # Pushed in reverse so paths come out in document order
+            stack.extend((path + (key,), item) for key, item in reversed(list(value.items())))
+        elif isinstance(value, list):
+            stack.extend((path + (index,), item) for index, item in reversed(list(enumerate(value))))
+    return found
+
+
+def format_path(path: Tuple) -> str:
+    """Render a JSON path tuple as e.g. images.features[0].url"""
+    parts = []
+    for part in path:
+        if isinstance(part, int):
+            parts.append(f"[{part}]")
+        else:
+            parts.append(("." if parts else "") + part)
+    return "".join(parts)
+
+
+def _mask_escapes(s: str) -> str:
+    """Blank out escaped backslashes and quotes without moving any offsets.
+
+    Every quote left in the result delimits a JSON string, so string bodies can be skipped
+    with str.find instead of walking them character by character.
+    """
+    return s.replace('\\\\', '  ').replace('\\"', '  ')
+
+
+def iter_json_objects(s: str) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) spans of balanced top-level JSON objects in a single pass.
+
+    Braces inside JSON strings are ignored. If an opening brace never closes (for example a
+    stray '{' in prose), scanning restarts at the next '{' after it.
+    """
+    masked = _mask_escapes(s)
+    pos = masked.find('{')
+    while pos != -1:
+        depth = 0
+        end = None
+        i = pos
+        while True:
+            match = _BRACE_SCAN_RE.search(masked, i)
+            if not match:
+                break
+            ch = match.group()
+            i = match.end()
+            if ch == '"':
+                i = masked.find('"', i) + 1
+                if i == 0:
+                    break
+            elif ch == '{':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    end = i
+                    break
+
+        if end is None:
+            pos = masked.find('{', pos + 1)
+        else:
+            yield pos, end
+            pos = masked.find('{', end)
+
+
+def _repair_string_body(body: str) -> str:
+    # Dropping escaped backslashes leaves only escapes that must be valid on their own
+    if '\\' in body and _BAD_ESCAPE_RE.search(body.replace('\\\\', '')):
+        # An odd run of backslashes before a character that cannot be escaped gets one more
+        body = _INVALID_ESCAPE_RE.sub(lambda m: m.group() + '\\', body)
+    body = body.replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
+    if _CONTROL_CHAR_RE.search(body):
+        body = _CONTROL_CHAR_RE.sub(lambda m: '\\u%04x' % ord(m.group()), body)
+    return body
+
+
+def repair_json_strings(s: str, start: int = 0) -> str:
+    """Escape raw control characters and invalid backslashes inside JSON strings.
+
+    Only the text from `start` on is rewritten; `start` must not fall inside a string.
+    """
+    masked = _mask_escapes(s)
+    out = [s[:start]]
+    i = start
+    while True:
+        opening = masked.find('"', i)
+        if opening == -1:
+            out.append(s[i:])
+            break
+        closing = masked.find('"', opening + 1)
+        out.append(s[i:opening + 1])
+        if closing == -1:
+            out.append(_repair_string_body(s[opening + 1:]))
+            break
+        out.append(_repair_string_body(s[opening + 1:closing]))
+        out.append('"')
+        i = closing + 1
+    return "".join(out)
+
+
+def loads_with_repair(candidate: str):
+    """Decode with orjson, repairing strings from the failing one onwards if needed."""
+    try:
+        return orjson.loads(candidate)
+    except orjson.JSONDecodeError as e:
+        # Decoding got as far as e.pos, so the last real quote before it opens the failing string
+        start = max(_mask_escapes(candidate).rfind('"', 0, e.pos), 0)
+        return orjson.loads(repair_json_strings(candidate, start))
+
+
+def extract_json(s: str) -> Optional[dict]:
+    """Return the JSON object in s, or None if there is no candidate object.
+
+    The common case, a single well-formed object, is decoded straight from the first '{' to
+    the last '}'. Otherwise balanced objects are located in one string-aware pass and tried
+    largest first, repairing each from its first failing string. Raises ValueError when
+    candidates exist but none of them decode.
+    """
+    start, end = s.find('{'), s.rfind('}')
+    if start == -1 or end < start:
+        return None
+    try:
+        parsed = orjson.loads(s[start:end + 1])
+        if isinstance(parsed, dict):
+            return parsed
+    except orjson.JSONDecodeError:
+        pass
+
+    spans = sorted(iter_json_objects(s), key=lambda span: span[1] - span[0], reverse=True)
+    if not spans:
+        return None
+    error = None
+    for start, end in spans:
+        try:
+            parsed = loads_with_repair(s[start:end])
+        except orjson.JSONDecodeError as e:
+            error = error or e
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    raise ValueError(f"No JSON object could be decoded: {error}")
+
+
+class PlaceholderContentError(Exception):
+    """Raised while streaming as soon as a generated file contains placeholder content.
+
+    partial holds the files completed before it, nested as in the response.
+    """
+
+    def __init__(self, path: Tuple, partial: Optional[Dict] = None):
+        self.path = path
+        self.partial = partial or {}
+        super().__init__(f"Placeholder content detected in '{format_path(path)}'")
+
+
+class StreamingJSONExtractor:
+    """Incrementally parses the first JSON object in a token stream.
+
+    Text before the first '{' (agent thoughts, code fences) is skipped. File values
+    (keys ending in .html, .css, .js, ...) are checked for placeholder content while
+    they stream, and each accepted file is handed to `on_file` as soon as its value
+    closes, before the rest of the response has arrived.
+    """
+
+    def __init__(self, on_file: Optional[Callable[[str, str], None]] = None):
+        self.on_file = on_file
+        self.started = False
+        self.finished = False
+        self.files: Dict[str, str] = {}
+        # The same files nested as in the response, for keeping them when the stream is cut off
+        self.partial: Dict = {}
+        # Each frame is [kind, current key or index, expecting a key]
+        self._stack = []
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = None  # None, '' after a backslash, or 'uXX..' while reading \uXXXX
+        self._buffer = []
+        self._checked = 0
+        self._tail = ""
+
+    def feed(self, text: str):
+        """Consume the next chunk of the stream. Raises PlaceholderContentError on placeholders."""
+        i, n = 0, len(text)
+        while i < n and not self.finished:
+            if self._in_string:
+                i = self._consume_string(text, i)
+                continue
+
+            ch = text[i]
+            i += 1
+            if not self.started:
+                if ch == '{':
+                    self.started = True
+                    self._stack.append(['obj', None, True])
+                continue
+
+            frame = self._stack[-1]
+            if ch == '"':
+                self._in_string = True
+                self._string_is_key = frame[0] == 'obj' and frame[2]
+                self._buffer = []
+                self._checked = 0
+                self._tail = ""
+            elif ch == '{':
+                self._stack.append(['obj', None, True])
+            elif ch == '[':
+                self._stack.append(['arr', 0, False])
+            elif ch in '}]':
+                self._stack.pop()
+                if not self._stack:
+                    self.finished = True
+            elif ch == ':':
+                frame[2] = False
+            elif ch == ',':
+                if frame[0] == 'obj':
+                    frame[2] = True
+                else:
+                    frame[1] += 1
+
+    def _consume_string(self, text: str, i: int) -> int:
+        n = len(text)
+        while i < n:
+            if self._escape is not None:
+                if self._escape == '':
+                    ch = text[i]
+                    i += 1
+                    if ch == 'u':
+                        self._escape = 'u'
+                    else:
+                        self._buffer.append(_ESCAPES.get(ch, ch))
+                        self._escape = None
+                else:
+                    part = text[i:i + 5 - len(self._escape)]
+                    i += len(part)
+                    self._escape += part
+                    if len(self._escape) == 5:
+                        try:
+                            self._buffer.append(chr(int(self._escape[1:], 16)))
+                        except ValueError:
+                            pass
+                        self._escape = None
+                continue
+
+            match = _STRING_SPECIAL_RE.search(text, i)
+            if not match:
+                self._buffer.append(text[i:])
+                i = n
+                break
+            self._buffer.append(text[i:match.start()])
+            i = match.end()
+            if match.group() == '\\':
+                self._escape = ''
+            else:
+                self._in_string = False
+                self._finish_string()
+                return i
+
+        if self._is_file_value():
+            self._check_partial()
+        return i
+
+    def _path(self) -> Tuple:
+        return tuple(frame[1] for frame in self._stack)
+
+    def _is_file_value(self) -> bool:
+        if self._string_is_key or not self._stack:
+            return False
+        key = self._stack[-1][1]
+        return isinstance(key, str) and bool(FILE_KEY_RE.search(key))
+
+    def _check_partial(self):
+        """Search only the newly streamed text, plus enough overlap to catch split matches."""
+        new_text = "".join(self._buffer[self._checked:])
+        self._checked = len(self._buffer)
+        window = self._tail + new_text
+        if _STREAMING_PLACEHOLDER_RE.search(window):
+            raise PlaceholderContentError(self._path(), self.partial)
+        self._tail = window[-_STREAMING_OVERLAP:]
+
+    def _finish_string(self):
+        value = "".join(self._buffer)
+        self._buffer = []
+        frame = self._stack[-1]
+        if self._string_is_key:
+            frame[1] = value
+            return
+        if not self._is_file_value():
+            return
+        if is_placeholder_content(value):
+            raise PlaceholderContentError(self._path(), self.partial)
+        node = self.partial
+        for step in self._path()[:-1]:
+            node = node.setdefault(step, {}) if isinstance(node, dict) else {}
+        if isinstance(node, dict):
+            node[self._path()[-1]] = value
+        path = format_path(self._path())
+        self.files[path] = value
+        if self.on_file:
+            self.on_file(path, value)
+
+
+class StreamingPlaceholderGuard(BaseCallbackHandler):
+    """LangChain callback that parses streamed completions and aborts doomed ones early.
+
+    Raising from on_llm_new_token cancels the in-flight request; the PlaceholderContentError
+    surfaces from the task with the files completed so far, so the stage can keep them and
+    ask again only for the rest.
+    """
+
+    raise_error = True
+
+    def __init__(self, on_file: Optional[Callable[[str, str], None]] = None):
+        self.on_file = on_file
+        self._extractors: Dict = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id):
+        with self._lock:
+            self._extractors[run_id] = StreamingJSONExtractor(on_file=self.on_file)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs):
+        extractor = self._extractors.get(run_id)
+        if extractor is None:
+            return
+        try:
+            extractor.feed(token)
+        except PlaceholderContentError as e:
+            print(f"⚠ {e}. Cancelling the response.")
+            raise
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            self._extractors.pop(run_id, None)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._extractors.pop(run_id, None)
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.language_models.chat_models import agenerate_from_stream, generate_from_stream
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+
+CACHE_MODES = ("on", "refresh", "off")
+
+
+class DiskLLMCache(BaseCache):
+    """Content-addressed on-disk cache for LLM responses.
+
+    Entries are keyed by a hash of the model configuration (model name, sampling
+    parameters, stop words) and the rendered prompt. The cache is bounded by total
+    size and entry age, and evicts least recently used entries first.
+
+    Modes:
+        on      -- serve hits and store new responses
+        refresh -- ignore existing entries but store new responses
+        off     -- bypass the cache entirely
+    """
+
+    def __init__(self, cache_dir: str = ".llm_cache", max_bytes: int = 512 * 1024 * 1024,
+                 ttl_seconds: Optional[float] = 7 * 24 * 3600, mode: str = "on"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {', '.join(CACHE_MODES)}")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Dict[str, float]]] = None
+        self._total_bytes = 0
+
+    def __repr__(self) -> str:
+        # langchain serializes the model, cache included, into the key of every entry; the
+        # default repr carries the object's address and would make each crew miss the others'
+        return f"{type(self).__name__}()"
+
+    @classmethod
+    def from_env(cls, mode: Optional[str] = None) -> "DiskLLMCache":
+        """Build a cache from LLM_CACHE_* environment variables."""
+        ttl_hours = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+        return cls(
+            cache_dir=os.getenv("LLM_CACHE_DIR", ".llm_cache"),
+            max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "512")) * 1024 * 1024),
+            ttl_seconds=ttl_hours * 3600 if ttl_hours > 0 else None,
+            mode=mode or os.getenv("LLM_CACHE_MODE", "on"),
+        )
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _load_index(self):
+        """Scan the cache directory once so eviction knows sizes and access order."""
+        if self._index is not None:
+            return
+        self._index = {}
+        self._total_bytes = 0
+        if not os.path.isdir(self.cache_dir):
+            return
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                self._index[name[:-5]] = {"size": stat.st_size, "atime": stat.st_mtime}
+                self._total_bytes += stat.st_size
+
+    def _remove(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._total_bytes -= entry["size"]
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones until under the size limit."""
+        now = time.time()
+        if self.ttl_seconds:
+            for key in [k for k, e in self._index.items() if now - e["atime"] > self.ttl_seconds]:
+                self._remove(key)
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1]["atime"]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(key)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if self.mode != "on":
+            return None
+        key = self.make_key(prompt, llm_string)
+        path = self._path(key)
+        with self._lock:
+            self._load_index()
+            try:
+                with open(path, encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self.misses += 1
+                return None
+
+            now = time.time()
+            if self.ttl_seconds and now - entry.get("created", 0) > self.ttl_seconds:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            # Touch the entry so LRU eviction sees it as recently used
+            os.utime(path, (now, now))
+            if key in self._index:
+                self._index[key]["atime"] = now
+            self.hits += 1
+        return [loads(generation) for generation in entry["generations"]]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self.mode == "off":
+            return
+        key = self.make_key(prompt, llm_string)
+        path = self._path(key)
+        payload = json.dumps({
+            "created": time.time(),
+            "generations": [dumps(generation) for generation in return_val],
+        })
+        with self._lock:
+            self._load_index()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+            previous = self._index.get(key)
+            if previous:
+                self._total_bytes -= previous["size"]
+            size = len(payload.encode("utf-8"))
+            self._index[key] = {"size": size, "atime": time.time()}
+            self._total_bytes += size
+            self._evict()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._load_index()
+            return {
+                "mode": self.mode,
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+            }
+
+
+class CachedChatOpenAI(ChatOpenAI):
+    """ChatOpenAI that also serves streamed calls from its cache.
+
+    crewai runs agents through stream(), and langchain-core only consults the cache on the
+    generate/invoke path, so without this every agent call would go to the API. A hit is
+    replayed as a single chunk; a response is stored only once it has streamed to the end,
+    so calls cut off part way (placeholder aborts, budgets) are never cached.
+    """
+
+    def _cache_entry(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]):
+        # The same key generate() uses, so streamed and non-streamed calls share entries
+        return dumps(messages), self._get_llm_string(stop=stop, **kwargs)
+
+    @staticmethod
+    def _replay(generations: RETURN_VAL_TYPE) -> Iterator[ChatGenerationChunk]:
+        for generation in generations:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=generation.text),
+                                      generation_info=generation.generation_info)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        if not isinstance(self.cache, BaseCache):
+            yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return
+        prompt, llm_string = self._cache_entry(messages, stop, kwargs)
+        cached = self.cache.lookup(prompt, llm_string)
+        if cached:
+            yield from self._replay(cached)
+            return
+        chunks = []
+        for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        if chunks:
+            self.cache.update(prompt, llm_string, generate_from_stream(iter(chunks)).generations)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        if not isinstance(self.cache, BaseCache):
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+        prompt, llm_string = self._cache_entry(messages, stop, kwargs)
+        cached = await self.cache.alookup(prompt, llm_string)
+        if cached:
+            for chunk in self._replay(cached):
+                yield chunk
+            return
+        chunks = []
+        async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        if chunks:
+            await self.cache.aupdate(prompt, llm_string, generate_from_stream(iter(chunks)).generations)
+
+    # generate() checks the cache itself before streaming, so its stream must not check again
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                  stream: Optional[bool] = None, **kwargs: Any) -> ChatResult:
+        if stream if stream is not None else self.streaming:
+            return generate_from_stream(super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+        return super()._generate(messages, stop=stop, run_manager=run_manager, stream=stream, **kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                         stream: Optional[bool] = None, **kwargs: Any) -> ChatResult:
+        if stream if stream is not None else self.streaming:
+            return await agenerate_from_stream(super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs))
+        return await super()._agenerate(messages, stop=stop, run_manager=run_manager, stream=stream, **kwargs)
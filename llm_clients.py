@@ -0,0 +1,193 @@
+import os
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from rate_limiter import AsyncRateLimitedTransport, RateLimiter, RateLimitedTransport
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # h2 is optional; without it connections stay on HTTP/1.1 keep-alive
+    HTTP2_AVAILABLE = False
+
+
+def _build_response_models():
+    """Build the pydantic models of chat responses now, while one thread runs.
+
+    openai defers building them until first use, and threads that first dump a response
+    at the same moment can get an empty dict back, which langchain reports as KeyError 'choices'.
+    """
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+    for model in (ChatCompletion, ChatCompletionChunk):
+        model.model_rebuild(force=True)
+
+
+_build_response_models()
+
+
+class _MeteredTransport(httpx.BaseTransport):
+    """Counts the requests a pool serves and the connections it has to open for them."""
+
+    def __init__(self, pool: "ClientPool", transport: httpx.BaseTransport):
+        self.pool = pool
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        previous = request.extensions.get("trace")
+
+        def trace(event: str, info: Dict[str, Any]):
+            if event == "connection.connect_tcp.complete":
+                self.pool._count("connections_opened")
+            if previous is not None:
+                previous(event, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        self.pool._started()
+        try:
+            return self.transport.handle_request(request)
+        finally:
+            self.pool._finished()
+
+    def close(self):
+        self.transport.close()
+
+
+class _AsyncMeteredTransport(httpx.AsyncBaseTransport):
+    def __init__(self, pool: "ClientPool", transport: httpx.AsyncBaseTransport):
+        self.pool = pool
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        previous = request.extensions.get("trace")
+
+        async def trace(event: str, info: Dict[str, Any]):
+            if event == "connection.connect_tcp.complete":
+                self.pool._count("connections_opened")
+            if previous is not None:
+                await previous(event, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        self.pool._started()
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            self.pool._finished()
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class ClientPool:
+    """OpenAI clients for one endpoint and key, over keep-alive connection pools (HTTP/2 when
+    h2 is installed) shared by every crew in the process.
+
+    The clients do not depend on the model, so crews with different models share them too;
+    requests go through the rate limiter first when one is given.
+    """
+
+    def __init__(self, base_url: Optional[str], api_key: Optional[str], default_headers: Optional[Dict[str, str]] = None,
+                 limiter: Optional[RateLimiter] = None, max_connections: int = 100, max_keepalive: int = 20,
+                 keepalive_expiry: float = 60.0, timeout: float = 600.0, connect_timeout: float = 10.0,
+                 http2: Optional[bool] = None, max_attempts: int = 6, stream_usage: bool = True):
+        import openai
+
+        self.base_url = base_url
+        self.http2 = HTTP2_AVAILABLE if http2 is None else http2 and HTTP2_AVAILABLE
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.stats = {"requests": 0, "in_flight": 0, "peak_in_flight": 0, "connections_opened": 0}
+        self._lock = threading.Lock()
+
+        self._pools = [httpx.HTTPTransport(limits=self.limits, http2=self.http2),
+                       httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)]
+        sync_transport = _MeteredTransport(self, self._pools[0])
+        async_transport = _AsyncMeteredTransport(self, self._pools[1])
+        if limiter is not None:
+            sync_transport = RateLimitedTransport(limiter, sync_transport, max_attempts=max_attempts,
+                                                  stream_usage=stream_usage)
+            async_transport = AsyncRateLimitedTransport(limiter, async_transport, max_attempts=max_attempts,
+                                                        stream_usage=stream_usage)
+
+        client_params = {"api_key": api_key, "base_url": base_url, "default_headers": default_headers,
+                         "timeout": self.timeout}
+        self.openai = openai.OpenAI(http_client=openai.DefaultHttpxClient(
+            transport=sync_transport, timeout=self.timeout), **client_params)
+        self.async_openai = openai.AsyncOpenAI(http_client=openai.DefaultAsyncHttpxClient(
+            transport=async_transport, timeout=self.timeout), **client_params)
+
+    @classmethod
+    def shared(cls, base_url: Optional[str], api_key: Optional[str], default_headers: Optional[Dict[str, str]] = None,
+               limiter: Optional[RateLimiter] = None) -> "ClientPool":
+        """The process's pool for this endpoint, key and headers, created from the environment
+        on first use."""
+        key_hash = hashlib.sha1((api_key or "").encode("utf-8")).hexdigest()[:12]
+        key = (base_url, key_hash, tuple(sorted((default_headers or {}).items())), id(limiter))
+        with _pools_lock:
+            if key not in _pools:
+                http2 = os.getenv("LLM_HTTP2", "auto").lower()
+                _pools[key] = cls(
+                    base_url, api_key, default_headers, limiter,
+                    max_connections=int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100")),
+                    max_keepalive=int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20")),
+                    keepalive_expiry=float(os.getenv("LLM_POOL_KEEPALIVE_SECONDS", "60")),
+                    timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "600")),
+                    connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "10")),
+                    http2=None if http2 == "auto" else http2 in ("1", "on", "true"),
+                    max_attempts=int(os.getenv("LLM_RATE_MAX_ATTEMPTS", "6")),
+                    stream_usage=os.getenv("LLM_STREAM_USAGE", "1") == "1",
+                )
+            return _pools[key]
+
+    def chat_openai_clients(self) -> Dict[str, Any]:
+        """client and async_client for ChatOpenAI. Both are passed in whole because ChatOpenAI
+        hands a single http_client to the sync and the async OpenAI client."""
+        return {"client": self.openai.chat.completions, "async_client": self.async_openai.chat.completions}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _started(self):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+
+    def _finished(self):
+        with self._lock:
+            self.stats["in_flight"] -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Open and idle connections against the pool limit, plus request and connection counters."""
+        connections = [connection for transport in self._pools
+                       for connection in getattr(getattr(transport, "_pool", None), "connections", [])]
+        idle = sum(1 for connection in connections if connection.is_idle())
+        with self._lock:
+            stats = dict(self.stats)
+        return {
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "connections": len(connections),
+            "idle": idle,
+            "utilization": round((len(connections) - idle) / self.limits.max_connections, 3),
+            **stats,
+            "requests_per_connection": round(stats["requests"] / stats["connections_opened"], 1)
+            if stats["connections_opened"] else None,
+        }
+
+
+_pools: Dict[tuple, ClientPool] = {}
+_pools_lock = threading.Lock()
+
+
+def pool_stats() -> List[Dict[str, Any]]:
+    """Snapshots of every pool created in this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.snapshot() for pool in pools]
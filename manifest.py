@@ -0,0 +1,72 @@
+import os
+import json
+import hashlib
+from typing import Any, Dict, Optional
+
+
+def hash_payload(payload: Any) -> str:
+    """Stable content hash of any JSON-serializable value."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def hash_files(files: Dict[str, Any]) -> Dict[str, str]:
+    return {name: hashlib.sha256(str(content).encode("utf-8")).hexdigest() for name, content in files.items()}
+
+
+class RunManifest:
+    """Input and output hashes of every stage of a generation, persisted between runs.
+
+    For each stage the manifest keeps the hash of everything that went into its prompt,
+    the raw agent result, the content it stored in generated_code and a hash per file,
+    so a later run can reuse any stage whose inputs are unchanged.
+    """
+
+    FILENAME = "manifest.json"
+
+    def __init__(self, state_dir: str, data: Optional[Dict[str, Any]] = None):
+        self.state_dir = state_dir
+        self.data = data or {"inputs": {}, "stages": {}}
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.state_dir, self.FILENAME)
+
+    @classmethod
+    def load(cls, state_dir: str) -> Optional["RunManifest"]:
+        try:
+            with open(os.path.join(state_dir, cls.FILENAME), encoding="utf-8") as f:
+                return cls(state_dir, json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @property
+    def inputs(self) -> Dict[str, Any]:
+        return self.data["inputs"]
+
+    @property
+    def stages(self) -> Dict[str, Dict[str, Any]]:
+        return self.data["stages"]
+
+    def stage(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.data["stages"].get(name)
+
+    def record_stage(self, name: str, input_hash: str, result: str, output: Dict[str, Any]):
+        files = {}
+        for value in output.values():
+            if isinstance(value, dict):
+                files.update(hash_files(value))
+        self.data["stages"][name] = {
+            "input_hash": input_hash,
+            "output_hash": hash_payload(output),
+            "result": result,
+            "output": output,
+            "files": files,
+        }
+
+    def save(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # Key order is kept so reused outputs serialize exactly as they did originally
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
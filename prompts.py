@@ -0,0 +1,737 @@
+"""Task and agent prompts of LandingPageCrew, in a verbose and a compact profile.
+
+"verbose" is the original wording, with a full example for every file. "compact" asks for the
+same files in the same JSON schema with one short example per stage and one-line agent goals
+and backstories, which cuts the input tokens of every LLM call. Rendered prompts and their
+token counts are cached, so batch runs and retries only substitute and count each one once.
+"""
+import os
+from functools import lru_cache
+from string import Template
+from typing import Dict, Tuple
+
+from usage import count_tokens
+
+PROFILES = ("verbose", "compact")
+
+EXPECTED_OUTPUTS = {
+    "setup": "JSON object with complete project structure.",
+    "assets": "JSON object with complete image assets information.",
+    "components": "JSON object with complete HTML/CSS implementations.",
+    "js_modules": "JSON object with complete JavaScript implementations.",
+    "sections": "JSON object with complete HTML/CSS implementations of the requested sections.",
+    "part": "JSON object with the complete content of exactly the requested files.",
+}
+
+# What each landing page section must contain, for the per-section component subtasks
+SECTION_BRIEFS = {
+    "hero": "Full viewport height hero section; H1 heading with a clear value proposition; subheading explaining "
+            "benefits; CTA button with clear action text; background image with gradient overlay",
+    "features": "Grid/flex layout of 4-6 key features; icon or image for each feature; feature title and description",
+    "testimonials": "Carousel/grid of 3-4 testimonials; customer photo, name, company; quote with specific feedback; "
+                    "navigation controls if carousel",
+    "pricing": "3-4 pricing tiers; most popular plan highlighted; feature comparison list; price with billing period; "
+               "CTA button for each plan",
+    "contact": "Contact form with validation; name, email, message fields; submit button with loading state; "
+               "success/error messages; company contact details",
+}
+
+# The verbose profile is kept byte for byte as crew.py used to build it, so responses cached
+# and stage outputs stored before the prompt layer still match
+VERBOSE_AGENTS = {
+    "setup_dev": {
+        "role": "Project Setup Developer",
+        "goal": """
+            Create a clean, organized project structure for a static HTML website by:
+            - Setting up proper directory structure for HTML, CSS, and JS files
+            - Creating a development environment without external dependencies
+            - Setting up asset organization for images and media
+            - Establishing coding standards and best practices
+            - Ensuring cross-browser compatibility
+            """,
+        "backstory": """
+            A veteran web developer with 15 years of experience in pure HTML, CSS, and JavaScript.
+            Expert in creating high-performance static websites without frameworks.
+            Known for implementing sophisticated features using vanilla web technologies.
+            Pioneer of the "Zero Dependencies" web development movement.
+            Has built enterprise-level websites using only native web technologies.
+            Regular speaker on web performance and maintainability.
+            Author of "Pure Web Development: No Frameworks Needed".
+            """,
+    },
+    "component_dev": {
+        "role": "Component Developer",
+        "goal": """
+            Create visually stunning and accessible web components by:
+            - Writing semantic HTML5 markup
+            - Implementing modern CSS layouts and animations
+            - Finding and optimizing relevant images for each section
+            - Ensuring responsive design across all devices
+            - Maintaining WCAG accessibility standards
+            - Creating visual consistency throughout the site
+            """,
+        "backstory": """
+            A creative technologist with 12 years of experience in UI/UX and visual design.
+            Expert in crafting beautiful web experiences without frameworks.
+            Specialized in finding and optimizing perfect images for websites.
+            Created award-winning designs for major brands using pure HTML/CSS.
+            Pioneer in responsive image techniques and lazy loading.
+            Regular contributor to web design publications.
+            Known for the "Visual-First Web Development" methodology.
+            """,
+    },
+    "js_dev": {
+        "role": "JavaScript Developer",
+        "goal": """
+            Develop robust vanilla JavaScript solutions by:
+            - Writing clean, modular JavaScript without frameworks
+            - Implementing smooth animations and interactions
+            - Creating responsive image loading mechanisms
+            - Building efficient state management
+            - Ensuring cross-browser compatibility
+            - Optimizing performance and load times
+            """,
+        "backstory": """
+            A JavaScript purist with 10 years of experience in vanilla JS development.
+            Expert in creating complex functionality without external libraries.
+            Developed popular vanilla JS utilities used by thousands of developers.
+            Specialized in creating smooth animations and dynamic image galleries.
+            Performance optimization expert focusing on Core Web Vitals.
+            Regular speaker at JavaScript conferences.
+            Author of "Pure JavaScript: Beyond Libraries and Frameworks".
+            """,
+    },
+    "asset_dev": {
+        "role": "Asset Specialist",
+        "goal": """
+            Source and optimize website assets by:
+            - Finding relevant, free-to-use images for the website
+            - Optimizing images for web performance
+            - Creating image variants for different devices
+            - Managing asset organization and naming
+            - Ensuring proper image attribution
+            - Documenting asset usage guidelines
+            """,
+        "backstory": """
+            An asset optimization specialist with 8 years of experience in web media.
+            Expert in finding and curating perfect images for websites.
+            Specialized in image optimization and responsive image delivery.
+            Created automated image optimization workflows used by major websites.
+            Pioneer in modern image format adoption (WebP, AVIF).
+            Regular speaker on web performance and image optimization.
+            Maintains relationships with major free image providers.
+            """,
+    },
+}
+
+COMPACT_AGENTS = {
+    "setup_dev": {
+        "role": "Project Setup Developer",
+        "goal": "Set up a clean static site structure in plain HTML, CSS and JS with no dependencies.",
+        "backstory": "Senior web developer who builds fast, framework-free static sites.",
+    },
+    "component_dev": {
+        "role": "Component Developer",
+        "goal": "Build semantic, accessible, responsive HTML/CSS components with fitting images.",
+        "backstory": "UI developer experienced in pure HTML/CSS, responsive images and WCAG.",
+    },
+    "js_dev": {
+        "role": "JavaScript Developer",
+        "goal": "Write modular, performant vanilla JavaScript with no libraries.",
+        "backstory": "JavaScript developer focused on vanilla ES modules and Core Web Vitals.",
+    },
+    "asset_dev": {
+        "role": "Asset Specialist",
+        "goal": "Choose free-to-use, well-attributed images sized for the web.",
+        "backstory": "Web media specialist who sources images from Unsplash, Pexels and Pixabay.",
+    },
+}
+
+VERBOSE_TASKS = {
+    "setup": Template("""
+            Generate a COMPLETE, production-ready project structure for $website_name ($niche_description).
+            Return a JSON object containing FULLY IMPLEMENTED files - NO PLACEHOLDERS.
+
+            Required structure and implementations:
+
+            1. index.html:
+                Must include:
+                - Complete HTML5 structure
+                - Meta tags (charset, viewport, description)
+                - SEO tags specific to $niche_description
+                - Stylesheet links
+                - Module script tags
+                - Basic layout structure
+                Example:
+                <!DOCTYPE html>
+                <html lang="en">
+                <head>
+                    <meta charset="UTF-8">
+                    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+                    <title>$website_name</title>
+                    ...
+                </head>
+                <body>...</body>
+                </html>
+
+            2. styles/main.css:
+                Must include:
+                - Modern CSS reset
+                - Root variables for:
+                    * Colors (primary, secondary, accent)
+                    * Typography (font sizes, weights)
+                    * Spacing scale
+                    * Breakpoints
+                - Base styles
+                - Grid system
+                - Utility classes
+                Example:
+                :root {
+                    --primary-color: #2563eb;
+                    --spacing-unit: 0.25rem;
+                    ...
+                }
+
+            3. js/main.js:
+                Must include:
+                - Module imports
+                - App initialization
+                - Error handling
+                Example:
+                import { initComponents } from './modules/index.js';
+                document.addEventListener('DOMContentLoaded', () => {
+                    initComponents();
+                });
+
+            Example output structure:
+            {
+                "directory_structure": {
+                    "index.html": "<!DOCTYPE html>\\n<html lang=\\"en\\">...",
+                    "styles/main.css": ":root { --primary-color: #2563eb; }...",
+                    "js/main.js": "import { initComponents } from './modules/index.js';..."
+                }
+            }
+
+            Requirements:
+            - Write complete, working implementations
+            - Include actual content specific to: $niche_description
+            - NO placeholder content
+            - NO external dependencies
+            """),
+    "assets": Template("""
+            Find and optimize relevant images for $website_name ($niche_description).
+            Use free image sources like Unsplash, Pexels, or Pixabay.
+            Return a JSON object containing:
+            
+            1. List of required images with exact URLs:
+                - Hero section: Analytics dashboard or tech visualization
+                - Features: Tech-related icons and illustrations
+                - Team/testimonials: Professional team photos
+                - Product: Dashboard screenshots or mockups
+                - Logo/branding: Tech-focused logo ideas
+            
+            2. For each image provide:
+                - Direct image URL (no placeholders)
+                - Photographer/creator name and platform
+                - License type (must be free to use)
+                - Alt text for accessibility
+                - Recommended dimensions and formats
+                - Loading strategy (eager/lazy)
+            
+            Example structure:
+            {
+                "images": {
+                    "hero": {
+                        "url": "https://images.unsplash.com/actual-image-id",
+                        "thumbnail": "https://images.unsplash.com/actual-image-id?w=400",
+                        "attribution": "John Doe on Unsplash",
+                        "license": "Unsplash License",
+                        "alt": "Modern analytics dashboard showing real-time data visualization",
+                        "sizes": {
+                            "desktop": {
+                                "width": 1920,
+                                "height": 1080,
+                                "format": "webp"
+                            },
+                            "tablet": {
+                                "width": 1024,
+                                "height": 768,
+                                "format": "webp"
+                            },
+                            "mobile": {
+                                "width": 640,
+                                "height": 480,
+                                "format": "webp"
+                            }
+                        },
+                        "loading": "eager"
+                    },
+                    "features": [
+                        {
+                            "url": "https://images.pexels.com/actual-image-id",
+                            "thumbnail": "https://images.pexels.com/actual-image-id?w=200",
+                            "attribution": "Jane Smith on Pexels",
+                            "license": "Pexels License",
+                            "alt": "AI-powered data analysis illustration",
+                            "sizes": {
+                                "width": 800,
+                                "height": 600,
+                                "format": "webp"
+                            },
+                            "loading": "lazy"
+                        }
+                    ]
+                }
+            }
+
+            Search for images that specifically match: $niche_description
+            Each image must have a direct, working URL - no placeholders allowed.
+            Include at least 2-3 alternative images for each section, listed under an
+            "alternatives" key of the image they can replace (same fields as the image itself).
+            """),
+    "components": Template("""
+            Generate COMPLETE, production-ready HTML components with responsive CSS for $website_name.
+            Each component must work without any external dependencies.
+            The components should match this niche: $niche_description
+
+            Required files and their COMPLETE implementations:
+
+            1. index.html:
+                Must include:
+                - Doctype and UTF-8 encoding
+                - Viewport meta tag
+                - SEO meta tags (description, keywords)
+                - OpenGraph tags
+                - Favicon links
+                - CSS imports in head
+                - Deferred JS imports
+                - Header with navigation
+                - Main content sections
+                - Footer with social links
+                - Actual content (no lorem ipsum)
+
+            2. components/:
+                hero.html:
+                    - Full viewport height hero section
+                    - H1 heading with clear value proposition
+                    - Subheading explaining benefits
+                    - CTA button with clear action text
+                    - Background image with gradient overlay
+                    
+                features.html:
+                    - Grid/flex layout of 4-6 key features
+                    - Icon or image for each feature
+                    - Feature title and description
+                    - CSS Grid or Flexbox layout
+                    
+                testimonials.html:
+                    - Carousel/grid of 3-4 testimonials
+                    - Customer photo, name, company
+                    - Quote with specific feedback
+                    - Navigation controls if carousel
+                    
+                pricing.html:
+                    - 3-4 pricing tiers
+                    - Most popular plan highlighted
+                    - Feature comparison list
+                    - Price with billing period
+                    - CTA button for each plan
+                    
+                contact.html:
+                    - Contact form with validation
+                    - Name, email, message fields
+                    - Submit button with loading state
+                    - Success/error messages
+                    - Company contact details
+
+            3. styles/:
+                main.css:
+                    - CSS custom properties for colors
+                    - Typography scale with rem units
+                    - Responsive breakpoints
+                    - Grid system with named areas
+                    - Utility classes for spacing
+                    - Dark/light mode support
+                    
+                components/*.css:
+                    - BEM naming convention
+                    - Mobile-first media queries
+                    - Fluid typography
+                    - CSS Grid/Flexbox layouts
+                    - Smooth transitions
+                    - Accessible focus states
+
+            Example output structure (use this exact format):
+            {
+                "index.html": "<!DOCTYPE html>\\n<html lang=\\"en\\">\\n<head>\\n<meta charset=\\"UTF-8\\">...",
+                "components/hero.html": "<section class=\\"hero\\" aria-label=\\"Welcome\\">...",
+                "components/features.html": "<section class=\\"features\\" aria-label=\\"Features\\">...",
+                "styles/main.css": ":root { --primary-color: #007bff; }...",
+                "styles/components/hero.css": ".hero { min-height: 100vh; }..."
+            }
+
+            Requirements:
+            - Use semantic HTML5 elements
+            - Include WAI-ARIA attributes
+            - Add proper alt text for images
+            - Use native lazy loading
+            - Include actual content specific to: $niche_description
+            - NO placeholder content or lorem ipsum
+            - NO external dependencies
+            """),
+    "js_modules": Template("""
+            Create COMPLETE, production-ready vanilla JavaScript modules for $website_name.
+            No external dependencies or placeholders allowed.
+            The code should implement functionality specific to: $niche_description
+            The page is built from these sections: $section_files
+
+            Required modules and their full implementations:
+
+            1. js/main.js:
+                Must include:
+                - ES6 module imports
+                - DOMContentLoaded listener
+                - Feature detection
+                - Error handling setup
+                - Analytics initialization
+                - Performance monitoring
+
+            2. js/modules/imageLoader.js:
+                Must implement:
+                - Intersection Observer for lazy loading
+                - Progressive image loading
+                - Fallback for older browsers
+                - Error handling for failed loads
+                - WebP support detection
+                - Responsive image switching
+                Example: 
+                export class ImageLoader {
+                    constructor() {
+                        this.observer = new IntersectionObserver(...);
+                    }
+                    init() {
+                        // Full implementation
+                    }
+                }
+
+            3. js/modules/carousel.js:
+                Must implement:
+                - Touch-enabled slider
+                - Keyboard navigation
+                - A11y announcements
+                - Auto-play with pause
+                - Progress indicators
+                - Smooth animations
+
+            4. js/modules/navigation.js:
+                Must implement:
+                - Mobile menu toggle
+                - Smooth scroll to sections
+                - Active section highlighting
+                - Scroll progress indicator
+                - Sticky header logic
+                - Keyboard navigation
+
+            5. js/modules/form.js:
+                Must implement:
+                - Real-time validation
+                - Custom error messages
+                - AJAX form submission
+                - Loading states
+                - Success/error handling
+                - Input masking
+
+            6. js/modules/animations.js:
+                Must implement:
+                - Scroll-triggered animations
+                - Intersection Observer usage
+                - Performance throttling
+                - Reduced motion support
+                - CSS class toggling
+                - Animation sequences
+
+            7. js/utils/:
+                analytics.js:
+                    - Page view tracking
+                    - Event tracking
+                    - Performance monitoring
+                validation.js:
+                    - Email validation
+                    - Input sanitization
+                    - Error message handling
+                api.js:
+                    - Fetch wrapper
+                    - Error handling
+                    - Retry logic
+
+            Example structure (use this exact format):
+            {
+                "js/main.js": "import { ImageLoader } from './modules/imageLoader.js';\\n\\ndocument.addEventListener('DOMContentLoaded', () => {\\n  // Full implementation\\n});",
+                "js/modules/imageLoader.js": "export class ImageLoader {\\n  constructor() {\\n    // Full implementation\\n  }\\n}",
+                "js/modules/carousel.js": "export class Carousel {\\n  // Full implementation\\n}",
+                "js/utils/analytics.js": "export const trackEvent = (category, action, label) => {\\n  // Full implementation\\n}"
+            }
+
+            Requirements:
+            - Use ES6+ features (classes, modules, async/await)
+            - Include error handling for all async operations
+            - Add performance monitoring
+            - Ensure cross-browser compatibility
+            - Include JSDoc comments
+            - NO placeholder implementations
+            - NO external dependencies
+            """),
+    "sections": Template("""
+            Regenerate ONLY these landing page sections for $website_name ($niche_description): $sections.
+            Return a JSON object with exactly these keys, each holding the COMPLETE file content:
+            $files
+
+            The rest of the page already exists and stays as it is: $existing.
+            Reuse the CSS custom properties from styles/main.css and the BEM naming used by the other components.
+
+            Requirements:
+            - Use semantic HTML5 elements and WAI-ARIA attributes
+            - Mobile-first media queries and accessible focus states
+            - Include actual content specific to: $niche_description
+            - NO placeholder content or lorem ipsum
+            - NO external dependencies
+            """),
+    "shell": Template("""
+            Generate ONLY the page shell and shared styles for $website_name ($niche_description).
+            Return a JSON object with exactly these keys, each holding the COMPLETE file content:
+            index.html, styles/main.css
+
+            The rest of the page is generated separately: the sections $sections, each as
+            components/<section>.html with styles/components/<section>.css.
+
+            1. index.html:
+                - Doctype and UTF-8 encoding, viewport meta tag
+                - SEO meta tags (description, keywords) and OpenGraph tags
+                - Favicon links
+                - Links to styles/main.css and styles/components/<section>.css for every section
+                - Deferred module script js/main.js
+                - Header with navigation linking to every section id
+                - An empty <main id="main"></main> (the sections are inserted into it)
+                - Footer with social links
+
+            2. styles/main.css:
+                - These design tokens on :root, kept as they are: $tokens
+                - Typography scale with rem units
+                - Responsive breakpoints and grid system
+                - Utility classes for spacing
+                - Dark/light mode support
+                - Header, navigation and footer styles
+
+            Requirements:
+            - Use semantic HTML5 elements and WAI-ARIA attributes
+            - Include actual content specific to: $niche_description
+            - NO placeholder content or lorem ipsum
+            - NO external dependencies
+            """),
+    "section": Template("""
+            Generate ONLY this landing page section for $website_name ($niche_description): $section.
+            Return a JSON object with exactly these keys, each holding the COMPLETE file content:
+            $files
+
+            The rest of the page is generated separately: $others.
+            The section must contain: $brief.
+            Style it with these design tokens from styles/main.css, through var(--name): $tokens
+            $images
+            Requirements:
+            - A <section> element with id="$section" and BEM classes starting with "$section"
+            - Use semantic HTML5 elements and WAI-ARIA attributes
+            - Mobile-first media queries and accessible focus states
+            - Add proper alt text for images and use native lazy loading below the fold
+            - Include actual content specific to: $niche_description
+            - NO placeholder content or lorem ipsum
+            - NO external dependencies
+            """),
+    "repair": Template("""
+            Fix ONLY these files of the $stage output for $website_name ($niche_description).
+            Return a JSON object with exactly these keys, each holding the COMPLETE file content:
+            $files$rest
+
+            They were rejected because:
+            $problems
+
+            The other files were accepted and stay as they are: $accepted.
+            Keep the paths, ids, class names and exports they rely on.
+
+            Requirements:
+            - Include actual content specific to: $niche_description
+            - NO placeholder content, TODO comments or lorem ipsum
+            - NO external dependencies
+            """),
+}
+
+COMPACT_TASKS = {
+    "setup": Template("""
+Generate the complete project structure for $website_name ($niche_description).
+Return JSON: {"directory_structure": {"index.html": "...", "styles/main.css": "...", "js/main.js": "..."}}
+- index.html: HTML5, charset/viewport/description meta, SEO for the niche, stylesheet link, module script, page layout
+- styles/main.css: reset, :root variables (colors, type scale, spacing, breakpoints), base styles, grid, utilities
+- js/main.js: module imports, init on DOMContentLoaded, error handling
+Every file fully implemented with real content for the niche. No placeholders, no external dependencies.
+"""),
+    "assets": Template("""
+Find images for $website_name ($niche_description) from free image sources (Unsplash, Pexels, Pixabay).
+Return JSON: {"images": {"hero": IMAGE, "features": [IMAGE, ...], "testimonials": [IMAGE, ...]}} where IMAGE is
+{"url": "https://images.unsplash.com/photo-...", "thumbnail": "<url>?w=400", "attribution": "Name on Unsplash",
+"license": "Unsplash License", "alt": "...", "sizes": {"desktop": {"width": 1920, "height": 1080, "format": "webp"},
+"mobile": {"width": 640, "height": 480, "format": "webp"}}, "loading": "eager" or "lazy",
+"alternatives": [2-3 objects with the same fields]}
+Use direct, working image URLs matching the niche. No placeholders.
+"""),
+    "components": Template("""
+Generate complete HTML components with responsive CSS for $website_name ($niche_description).
+Return one JSON object mapping file paths to full file content:
+- index.html: meta/SEO/OpenGraph tags, stylesheet links, deferred module script, header nav, main, footer
+- components/hero.html, features.html, testimonials.html, pricing.html, contact.html
+- styles/main.css (custom properties, rem type scale, breakpoints, dark mode) and styles/components/<section>.css
+Example: {"components/hero.html": "<section class=\\"hero\\" aria-label=\\"Welcome\\">...", "styles/components/hero.css": ".hero {...}"}
+Semantic HTML5, WAI-ARIA, alt text, native lazy loading, BEM classes, mobile-first media queries, focus states.
+Real content for the niche. No placeholders or lorem ipsum, no external dependencies.
+"""),
+    "js_modules": Template("""
+Write complete vanilla JavaScript modules for $website_name ($niche_description).
+The page is built from these sections: $section_files
+Return one JSON object mapping file paths to full ES module source:
+- js/main.js: imports, DOMContentLoaded init, feature detection, error handling
+- js/modules/imageLoader.js (IntersectionObserver lazy loading, WebP detection), carousel.js (touch, keyboard, autoplay),
+  navigation.js (mobile menu, smooth scroll, active section), form.js (validation, submission states), animations.js
+  (scroll-triggered, reduced motion)
+- js/utils/analytics.js, validation.js, api.js (fetch wrapper with retries)
+Example: {"js/modules/carousel.js": "export class Carousel {...}"}
+ES6+, error handling on async code, JSDoc comments. No placeholder implementations, no external dependencies.
+"""),
+    "sections": Template("""
+Regenerate ONLY these landing page sections for $website_name ($niche_description): $sections.
+Return JSON with exactly these keys, each holding the complete file: $files
+The rest of the page stays as it is: $existing.
+Reuse the custom properties of styles/main.css and the BEM naming of the other components.
+Semantic HTML5, WAI-ARIA, mobile-first, focus states, real content for the niche. No placeholders, no external dependencies.
+"""),
+    "shell": Template("""
+Generate ONLY the page shell and shared styles for $website_name ($niche_description).
+Return JSON with exactly these keys, each holding the complete file: index.html, styles/main.css
+The rest of the page is generated separately: sections $sections as components/<section>.html and styles/components/<section>.css.
+- index.html: meta/SEO/OpenGraph tags, links to styles/main.css and every section stylesheet, deferred js/main.js,
+  header nav to every section id, empty <main id="main"></main>, footer
+- styles/main.css: keep these :root tokens: $tokens; rem type scale, breakpoints, grid, utilities, dark mode, header/footer
+Real content for the niche. No placeholders, no external dependencies.
+"""),
+    "section": Template("""
+Generate ONLY this landing page section for $website_name ($niche_description): $section.
+Return JSON with exactly these keys, each holding the complete file: $files
+The rest of the page is generated separately: $others.
+Contents: $brief.
+Use these design tokens via var(--name): $tokens
+$images
+<section id="$section">, BEM classes starting with "$section", WAI-ARIA, alt text, mobile-first, focus states.
+Real content for the niche. No placeholders, no external dependencies.
+"""),
+    "repair": Template("""
+Fix ONLY these files of the $stage output for $website_name ($niche_description).
+Return JSON with exactly these keys, each holding the complete file: $files$rest
+Rejected because:
+$problems
+Keep the paths, ids, class names and exports the accepted files rely on: $accepted.
+Real content for the niche. No placeholders, no external dependencies.
+"""),
+}
+
+# Added to a repair prompt when the response was cancelled before it reached every file
+UNFINISHED_NOTE = ", plus every other file of the stage that is not among the accepted ones"
+
+AGENTS = {"verbose": VERBOSE_AGENTS, "compact": COMPACT_AGENTS}
+TASKS = {"verbose": VERBOSE_TASKS, "compact": COMPACT_TASKS}
+
+
+def resolve_profile(profile: str = None) -> str:
+    """The profile to use: the one given, else PROMPT_PROFILE, else "verbose"."""
+    profile = profile or os.getenv("PROMPT_PROFILE", "verbose")
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown prompt profile {profile!r}, expected one of: {', '.join(PROFILES)}")
+    return profile
+
+
+def agent_prompt(profile: str, agent: str) -> Dict[str, str]:
+    """Role, goal and backstory of an agent."""
+    return AGENTS[profile][agent]
+
+
+@lru_cache(maxsize=512)
+def task_prompt(profile: str, stage: str, website_name: str, niche_description: str,
+                sections: Tuple[str, ...] = ()) -> str:
+    """Description of a stage's task for one site."""
+    return TASKS[profile][stage].substitute(
+        website_name=website_name,
+        niche_description=niche_description,
+        section_files=", ".join(f"components/{name}.html" for name in sections),
+    )
+
+
+@lru_cache(maxsize=512)
+def section_prompt(profile: str, website_name: str, niche_description: str, sections: Tuple[str, ...],
+                   existing: Tuple[str, ...]) -> str:
+    """Description of a components task limited to the given sections."""
+    files = []
+    for name in sections:
+        files += [f"components/{name}.html", f"styles/components/{name}.css"]
+    return TASKS[profile]["sections"].substitute(
+        website_name=website_name,
+        niche_description=niche_description,
+        sections=", ".join(sections),
+        files=", ".join(files),
+        existing=", ".join(existing) or "none",
+    )
+
+
+@lru_cache(maxsize=512)
+def part_prompt(profile: str, website_name: str, niche_description: str, part: str, sections: Tuple[str, ...],
+                tokens: str, images: str = "") -> str:
+    """Description of one subtask of the fanned-out components stage: the page shell and shared
+    styles ("shell") or a single section."""
+    if part == "shell":
+        return TASKS[profile]["shell"].substitute(website_name=website_name, niche_description=niche_description,
+                                                  sections=", ".join(sections), tokens=tokens)
+    others = ["index.html", "styles/main.css"] + [f"components/{name}.html" for name in sections if name != part]
+    return TASKS[profile]["section"].substitute(
+        website_name=website_name,
+        niche_description=niche_description,
+        section=part,
+        files=f"components/{part}.html, styles/components/{part}.css",
+        others=", ".join(others),
+        brief=SECTION_BRIEFS.get(part, f"the {part} content of the page"),
+        tokens=tokens,
+        images=f"Images for this section (use these URLs and alt texts): {images}\n" if images else "",
+    )
+
+
+@lru_cache(maxsize=512)
+def repair_prompt(profile: str, website_name: str, niche_description: str, stage: str,
+                  problems: Tuple[Tuple[str, str], ...], accepted: Tuple[str, ...], unfinished: bool = False) -> str:
+    """Description of a retry that asks only for the files of a stage that were rejected,
+    given as (path, reason) pairs, instead of the whole stage again. unfinished also asks for
+    the files a cancelled response never reached."""
+    return TASKS[profile]["repair"].substitute(
+        website_name=website_name,
+        niche_description=niche_description,
+        stage=stage,
+        files=", ".join(path for path, _ in problems),
+        problems="\n".join(f"- {path}: {reason}" for path, reason in problems),
+        accepted=", ".join(accepted) or "none",
+        rest=UNFINISHED_NOTE if unfinished else "",
+    )
+
+
+@lru_cache(maxsize=1024)
+def prompt_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    return count_tokens(text, model)
+
+
+def stage_prompt_tokens(description: str, agent: Dict[str, str], model: str = "gpt-3.5-turbo") -> int:
+    """Tokens a stage sends before any context from earlier stages: its task and its agent's
+    role, goal and backstory, which crewai adds to every call."""
+    return prompt_tokens(description, model) + sum(prompt_tokens(agent[key], model)
+                                                   for key in ("role", "goal", "backstory"))
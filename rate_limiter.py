@@ -0,0 +1,545 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import tempfile
+import threading
+import email.utils
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+try:
+    import fcntl
+except ImportError:  # Windows: the governor is only shared within the process
+    fcntl = None
+
+# Tokens charged up front for the completion of a request that does not set max_tokens;
+# corrected from the response's usage once it arrives
+DEFAULT_COMPLETION_ESTIMATE = 1000
+# Completions shorter than this are dominated by fixed per-request time, so their latency is
+# spread over this many tokens rather than over the few they produced
+LATENCY_TOKEN_FLOOR = 32
+
+
+def parse_retry_after(headers: httpx.Headers) -> Optional[float]:
+    """Seconds to wait according to retry-after-ms or Retry-After (seconds or an HTTP date)."""
+    try:
+        return max(0.0, float(headers["retry-after-ms"]) / 1000)
+    except (KeyError, ValueError):
+        pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _request_payload(request: httpx.Request) -> Optional[Dict[str, Any]]:
+    try:
+        payload = json.loads(request.content or b"{}")
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def _prompt_tokens(payload: Dict[str, Any]) -> int:
+    chars = sum(len(str(message.get("content") or "")) for message in payload.get("messages", [])
+                if isinstance(message, dict))
+    return chars // 4
+
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """Rough token count of a chat completion request: its messages at four characters per
+    token plus the completion it may produce."""
+    payload = _request_payload(request)
+    if payload is None:
+        return DEFAULT_COMPLETION_ESTIMATE
+    return _prompt_tokens(payload) + int(payload.get("max_tokens") or DEFAULT_COMPLETION_ESTIMATE)
+
+
+def _pid_alive(pid: str) -> bool:
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+class RateLimiter:
+    """Client-side governor for the LLM calls of every crew in a process and, through a
+    locked state file, of every process on the host.
+
+    Two token buckets cap requests and tokens per minute (LLM_RPM, LLM_TPM; each holds ten
+    seconds' worth for bursts). Below them an AIMD concurrency limit, the scheme TCP uses
+    for congestion: it grows by one per successful call until the first 429 (slow start),
+    then by about one per round of calls, slowing down close to the concurrency that was
+    last refused, and is cut to 70% of that concurrency on a 429, which also holds every
+    caller back for the response's Retry-After. Latency per completion token climbing well
+    above its long-run average shrinks the limit gently before the provider starts refusing
+    calls; raw latency would mostly track how long the answers are. A state left idle for
+    longer than state_ttl seconds starts over from the initial limit, so one run's throttling
+    does not hold back an unrelated run hours later.
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, initial_concurrency: int = 8, min_concurrency: int = 1,
+                 max_concurrency: int = 32, latency_tolerance: float = 2.0, state_path: Optional[str] = None,
+                 state_ttl: Optional[float] = 3600.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.request_capacity = max(1.0, rpm / 6)
+        self.token_capacity = max(1.0, tpm / 6)
+        self.initial_concurrency = max(min_concurrency, min(initial_concurrency, max_concurrency))
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_tolerance = latency_tolerance
+        self.state_path = state_path if fcntl is not None else None
+        self.state_ttl = state_ttl
+        self.pid = str(os.getpid())
+        # Slots this process holds; its entry in the shared leases is rewritten from it, so a
+        # stale entry left under a reused pid does not stay counted
+        self._held = 0
+        self._lock = threading.Lock()
+        # Wakes the callers of this process waiting for a slot when one is released
+        self._freed = threading.Condition()
+        self._state = self._initial_state()
+        # Counters of this process only; the shared state holds the host-wide ones
+        self.stats = {"calls": 0, "throttled": 0, "waits": 0, "wait_seconds": 0.0}
+
+    @classmethod
+    def from_env(cls, base_url: Optional[str] = None) -> Optional["RateLimiter"]:
+        """The governor for an endpoint from LLM_RATE_* and LLM_*_CONCURRENCY variables, or None
+        with LLM_RATE_LIMIT=off.
+
+        Calls through the same state file share one instance, so every crew in the process
+        draws from the same budget. LLM_RATE_STATE sets the file (by default one per endpoint
+        in the temp directory, shared by the processes on the host); "process" keeps the
+        governor within the process.
+        """
+        if os.getenv("LLM_RATE_LIMIT", "on") == "off":
+            return None
+        state_path = os.getenv("LLM_RATE_STATE")
+        if state_path is None:
+            digest = hashlib.sha1((base_url or "").encode("utf-8")).hexdigest()[:12]
+            state_path = os.path.join(tempfile.gettempdir(), f"landing-crew-ratelimit-{digest}.json")
+        elif state_path == "process":
+            state_path = None
+        key = f"{state_path or 'process'}|{base_url or ''}"
+        with _limiters_lock:
+            if key not in _limiters:
+                _limiters[key] = cls(
+                    rpm=float(os.getenv("LLM_RPM", "0")),
+                    tpm=float(os.getenv("LLM_TPM", "0")),
+                    initial_concurrency=int(os.getenv("LLM_INITIAL_CONCURRENCY", "8")),
+                    min_concurrency=int(os.getenv("LLM_MIN_CONCURRENCY", "1")),
+                    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+                    latency_tolerance=float(os.getenv("LLM_LATENCY_TOLERANCE", "2.0")),
+                    state_path=state_path,
+                    state_ttl=float(os.getenv("LLM_RATE_STATE_TTL_SECONDS", "3600")) or None,
+                )
+            return _limiters[key]
+
+    def _initial_state(self) -> Dict[str, Any]:
+        return {"requests": self.request_capacity, "tokens": self.token_capacity, "refilled": time.time(),
+                "limit": float(self.initial_concurrency), "slow_start": True, "ceiling": None,
+                "cooldown_until": 0.0, "decreased": 0.0,
+                "latency_short": None, "latency_long": None, "leases": {}, "active": time.time()}
+
+    def _expire(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """The state, started over but for the calls in flight when no call has used it for state_ttl."""
+        if self.state_ttl and time.time() - state["active"] > self.state_ttl:
+            return {**self._initial_state(), "leases": state["leases"]}
+        return state
+
+    @contextmanager
+    def _locked(self):
+        """The governor's state, read and written back under the process lock and, with a
+        state file, an exclusive lock on it."""
+        with self._lock:
+            if not self.state_path:
+                self._state = self._expire(self._state)
+                yield self._state
+                return
+            with open(self.state_path, "a+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        state = self._expire({**self._initial_state(), **json.loads(f.read() or "{}")})
+                    except ValueError:
+                        state = self._initial_state()
+                    yield state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refill(self, state: Dict[str, Any], now: float):
+        elapsed = max(0.0, now - state["refilled"])
+        state["refilled"] = now
+        state["requests"] = min(self.request_capacity, state["requests"] + elapsed * self.rpm / 60)
+        state["tokens"] = min(self.token_capacity, state["tokens"] + elapsed * self.tpm / 60)
+        # Calls of processes that died mid-flight no longer count against the limit
+        for pid in [pid for pid in state["leases"] if pid != self.pid and not _pid_alive(pid)]:
+            del state["leases"][pid]
+        self._record_held(state)
+
+    def _record_held(self, state: Dict[str, Any]):
+        if self._held:
+            state["leases"][self.pid] = self._held
+        else:
+            state["leases"].pop(self.pid, None)
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """Take a slot for a call of about this many tokens: returns 0 when it was taken,
+        otherwise the seconds to wait before trying again."""
+        with self._locked() as state:
+            now = time.time()
+            self._refill(state, now)
+            if state["cooldown_until"] > now:
+                return state["cooldown_until"] - now
+            if sum(state["leases"].values()) >= int(state["limit"]):
+                # Slots free up as calls finish; jitter keeps waiting callers from waking together
+                return random.uniform(0.02, 0.08)
+            waits = []
+            if self.rpm and state["requests"] < 1:
+                waits.append((1 - state["requests"]) * 60 / self.rpm)
+            cost = min(float(tokens), self.token_capacity) if self.tpm else 0.0
+            if self.tpm and state["tokens"] < cost:
+                waits.append((cost - state["tokens"]) * 60 / self.tpm)
+            if waits:
+                return max(waits)
+            if self.rpm:
+                state["requests"] -= 1
+            state["tokens"] -= cost
+            self._held += 1
+            self._record_held(state)
+            state["active"] = now
+            self.stats["calls"] += 1
+        return 0.0
+
+    def acquire(self, tokens: int = 0):
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            self._count_wait(wait)
+            with self._freed:
+                self._freed.wait(wait)
+
+    async def acquire_async(self, tokens: int = 0):
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            self._count_wait(wait)
+            await asyncio.sleep(wait)
+
+    def _count_wait(self, wait: float):
+        with self._lock:
+            self.stats["waits"] += 1
+            self.stats["wait_seconds"] += wait
+
+    def release(self, tokens: int = 0, used: Optional[int] = None, latency: Optional[float] = None,
+                status: int = 200, retry_after: Optional[float] = None, completion_tokens: Optional[int] = None):
+        """Return a call's slot and adjust the limits from how it went."""
+        self._update(tokens, used, latency, status, retry_after, completion_tokens)
+        with self._freed:
+            self._freed.notify_all()
+
+    def _update(self, tokens, used, latency, status, retry_after, completion_tokens):
+        with self._locked() as state:
+            now = time.time()
+            self._record_held(state)
+            in_flight = sum(state["leases"].values())
+            self._held = max(0, self._held - 1)
+            self._record_held(state)
+            state["active"] = now
+            if self.tpm and used is not None:
+                # Settle the estimate charged up front against what the call actually used
+                state["tokens"] = min(self.token_capacity, state["tokens"] + min(float(tokens), self.token_capacity) - used)
+
+            if status == 429:
+                self.stats["throttled"] += 1
+                wait = retry_after if retry_after is not None else random.uniform(0.5, 1.5)
+                state["cooldown_until"] = max(state["cooldown_until"], now + wait)
+                # One decrease per burst of 429s: the calls in flight when it started all fail together
+                if now - state["decreased"] > wait:
+                    state["ceiling"] = in_flight
+                    state["limit"] = max(float(self.min_concurrency), min(state["limit"], in_flight) * 0.7)
+                    state["slow_start"] = False
+                    state["decreased"] = now
+                return
+            if status >= 400 or latency is None:
+                return
+
+            congested = False
+            if completion_tokens:
+                # Seconds per completion token, so short and long answers are compared fairly
+                sample = latency / max(completion_tokens, LATENCY_TOKEN_FLOOR)
+                short, long = state["latency_short"], state["latency_long"]
+                state["latency_short"] = sample if short is None else 0.7 * short + 0.3 * sample
+                state["latency_long"] = sample if long is None else 0.98 * long + 0.02 * sample
+                congested = (self.latency_tolerance
+                             and state["latency_short"] > self.latency_tolerance * state["latency_long"]
+                             and now - state["decreased"] > latency)
+            if congested:
+                state["limit"] = max(float(self.min_concurrency), state["limit"] * 0.9)
+                state["slow_start"] = False
+                state["decreased"] = now
+            else:
+                if state["slow_start"]:
+                    step = 1.0
+                elif state["ceiling"] and state["ceiling"] - 1 <= state["limit"] < state["ceiling"] + 1:
+                    # Probe the concurrency that was refused last only rarely
+                    step = 0.1 / state["limit"]
+                else:
+                    step = 1 / state["limit"]
+                state["limit"] = min(float(self.max_concurrency), state["limit"] + step)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current limit, calls in flight and bucket levels, plus this process's counters."""
+        with self._locked() as state:
+            self._refill(state, time.time())
+            return {
+                "limit": round(state["limit"], 2),
+                "in_flight": sum(state["leases"].values()),
+                "requests_available": round(state["requests"], 2) if self.rpm else None,
+                "tokens_available": round(state["tokens"]) if self.tpm else None,
+                "cooldown_seconds": round(max(0.0, state["cooldown_until"] - time.time()), 2),
+                **self.stats,
+            }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _usage_tokens(content: bytes) -> Tuple[Optional[int], Optional[int]]:
+    """Total and completion tokens from a response's usage block."""
+    try:
+        usage = json.loads(content).get("usage") or {}
+    except (ValueError, AttributeError):
+        return None, None
+    return usage.get("total_tokens"), usage.get("completion_tokens")
+
+
+def _streamed(request: httpx.Request, include_usage: bool) -> Tuple[httpx.Request, Optional[int]]:
+    """For a streamed chat completion, the request asking for a final usage chunk when
+    include_usage is set, and the prompt's estimated tokens; (request, None) for other requests."""
+    payload = _request_payload(request)
+    if payload is None or payload.get("stream") is not True:
+        return request, None
+    if include_usage and "stream_options" not in payload:
+        payload["stream_options"] = {"include_usage": True}
+        headers = [(name, value) for name, value in request.headers.multi_items() if name.lower() != "content-length"]
+        request = httpx.Request(request.method, request.url, headers=headers, content=json.dumps(payload).encode("utf-8"),
+                                extensions=request.extensions)
+    return request, _prompt_tokens(payload)
+
+
+class _StreamUsage:
+    """Token usage of a streamed chat completion, read from its server-sent events as they
+    pass: the usage chunk when the provider sends one, otherwise the streamed text at four
+    characters per token."""
+
+    def __init__(self, prompt_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.usage: Optional[Dict[str, Any]] = None
+        self.chars = 0
+        self._pending = b""
+
+    def feed(self, data: bytes):
+        *lines, self._pending = (self._pending + data).split(b"\n")
+        for line in lines:
+            if not line.startswith(b"data:"):
+                continue
+            try:
+                event = json.loads(line[5:])
+            except ValueError:  # the closing "[DONE]"
+                continue
+            if not isinstance(event, dict):
+                continue
+            if event.get("usage"):
+                self.usage = event["usage"]
+            for choice in event.get("choices") or []:
+                self.chars += len((choice.get("delta") or {}).get("content") or "")
+
+    def tokens(self) -> Tuple[Optional[int], Optional[int]]:
+        """Total and completion tokens, or (None, None) when nothing was streamed."""
+        if self.usage:
+            return self.usage.get("total_tokens"), self.usage.get("completion_tokens")
+        if not self.chars:
+            return None, None
+        completion = -(-self.chars // 4)
+        return self.prompt_tokens + completion, completion
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Holds a streamed call's slot until its body has been read or closed, counting the
+    tokens that pass."""
+
+    def __init__(self, stream, usage: _StreamUsage, release):
+        self.stream = stream
+        self.usage = usage
+        self.release = release
+
+    def __iter__(self):
+        for chunk in self.stream:
+            self.usage.feed(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            self.release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, usage: _StreamUsage, release):
+        self.stream = stream
+        self.usage = usage
+        self.release = release
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            self.usage.feed(chunk)
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            self.release()
+
+
+class _Call:
+    """One attempt of a request holding a RateLimiter slot, which it returns exactly once."""
+
+    def __init__(self, limiter: RateLimiter, tokens: int):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.started = time.perf_counter()
+        self.released = False
+
+    def release(self, response: Optional[httpx.Response] = None, usage: Optional[Tuple] = None):
+        """Return the slot; `usage` is (total, completion) tokens of a streamed response, whose
+        body is not kept, and the latency runs to the end of the stream."""
+        if self.released:
+            return
+        self.released = True
+        if response is None:
+            self.limiter.release(self.tokens)
+            return
+        latency = time.perf_counter() - self.started
+        if usage is None:
+            usage = _usage_tokens(response.content) if response.status_code == 200 else (None, None)
+        used, completion = usage
+        self.limiter.release(self.tokens, used, latency, response.status_code,
+                             parse_retry_after(response.headers) if response.status_code == 429 else None,
+                             completion_tokens=completion)
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """httpx transport that sends every request through a RateLimiter and retries 429s itself
+    once the shared cooldown has passed, so throttling never reaches the OpenAI client.
+
+    Streamed completions ask for a final usage chunk (stream_options.include_usage) unless
+    stream_usage is off, so their tokens and latency feed the limiter like any other call."""
+
+    def __init__(self, limiter: RateLimiter, transport: Optional[httpx.BaseTransport] = None,
+                 max_attempts: int = 6, stream_usage: bool = True):
+        self.limiter = limiter
+        self.transport = transport or httpx.HTTPTransport()
+        self.max_attempts = max_attempts
+        self.stream_usage = stream_usage
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = estimate_tokens(request)
+        request, prompt_tokens = _streamed(request, self.stream_usage)
+        for attempt in range(1, self.max_attempts + 1):
+            self.limiter.acquire(tokens)
+            call = _Call(self.limiter, tokens)
+            try:
+                response = self.transport.handle_request(request)
+            except BaseException:
+                call.release()
+                raise
+            if prompt_tokens is not None and response.status_code == 200:
+                usage = _StreamUsage(prompt_tokens)
+                response.stream = _ReleasingStream(response.stream, usage,
+                                                   lambda: call.release(response, usage.tokens()))
+                return response
+            try:
+                response.read()
+            except BaseException:
+                call.release()
+                raise
+            finally:
+                response.close()
+            call.release(response)
+            if response.status_code != 429:
+                return response
+        # Out of attempts: the OpenAI client should not add retries of its own
+        response.headers["x-should-retry"] = "false"
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """The async counterpart of RateLimitedTransport, drawing from the same RateLimiter."""
+
+    def __init__(self, limiter: RateLimiter, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 max_attempts: int = 6, stream_usage: bool = True):
+        self.limiter = limiter
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.max_attempts = max_attempts
+        self.stream_usage = stream_usage
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = estimate_tokens(request)
+        request, prompt_tokens = _streamed(request, self.stream_usage)
+        for attempt in range(1, self.max_attempts + 1):
+            await self.limiter.acquire_async(tokens)
+            call = _Call(self.limiter, tokens)
+            try:
+                response = await self.transport.handle_async_request(request)
+            except BaseException:
+                call.release()
+                raise
+            if prompt_tokens is not None and response.status_code == 200:
+                usage = _StreamUsage(prompt_tokens)
+                response.stream = _AsyncReleasingStream(response.stream, usage,
+                                                        lambda: call.release(response, usage.tokens()))
+                return response
+            try:
+                await response.aread()
+            except BaseException:
+                call.release()
+                raise
+            finally:
+                await response.aclose()
+            call.release(response)
+            if response.status_code != 429:
+                return response
+        response.headers["x-should-retry"] = "false"
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,109 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional
+
+
+class TaskGraph:
+    """Runs named stages concurrently as soon as the stages they depend on have finished."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, fn: Callable[[], Any], depends_on: Optional[List[str]] = None):
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already registered")
+        self.stages[name] = {"fn": fn, "depends_on": list(depends_on or [])}
+
+    def _validate(self):
+        for name, stage in self.stages.items():
+            missing = [dep for dep in stage["depends_on"] if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{name}' depends on unknown stages: {', '.join(missing)}")
+
+    def run(self, max_workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Execute every stage and return a timeline entry per stage.
+
+        A failing stage does not stop its dependents; its exception is recorded in the
+        timeline and dependents run with whatever context is available.
+        """
+        self._validate()
+        timeline: Dict[str, Dict[str, Any]] = {}
+        pending = dict(self.stages)
+        running = {}
+        run_started = time.perf_counter()
+
+        def execute(name, fn):
+            entry = {
+                "stage": name,
+                "depends_on": self.stages[name]["depends_on"],
+                "start": round(time.perf_counter() - run_started, 3),
+                "result": None,
+                "error": None,
+            }
+            try:
+                entry["result"] = fn()
+            except Exception as e:
+                entry["error"] = f"{type(e).__name__}: {e}"
+            entry["end"] = round(time.perf_counter() - run_started, 3)
+            entry["duration"] = round(entry["end"] - entry["start"], 3)
+            return entry
+
+        with ThreadPoolExecutor(max_workers=max_workers or max(1, len(self.stages))) as pool:
+            while pending or running:
+                ready = [name for name, stage in pending.items()
+                         if all(dep in timeline for dep in stage["depends_on"])]
+                for name in ready:
+                    stage = pending.pop(name)
+                    running[pool.submit(execute, name, stage["fn"])] = name
+
+                if not running:
+                    raise ValueError(f"Dependency cycle between stages: {', '.join(pending)}")
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    timeline[name] = future.result()
+
+        return timeline
+
+
+def critical_path(timeline: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Walk back from the last stage to finish through the dependency that finished last."""
+    if not timeline:
+        return []
+    current = max(timeline.values(), key=lambda entry: entry["end"])
+    path = [current["stage"]]
+    while current["depends_on"]:
+        current = max((timeline[dep] for dep in current["depends_on"]), key=lambda entry: entry["end"])
+        path.append(current["stage"])
+    return list(reversed(path))
+
+
+def summarize_timeline(timeline: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Build a JSON-friendly timeline report including the critical path and parallel speedup."""
+    stages = sorted(timeline.values(), key=lambda entry: entry["start"])
+    wall_time = max((entry["end"] for entry in stages), default=0.0)
+    serial_time = sum(entry["duration"] for entry in stages)
+    return {
+        "stages": [{k: v for k, v in entry.items() if k != "result"} for entry in stages],
+        "critical_path": critical_path(timeline),
+        "wall_time": round(wall_time, 3),
+        "serial_time": round(serial_time, 3),
+        "speedup": round(serial_time / wall_time, 2) if wall_time > 0 else 1.0,
+    }
+
+
+def format_timeline(summary: Dict[str, Any], width: int = 40) -> List[str]:
+    """Render a timeline summary as a text Gantt chart."""
+    wall_time = summary["wall_time"] or 1.0
+    on_path = set(summary["critical_path"])
+    lines = []
+    for entry in summary["stages"]:
+        offset = int(entry["start"] / wall_time * width)
+        length = max(1, int(entry["duration"] / wall_time * width))
+        bar = " " * offset + ("#" if entry["stage"] in on_path else "=") * length
+        status = "⚠" if entry["error"] else "✓"
+        lines.append(f"  {status} {entry['stage']:<12} |{bar:<{width}}| {entry['start']:>7.1f}s → {entry['end']:>7.1f}s")
+    lines.append(f"  Critical path: {' → '.join(summary['critical_path'])}")
+    lines.append(f"  Wall time: {summary['wall_time']:.1f}s (serial {summary['serial_time']:.1f}s, {summary['speedup']}x)")
+    return lines
@@ -0,0 +1,393 @@
+"""Long-running HTTP service that queues landing page generations and runs them on a pool of
+warm workers, so clients share one process instead of starting a Python process per site.
+
+    python service.py --port 8080 --workers 2
+
+Endpoints:
+    POST   /jobs                  submit {"website_name", "niche_description"[, "prompt_profile",
+                                  "stages", "sections"]}; stages/sections regenerate an existing site
+    GET    /jobs                  every job, newest first
+    GET    /jobs/{id}             status, timings, queue position and error
+    GET    /jobs/{id}/result      the compile_output dict of a finished job
+    GET    /jobs/{id}/site.zip    the generated site (?dist=1 for just the production build)
+    DELETE /jobs/{id}             cancel a queued or running job
+    POST   /jobs/{id}/resume      continue a checkpointed job, e.g. one interrupted by a restart
+    GET    /health                worker, queue, rate limiter and connection pool counters
+"""
+import io
+import os
+import json
+import time
+import uuid
+import asyncio
+import zipfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+import prompts
+from crew import LandingPageCrew
+from job_store import JobStore
+from rate_limiter import RateLimiter
+from llm_clients import pool_stats
+from site_writer import STATE_DIR_NAME
+
+TERMINAL_STATES = ("succeeded", "failed", "cancelled")
+
+
+class ServiceError(Exception):
+    """A request the service refuses, with the HTTP status to answer it with."""
+
+    def __init__(self, status: int, message: str, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+class Job:
+    """One generation request and everything known about it so far."""
+
+    def __init__(self, website_name: str, niche_description: str, prompt_profile: Optional[str] = None,
+                 stages: Optional[List[str]] = None, sections: Optional[List[str]] = None,
+                 job_id: Optional[str] = None, resume: bool = False):
+        # The same id names the job in the job store, where its stages are checkpointed
+        self.id = job_id or uuid.uuid4().hex
+        self.resume = resume
+        self.website_name = website_name
+        self.niche_description = niche_description
+        self.prompt_profile = prompt_profile
+        self.stages = stages
+        self.sections = sections
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.output_dir: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.usage: Optional[Dict[str, Any]] = None
+        self.crew: Optional[LandingPageCrew] = None
+        self.cancel_requested = False
+
+    @property
+    def regenerate(self) -> bool:
+        return bool(self.stages or self.sections)
+
+    def to_dict(self, position: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "website_name": self.website_name,
+            "niche_description": self.niche_description,
+            "prompt_profile": self.prompt_profile,
+            "stages": self.stages,
+            "sections": self.sections,
+            "status": self.status,
+            "queue_position": position,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "duration": round((self.finished or time.time()) - self.started, 3) if self.started else None,
+            "output_dir": self.output_dir,
+            "usage": self.usage,
+            "task_states": self.crew.task_states if self.crew else None,
+        }
+
+
+class GenerationService:
+    """Job queue in front of a fixed pool of generation threads.
+
+    Crews run on threads of one long-lived process, so the LLM response cache, the image index
+    and the URL liveness cache stay warm across jobs. Two active jobs may not write the same
+    site, since output directories are derived from the website name.
+    """
+
+    def __init__(self, workers: int = 2, output_root: str = "", max_queue: int = 100, history: int = 1000):
+        self.workers = max(1, workers)
+        self.output_root = output_root
+        self.max_queue = max_queue
+        self.history = history
+        self.jobs: Dict[str, Job] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self.store = JobStore.from_env(os.path.join(os.path.abspath(output_root), STATE_DIR_NAME))
+
+    @classmethod
+    def from_env(cls, workers: Optional[int] = None, output_root: Optional[str] = None) -> "GenerationService":
+        """Build a service from SERVICE_WORKERS, SERVICE_OUTPUT_ROOT, SERVICE_MAX_QUEUE and SERVICE_JOB_HISTORY;
+        workers and output_root given here take precedence."""
+        return cls(
+            workers=workers or int(os.getenv("SERVICE_WORKERS", "2")),
+            output_root=os.getenv("SERVICE_OUTPUT_ROOT", "") if output_root is None else output_root,
+            max_queue=int(os.getenv("SERVICE_MAX_QUEUE", "100")),
+            history=int(os.getenv("SERVICE_JOB_HISTORY", "1000")),
+        )
+
+    async def start(self, app: web.Application = None):
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="generation")
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        print(f"✓ Generation service started with {self.workers} workers")
+        # Job store lookups are blocking database calls, so they stay off the event loop
+        loop = asyncio.get_running_loop()
+        interrupted = await loop.run_in_executor(None, self.store.unfinished) if self.store else []
+        if interrupted:
+            print(f"⚠ {len(interrupted)} jobs were interrupted and can be resumed: "
+                  + ", ".join(f"{job['id']} ({job['website_name']})" for job in interrupted))
+
+    async def stop(self, app: web.Application = None):
+        for job in self.jobs.values():
+            if job.status in ("queued", "running"):
+                self._cancel(job, "service shutting down")
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        # Running crews stop at their next LLM call
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    def active(self) -> List[Job]:
+        return [job for job in self.jobs.values() if job.status in ("queued", "running")]
+
+    def position(self, job: Job) -> Optional[int]:
+        if job.status != "queued":
+            return None
+        return sum(1 for other in self.jobs.values() if other.status == "queued" and other.created < job.created)
+
+    def submit(self, payload: Dict[str, Any]) -> Job:
+        if not isinstance(payload, dict):
+            raise ServiceError(400, "Request body must be a JSON object")
+        name = payload.get("website_name")
+        niche = payload.get("niche_description")
+        if not isinstance(name, str) or not name.strip() or not isinstance(niche, str) or not niche.strip():
+            raise ServiceError(400, "website_name and niche_description are required strings")
+        stages = payload.get("stages") or None
+        sections = payload.get("sections") or None
+        if not all(value is None or isinstance(value, list) for value in (stages, sections)):
+            raise ServiceError(400, "stages and sections must be lists")
+        unknown = [s for s in stages or [] if not isinstance(s, str) or s not in LandingPageCrew.TASK_DEPENDENCIES]
+        unknown += [s for s in sections or [] if not isinstance(s, str) or s not in LandingPageCrew.SECTIONS]
+        if unknown:
+            raise ServiceError(400, f"Unknown stages or sections: {', '.join(map(str, unknown))}")
+        try:
+            profile = prompts.resolve_profile(payload.get("prompt_profile"))
+        except ValueError as e:
+            raise ServiceError(400, str(e))
+
+        return self._enqueue(Job(name.strip(), niche.strip(), profile, stages, sections))
+
+    async def resume(self, job_id: str) -> Job:
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(None, self.store.job, job_id) if self.store else None
+        if stored is None:
+            raise ServiceError(404, "Unknown job")
+        return self._enqueue(Job(stored["website_name"], stored["niche_description"], stored["prompt_profile"],
+                                 job_id=job_id, resume=True))
+
+    def _enqueue(self, job: Job) -> Job:
+        for other in self.active():
+            if other.website_name.lower() == job.website_name.lower():
+                raise ServiceError(409, f"A job for {other.website_name} is already {other.status}", job_id=other.id)
+        if sum(1 for other in self.jobs.values() if other.status == "queued") >= self.max_queue:
+            raise ServiceError(503, "Job queue is full, retry later")
+        self.jobs[job.id] = job
+        self.queue.put_nowait(job)
+        self._prune()
+        return job
+
+    def cancel(self, job: Job) -> bool:
+        if job.status in TERMINAL_STATES:
+            return False
+        self._cancel(job, "cancelled by request")
+        return True
+
+    def _cancel(self, job: Job, reason: str):
+        job.cancel_requested = True
+        if job.status == "queued":
+            # The worker skips it when it comes off the queue
+            job.status = "cancelled"
+            job.error = reason
+            job.finished = time.time()
+        elif job.crew is not None:
+            job.crew.cancel(reason)
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if job.status in TERMINAL_STATES]
+        for job in sorted(finished, key=lambda j: j.created)[:max(0, len(finished) - self.history)]:
+            del self.jobs[job.id]
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.status != "queued":
+                    continue
+                job.status = "running"
+                job.started = time.time()
+                await loop.run_in_executor(self.executor, self._run, job)
+                print(f"{'✓' if job.status == 'succeeded' else '⚠'} Job {job.id[:8]} ({job.website_name}) "
+                      f"{job.status} in {job.finished - job.started:.1f}s")
+            finally:
+                self.queue.task_done()
+
+    def _run(self, job: Job):
+        """Run one job to completion on a worker thread."""
+        try:
+            if job.resume:
+                crew = LandingPageCrew.from_job(job.id, output_root=self.output_root)
+            else:
+                crew = LandingPageCrew(job.website_name, job.niche_description, output_root=self.output_root,
+                                       prompt_profile=job.prompt_profile, job_id=job.id)
+            job.crew = crew
+            job.output_dir = crew.output_dir
+            if job.cancel_requested:
+                crew.cancel("cancelled by request")
+            if job.resume:
+                output = crew.resume()
+            elif job.regenerate:
+                output = crew.regenerate(stages=job.stages, sections=job.sections)
+            else:
+                output = crew.run()
+            if crew.usage_report:
+                job.usage = crew.usage_report["total"]
+            if output is not None:
+                job.result = output
+                job.status = "succeeded"
+            elif job.cancel_requested:
+                job.status = "cancelled"
+                job.error = crew.usage.cancelled
+            else:
+                job.status = "failed"
+                job.error = (crew.usage_report or {}).get("budget_exceeded") or "generation returned no output"
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            job.finished = time.time()
+
+    def health(self) -> Dict[str, Any]:
+        counts = {status: 0 for status in ("queued", "running") + TERMINAL_STATES}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        limiter = RateLimiter.from_env(os.getenv("OPENROUTER_BASE_URL"))
+        return {"workers": self.workers, "busy": counts["running"], "max_queue": self.max_queue, "jobs": counts,
+                "rate_limiter": limiter.snapshot() if limiter else None, "llm_pools": pool_stats()}
+
+
+def zip_site(site_dir: str, dist_only: bool = False) -> bytes:
+    root = os.path.join(site_dir, "dist") if dist_only else site_dir
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                archive.write(path, os.path.relpath(path, root))
+    return buffer.getvalue()
+
+
+def json_response(data: Any, status: int = 200) -> web.Response:
+    return web.json_response(data, status=status, dumps=lambda obj: json.dumps(obj, default=str))
+
+
+def create_app(service: GenerationService) -> web.Application:
+    app = web.Application()
+    routes = web.RouteTableDef()
+
+    def find(request: web.Request) -> Job:
+        job = service.jobs.get(request.match_info["job_id"])
+        if job is None:
+            raise ServiceError(404, "Unknown job")
+        return job
+
+    @web.middleware
+    async def errors(request, handler):
+        try:
+            return await handler(request)
+        except ServiceError as e:
+            return json_response({"error": str(e), **e.extra}, status=e.status)
+
+    @routes.post("/jobs")
+    async def submit(request):
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            raise ServiceError(400, "Request body is not valid JSON")
+        job = service.submit(payload)
+        return json_response(job.to_dict(service.position(job)), status=202)
+
+    @routes.get("/jobs")
+    async def list_jobs(request):
+        jobs = sorted(service.jobs.values(), key=lambda j: j.created, reverse=True)
+        return json_response({"jobs": [job.to_dict(service.position(job)) for job in jobs]})
+
+    @routes.get("/jobs/{job_id}")
+    async def status(request):
+        job = find(request)
+        return json_response(job.to_dict(service.position(job)))
+
+    @routes.get("/jobs/{job_id}/result")
+    async def result(request):
+        job = find(request)
+        if job.status != "succeeded":
+            raise ServiceError(409, f"Job is {job.status}", job_status=job.status)
+        return json_response(job.result)
+
+    @routes.get("/jobs/{job_id}/site.zip")
+    async def download(request):
+        job = find(request)
+        if job.status != "succeeded":
+            raise ServiceError(409, f"Job is {job.status}", job_status=job.status)
+        dist_only = request.query.get("dist") == "1"
+        if dist_only and not os.path.isdir(os.path.join(job.output_dir, "dist")):
+            raise ServiceError(404, "No production build for this job")
+        body = await asyncio.get_running_loop().run_in_executor(None, zip_site, job.output_dir, dist_only)
+        filename = os.path.basename(job.output_dir) + ("-dist" if dist_only else "") + ".zip"
+        return web.Response(body=body, content_type="application/zip",
+                            headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+    @routes.delete("/jobs/{job_id}")
+    async def cancel(request):
+        job = find(request)
+        if not service.cancel(job):
+            raise ServiceError(409, f"Job already {job.status}", job_status=job.status)
+        return json_response(job.to_dict(service.position(job)), status=202)
+
+    @routes.post("/jobs/{job_id}/resume")
+    async def resume(request):
+        job = await service.resume(request.match_info["job_id"])
+        return json_response(job.to_dict(service.position(job)), status=202)
+
+    @routes.get("/health")
+    async def health(request):
+        # The rate limiter snapshot takes a file lock shared with other processes
+        return json_response(await asyncio.get_running_loop().run_in_executor(None, service.health))
+
+    app.middlewares.append(errors)
+    app.add_routes(routes)
+    app.on_startup.append(service.start)
+    app.on_cleanup.append(service.stop)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve landing page generation jobs over HTTP.")
+    parser.add_argument("--host", default=os.getenv("SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVICE_PORT", "8080")))
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent generations (default: SERVICE_WORKERS)")
+    parser.add_argument("--output-root", default=None, help="Directory that receives the <name>_generated folders")
+    args = parser.parse_args()
+
+    # The output root is final before the service opens its job store under it
+    service = GenerationService.from_env(workers=args.workers, output_root=args.output_root)
+    if service.output_root:
+        os.makedirs(service.output_root, exist_ok=True)
+    print(f"Landing page service listening on http://{args.host}:{args.port}")
+    web.run_app(create_app(service), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import errno
+import ctypes
+import shutil
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Union
+
+STATE_DIR_NAME = ".landing_state"
+
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+_renameat2 = None
+if sys.platform.startswith("linux"):
+    try:
+        _renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+        _renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    except (OSError, AttributeError):  # glibc before 2.28 has no renameat2 wrapper
+        _renameat2 = None
+
+
+def state_dir_for(output_dir: str) -> str:
+    """Directory for bookkeeping about a generated site, kept beside it rather than inside it
+    so nothing in it is ever published with the site."""
+    output_dir = os.path.abspath(output_dir)
+    return os.path.join(os.path.dirname(output_dir), STATE_DIR_NAME, os.path.basename(output_dir))
+
+
+def site_path(name: str, folder: str = "") -> str:
+    """Resolve a generated file name to a path relative to the site root.
+
+    Agents return root-relative paths such as "components/hero.html"; bare names like
+    "hero.html" are placed in the folder for their category. Absolute paths and ".."
+    segments are rejected so generated output can never escape the site directory.
+    """
+    name = name.replace("\\", "/").strip()
+    parts = [part for part in name.split("/") if part not in ("", ".")]
+    if not parts or ".." in parts or os.path.isabs(name):
+        raise ValueError(f"Unsafe output path: {name!r}")
+    if len(parts) == 1 and folder and parts[0] != "index.html":
+        parts.insert(0, folder)
+    return "/".join(parts)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def exchange_paths(first: str, second: str) -> bool:
+    """Swap two existing paths in one atomic step with renameat2(RENAME_EXCHANGE).
+
+    Returns False where the platform or filesystem does not support it.
+    """
+    if _renameat2 is None:
+        return False
+    if _renameat2(AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE) == 0:
+        return True
+    error = ctypes.get_errno()
+    if error in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+        return False
+    raise OSError(error, os.strerror(error), first, None, second)
+
+
+class SiteWriter:
+    """Writes a generated site into a staging directory and swaps it into place.
+
+    Files are written by a thread pool. A file whose content hash matches the previous run
+    is hard-linked from the live site instead of being rewritten, so its inode, mtime and
+    bytes on disk are untouched. Files with identical content in one write, such as the
+    images a production build copies into dist/, are stored once and hard-linked.
+
+    The live directory is only replaced once every file has been staged, so a crash leaves
+    either the old site or the new one, never a mix. On Linux the replacement is a single
+    renameat2(RENAME_EXCHANGE), so readers of the directory always find a complete site;
+    elsewhere it is two renames, and the site is briefly missing between them.
+    """
+
+    MANIFEST = "files.json"
+    PARALLEL_THRESHOLD = 16
+
+    def __init__(self, output_dir: str, workers: int = 8, state_dir: Optional[str] = None):
+        self.output_dir = os.path.abspath(output_dir)
+        self.workers = max(1, workers)
+        self.state_dir = state_dir or state_dir_for(self.output_dir)
+
+    def load_manifest(self) -> Dict[str, Dict]:
+        try:
+            with open(os.path.join(self.state_dir, self.MANIFEST), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_manifest(self, manifest: Dict[str, Dict]):
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = os.path.join(self.state_dir, self.MANIFEST)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def _remove_stale_staging(self, parent: str, prefix: str):
+        """Clean up after runs that crashed before or during the swap."""
+        names = [name for name in os.listdir(parent) if name.startswith(prefix)]
+        backups = sorted((name for name in names if name.endswith(".old")),
+                         key=lambda name: os.path.getmtime(os.path.join(parent, name)))
+        if backups and not os.path.exists(self.output_dir):
+            # A crash between the two renames of a swap leaves the old site only as its backup
+            restored = backups[-1]
+            os.rename(os.path.join(parent, restored), self.output_dir)
+            names.remove(restored)
+            print(f"⚠ Restored {self.output_dir} from an interrupted swap")
+        for name in names:
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+    def _stage_file(self, staging: str, rel_path: str, data: bytes, digest: str, previous: Optional[Dict]):
+        target = os.path.join(staging, rel_path)
+        linked = False
+        if previous and previous.get("sha256") == digest:
+            live = os.path.join(self.output_dir, rel_path)
+            try:
+                stat = os.stat(live)
+                # Only trust the old file if nothing has modified it since we wrote it
+                if stat.st_size == previous.get("size") and stat.st_mtime_ns == previous.get("mtime_ns"):
+                    os.link(live, target)
+                    linked = True
+            except OSError:
+                pass
+        if not linked:
+            with open(target, "wb") as f:
+                f.write(data)
+        stat = os.stat(target)
+        return rel_path, {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}, linked
+
+    def write(self, files: Dict[str, Union[str, bytes]]) -> Dict:
+        """Write files (root-relative path -> content) as the new contents of the site.
+
+        Returns counts of written, unchanged, duplicate and removed files.
+        """
+        started = time.perf_counter()
+        parent = os.path.dirname(self.output_dir)
+        os.makedirs(parent, exist_ok=True)
+        prefix = f".{os.path.basename(self.output_dir)}.staging-"
+        self._remove_stale_staging(parent, prefix)
+
+        previous = self.load_manifest()
+        payloads = {path: data.encode("utf-8") if isinstance(data, str) else data for path, data in files.items()}
+
+        # Staging on the same filesystem as the site keeps the final rename atomic
+        staging = tempfile.mkdtemp(prefix=prefix, dir=parent)
+        try:
+            # mkdtemp creates the directory private to us; the published site must be readable
+            os.chmod(staging, 0o755)
+            for directory in {os.path.dirname(path) for path in payloads}:
+                if directory:
+                    os.makedirs(os.path.join(staging, directory), exist_ok=True)
+
+            if len(payloads) < self.PARALLEL_THRESHOLD:
+                # Starting a pool costs more than it saves for a handful of files
+                pool = None
+                run = map
+            else:
+                pool = ThreadPoolExecutor(max_workers=self.workers)
+                run = pool.map
+            try:
+                digests = dict(zip(payloads, run(content_hash, payloads.values())))
+                # The first path with each content is staged; the others become hard links to it
+                originals: Dict[str, str] = {}
+                for path, digest in digests.items():
+                    originals.setdefault(digest, path)
+                staged = list(run(lambda path: self._stage_file(staging, path, payloads[path], digests[path],
+                                                                previous.get(path)), originals.values()))
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+            entries = {path: entry for path, entry, _ in staged}
+            for path, digest in digests.items():
+                original = originals[digest]
+                if path != original:
+                    os.link(os.path.join(staging, original), os.path.join(staging, path))
+                    entries[path] = entries[original]
+
+            self._swap(staging)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        manifest = {path: entries[path] for path in payloads}
+        self.save_manifest(manifest)
+
+        unchanged = sum(1 for _, _, linked in staged if linked)
+        return {
+            "written": len(staged) - unchanged,
+            "unchanged": unchanged,
+            "duplicates": len(payloads) - len(staged),
+            "removed": len(set(previous) - set(manifest)),
+            "bytes_written": sum(entry["size"] for _, entry, linked in staged if not linked),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    def _swap(self, staging: str):
+        """Move the staged site into place, restoring the old site if the move fails."""
+        if os.path.exists(self.output_dir) and exchange_paths(staging, self.output_dir):
+            # The staging directory now holds the old site; a crash before it is removed
+            # leaves it to the next run's cleanup
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        backup = None
+        if os.path.exists(self.output_dir):
+            backup = staging + ".old"
+            os.rename(self.output_dir, backup)
+        try:
+            os.rename(staging, self.output_dir)
+        except BaseException:
+            if backup:
+                os.rename(backup, self.output_dir)
+            raise
+        if backup:
+            shutil.rmtree(backup, ignore_errors=True)
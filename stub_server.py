@@ -0,0 +1,578 @@
+import re
+import json
+import struct
+import hashlib
+import math
+import time
+import random
+import asyncio
+import argparse
+import threading
+from typing import Dict, Optional
+
+from aiohttp import web
+
+# Phrases from the task descriptions in crew.py, checked in order, that identify which canned
+# response to return. Only the "Current Task" part of the prompt is searched so context from
+# earlier stages cannot confuse the match.
+TASK_MARKERS = [
+    ("repair", "Fix ONLY these files"),
+    ("sections", "Regenerate ONLY these landing page sections"),
+    ("sections", "Generate ONLY"),
+    ("js_modules", "vanilla JavaScript modules"),
+    ("components", "HTML components"),
+    ("assets", "free image sources"),
+    ("setup", "project structure"),
+]
+
+
+def setup_response(site: str) -> Dict:
+    return {
+        "directory_structure": {
+            "index.html": f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <meta name="description" content="{site} turns product data into decisions.">
+  <title>{site}</title>
+  <link rel="stylesheet" href="styles/main.css">
+  <script type="module" src="js/main.js" defer></script>
+</head>
+<body>
+  <header class="site-header"><a class="logo" href="#top">{site}</a></header>
+  <main id="top"></main>
+  <footer class="site-footer"><p>&copy; {site}</p></footer>
+</body>
+</html>""",
+            "styles/main.css": """*, *::before, *::after { box-sizing: border-box; }
+:root {
+  --primary-color: #2563eb;
+  --secondary-color: #0f172a;
+  --accent-color: #f59e0b;
+  --surface: #ffffff;
+  --ink: #0f172a;
+  --spacing-unit: 0.25rem;
+  --font-body: system-ui, sans-serif;
+}
+body { margin: 0; font-family: var(--font-body); color: var(--ink); background: var(--surface); }
+.container { width: min(72rem, 100% - 2rem); margin-inline: auto; }
+""",
+            "js/main.js": """import { initNavigation } from './modules/navigation.js';
+
+document.addEventListener('DOMContentLoaded', () => {
+  try {
+    initNavigation();
+  } catch (error) {
+    console.error('Failed to start the page', error);
+  }
+});
+""",
+        }
+    }
+
+
+def assets_response(site: str) -> Dict:
+    def image(photo_id, alt, loading, attribution):
+        base = int(photo_id.split("-")[0])
+        alternatives = [{
+            "url": f"https://images.unsplash.com/photo-{base + n}-alt{n}",
+            "attribution": f"{attribution} on Unsplash",
+            "license": "Unsplash License",
+        } for n in (1, 2)]
+        return {
+            "url": f"https://images.unsplash.com/photo-{photo_id}",
+            "thumbnail": f"https://images.unsplash.com/photo-{photo_id}?w=400",
+            "attribution": f"{attribution} on Unsplash",
+            "license": "Unsplash License",
+            "alt": alt,
+            "sizes": {
+                "desktop": {"width": 1920, "height": 1080, "format": "webp"},
+                "tablet": {"width": 1024, "height": 768, "format": "webp"},
+                "mobile": {"width": 640, "height": 480, "format": "webp"},
+            },
+            "loading": loading,
+            "alternatives": alternatives,
+        }
+
+    return {
+        "images": {
+            "hero": image("1551288049-bebda4e38f71", f"{site} analytics dashboard on a laptop", "eager", "Luke Chesser"),
+            "features": [
+                image("1460925895917-afdab827c52f", "Charts showing weekly growth", "lazy", "Carlos Muza"),
+                image("1504868584819-f8e8b4b6d7e3", "Team reviewing metrics together", "lazy", "Campaign Creators"),
+            ],
+            "testimonials": [
+                image("1494790108377-be9c29b29330", "Portrait of a smiling customer", "lazy", "Christina Wocintechchat"),
+                image("1507003211169-0a1dd7228f2d", "Portrait of a product lead", "lazy", "Jurica Koletic"),
+            ],
+        }
+    }
+
+
+def components_response(site: str) -> Dict:
+    return {
+        "index.html": f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <meta name="description" content="{site} turns product data into decisions.">
+  <meta property="og:title" content="{site}">
+  <title>{site}</title>
+  <link rel="stylesheet" href="styles/main.css">
+  <link rel="stylesheet" href="styles/components/hero.css">
+  <script type="module" src="js/main.js" defer></script>
+</head>
+<body>
+  <header class="site-header">
+    <nav class="nav" aria-label="Primary"><a class="nav__link" href="#features">Features</a><a class="nav__link" href="#pricing">Pricing</a></nav>
+  </header>
+  <main id="main"></main>
+  <footer class="site-footer"><p>&copy; {site}</p></footer>
+</body>
+</html>""",
+        "components/hero.html": f"""<section class="hero" id="hero" aria-labelledby="hero-title">
+  <img class="hero__image" src="https://images.unsplash.com/photo-1551288049-bebda4e38f71" alt="{site} analytics dashboard on a laptop">
+  <h1 id="hero-title" class="hero__title">Know what your users need next</h1>
+  <p class="hero__lead">{site} connects product events to revenue in minutes.</p>
+  <a class="button button--primary" href="#pricing">Start free trial</a>
+</section>""",
+        "components/features.html": """<section class="features" id="features" aria-labelledby="features-title">
+  <h2 id="features-title">Features</h2>
+  <ul class="features__grid">
+    <li class="features__item"><h3>Live dashboards</h3><p>Every chart refreshes as events arrive.</p></li>
+    <li class="features__item"><h3>Cohort analysis</h3><p>Compare retention across signup weeks.</p></li>
+    <li class="features__item"><h3>Forecasts</h3><p>Predict churn before it happens.</p></li>
+    <li class="features__item"><h3>Alerts</h3><p>Get notified when a metric drifts.</p></li>
+  </ul>
+</section>""",
+        "components/testimonials.html": """<section class="testimonials" id="testimonials" aria-labelledby="testimonials-title">
+  <h2 id="testimonials-title">Loved by product teams</h2>
+  <div class="carousel" data-carousel>
+    <blockquote class="carousel__slide"><p>We cut our reporting time in half.</p><cite>Ana Ruiz, Northwind</cite></blockquote>
+    <blockquote class="carousel__slide"><p>The forecasts paid for themselves in a month.</p><cite>Sam Lee, Contoso</cite></blockquote>
+  </div>
+</section>""",
+        "components/pricing.html": """<section class="pricing" id="pricing" aria-labelledby="pricing-title">
+  <h2 id="pricing-title">Pricing</h2>
+  <div class="pricing__tiers">
+    <article class="pricing__tier"><h3>Starter</h3><p class="pricing__price">$19/month</p><a class="button" href="#contact">Choose Starter</a></article>
+    <article class="pricing__tier pricing__tier--popular"><h3>Growth</h3><p class="pricing__price">$49/month</p><a class="button button--primary" href="#contact">Choose Growth</a></article>
+    <article class="pricing__tier"><h3>Scale</h3><p class="pricing__price">$99/month</p><a class="button" href="#contact">Choose Scale</a></article>
+  </div>
+</section>""",
+        "components/contact.html": """<section class="contact" id="contact" aria-labelledby="contact-title">
+  <h2 id="contact-title">Talk to us</h2>
+  <form class="contact__form" data-contact-form novalidate>
+    <label for="name">Name</label><input id="name" name="name" required>
+    <label for="email">Email</label><input id="email" name="email" type="email" required>
+    <label for="message">Message</label><textarea id="message" name="message" required></textarea>
+    <button class="button button--primary" type="submit">Send message</button>
+  </form>
+</section>""",
+        "styles/main.css": """:root { --primary-color: #2563eb; --ink: #0f172a; --surface: #ffffff; }
+body { margin: 0; font-family: system-ui, sans-serif; color: var(--ink); }
+.button { display: inline-block; padding: 0.75rem 1.25rem; border-radius: 0.5rem; }
+.button--primary { background: var(--primary-color); color: #fff; }
+@media (prefers-color-scheme: dark) { :root { --ink: #f8fafc; --surface: #0f172a; } }
+""",
+        "styles/components/hero.css": """.hero { min-height: 100vh; display: grid; place-content: center; text-align: center; }
+.hero__image { width: 100%; height: auto; }
+.hero__title { font-size: clamp(2rem, 5vw, 3.5rem); }
+""",
+        "styles/components/features.css": """.features__grid { display: grid; gap: 1.5rem; grid-template-columns: repeat(auto-fit, minmax(14rem, 1fr)); }
+""",
+    }
+
+
+def js_response(site: str) -> Dict:
+    return {
+        "js/main.js": """import { initNavigation } from './modules/navigation.js';
+import { initCarousel } from './modules/carousel.js';
+import { initForm } from './modules/form.js';
+
+document.addEventListener('DOMContentLoaded', () => {
+  initNavigation();
+  initCarousel(document.querySelector('[data-carousel]'));
+  initForm(document.querySelector('[data-contact-form]'));
+});
+""",
+        "js/modules/navigation.js": """/** Smooth-scroll in-page links and mark the active one. */
+export function initNavigation() {
+  document.querySelectorAll('a[href^="#"]').forEach((link) => {
+    link.addEventListener('click', (event) => {
+      const target = document.querySelector(link.getAttribute('href'));
+      if (target) {
+        event.preventDefault();
+        target.scrollIntoView({ behavior: 'smooth' });
+      }
+    });
+  });
+}
+""",
+        "js/modules/carousel.js": """/** Rotate testimonial slides every few seconds. */
+export function initCarousel(root) {
+  if (!root) return;
+  const slides = Array.from(root.children);
+  let index = 0;
+  const show = (next) => {
+    slides.forEach((slide, i) => { slide.hidden = i !== next; });
+    index = next;
+  };
+  show(0);
+  setInterval(() => show((index + 1) % slides.length), 5000);
+}
+""",
+        "js/modules/form.js": """import { isValidEmail } from '../utils/validation.js';
+
+/** Validate the contact form before it is sent. */
+export function initForm(form) {
+  if (!form) return;
+  form.addEventListener('submit', (event) => {
+    const email = form.querySelector('[name="email"]');
+    if (!isValidEmail(email.value)) {
+      event.preventDefault();
+      email.setAttribute('aria-invalid', 'true');
+    }
+  });
+}
+""",
+        "js/utils/validation.js": """/** Check an email address has a user, an at sign and a domain. */
+export const isValidEmail = (value) => /^[^@\\s]+@[^@\\s]+\\.[^@\\s]+$/.test(value);
+""",
+    }
+
+
+def sections_response(site: str, prompt: str = "") -> Dict:
+    # Answer with just the section files the prompt asks for
+    keys = prompt.split("exactly these keys", 1)[-1].split("The rest of the page", 1)[0]
+    requested = set(re.findall(r"index\.html|styles/main\.css|(?:components|styles/components)/\w+\.(?:html|css)", keys))
+    files = components_response(site)
+    for name in requested:
+        if name.startswith("styles/") and name not in files:
+            section = name.rsplit("/", 1)[1][:-4]
+            files[name] = f".{section} {{ padding: clamp(2rem, 5vw, 4rem) 1.5rem; }}\n"
+    return {name: content for name, content in files.items() if name in requested}
+
+
+def repair_response(site: str, prompt: str = "") -> Dict:
+    # Answer with just the rejected files the prompt asks for again
+    keys = prompt.split("exactly these keys", 1)[-1].split("ejected because", 1)[0]
+    requested = set(re.findall(r"[\w./-]+\.(?:html|css|js)", keys))
+    files = {**setup_response(site)["directory_structure"], **components_response(site), **js_response(site)}
+    stage = re.search(r"files of the (\w+) output", prompt)
+    if "not among the accepted ones" in prompt and stage and stage.group(1) in ("setup", "components", "js_modules"):
+        # After a cancelled response the files it never reached are asked for too
+        stage_files = TASK_RESPONSES[stage.group(1)](site)
+        stage_files = stage_files.get("directory_structure", stage_files)
+        accepted = set(re.findall(r"[\w./-]+\.(?:html|css|js)", prompt.split("ejected because", 1)[-1])) - requested
+        requested |= set(stage_files) - accepted
+    for name in requested:
+        if name.startswith("styles/components/") and name not in files:
+            section = name.rsplit("/", 1)[1][:-4]
+            files[name] = f".{section} {{ padding: clamp(2rem, 5vw, 4rem) 1.5rem; }}\n"
+    return {name: content for name, content in files.items() if name in requested}
+
+
+TASK_RESPONSES = {
+    "setup": setup_response,
+    "assets": assets_response,
+    "components": components_response,
+    "js_modules": js_response,
+    "sections": sections_response,
+    "repair": repair_response,
+}
+
+
+def make_bmp(seed: bytes, width: int, height: int) -> bytes:
+    """Render a deterministic 24-bit BMP whose gradient pattern depends on the seed, so
+    different image URLs decode to visually different pictures."""
+    a, b, c, d, e, f = seed[:6]
+    # Bytes of the bottom row, then each row above shifts every channel by a per-row offset
+    base = bytearray()
+    for x in range(width):
+        base += bytes(((x * (a % 7 + 1) + c) % 256, (x * (b % 5 + 1) + d) % 256, ((x // 8) * (e % 3 + 1) + f) % 256))
+    base += b"\0" * (-len(base) % 4)
+    base = bytes(base)
+    tables = [bytes((value + shift) % 256 for value in range(256)) for shift in range(256)]
+    step = a % 3 + 1
+    pixels = b"".join(base.translate(tables[(y * step) % 256]) for y in range(height))
+    header = struct.pack("<2sIHHI", b"BM", 54 + len(pixels), 0, 0, 54)
+    dib = struct.pack("<IiiHHIIiiII", 40, width, height, 1, 24, 0, len(pixels), 2835, 2835, 0, 0)
+    return header + dib + pixels
+
+
+def parse_latency(spec: str):
+    """Turn 'fixed:0.5', 'uniform:0.2,1.5', 'normal:1,0.2', 'lognormal:0,0.5' or 'exp:0.8' into a sampler."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    samplers = {
+        "fixed": lambda rng: values[0],
+        "uniform": lambda rng: rng.uniform(values[0], values[1]),
+        "normal": lambda rng: rng.gauss(values[0], values[1]),
+        "lognormal": lambda rng: rng.lognormvariate(values[0], values[1]),
+        "exp": lambda rng: rng.expovariate(1 / values[0]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution '{kind}'")
+    return lambda rng: max(0.0, samplers[kind](rng))
+
+
+def count_tokens(text: str) -> int:
+    # Roughly four characters per token, which is close enough for load testing
+    return max(1, math.ceil(len(text) / 4))
+
+
+class StubLLM:
+    """Behaviour and counters of the stub, shared by all request handlers."""
+
+    def __init__(self, latency: str = "fixed:0", tokens_per_second: float = 0.0, rate_429: float = 0.0,
+                 rate_500: float = 0.0, rate_malformed: float = 0.0, retry_after: float = 1.0,
+                 seed: Optional[int] = None, image_size: str = "1600x1000", image_latency: str = "fixed:0",
+                 rate_dead_images: float = 0.0, prompt_tokens_per_second: float = 0.0, rate_placeholder: float = 0.0,
+                 max_concurrency: int = 0):
+        self.sample_latency = parse_latency(latency)
+        self.image_width, self.image_height = (int(v) for v in image_size.lower().split("x"))
+        self.sample_image_latency = parse_latency(image_latency)
+        self.rate_dead_images = rate_dead_images
+        self._images: Dict[str, bytes] = {}
+        self.tokens_per_second = tokens_per_second
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.rate_malformed = rate_malformed
+        self.rate_placeholder = rate_placeholder
+        self.max_concurrency = max_concurrency
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.stats = {"requests": 0, "by_task": {}, "429": 0, "500": 0, "malformed": 0, "placeholder": 0, "in_flight": 0, "max_in_flight": 0,
+                      "images": 0, "image_in_flight": 0, "image_max_in_flight": 0}
+
+    def detect_task(self, prompt: str) -> Optional[str]:
+        current = prompt.split("Current Task:", 1)[-1].split("This is the context you're working with", 1)[0]
+        for task_type, marker in TASK_MARKERS:
+            if marker in current:
+                return task_type
+        return None
+
+    def completion_text(self, prompt: str) -> str:
+        task_type = self.detect_task(prompt)
+        self.stats["by_task"][task_type or "unknown"] = self.stats["by_task"].get(task_type or "unknown", 0) + 1
+        if task_type is None:
+            return "Thought: Do I need to use a tool? No\nFinal Answer: The stub server has no canned response for this prompt."
+
+        match = re.search(r"for ([^\n(]+?) \(", prompt) or re.search(r"for ([^\n.]+?)\.", prompt)
+        site = match.group(1).strip() if match else "Stub Site"
+        make_response = TASK_RESPONSES[task_type]
+        payload = make_response(site, prompt) if task_type in ("sections", "repair") else make_response(site)
+        files = payload.get("directory_structure", payload)
+        if task_type != "assets" and files and self.rng.random() < self.rate_placeholder:
+            self.stats["placeholder"] += 1
+            # Leave one file unfinished, as a model cutting corners would
+            name = self.rng.choice(sorted(files))
+            files[name] = files[name] + "\n/* TODO: finish this file */\n"
+        body = json.dumps(payload, indent=2)
+        if self.rng.random() < self.rate_malformed:
+            self.stats["malformed"] += 1
+            # Cut the object off part way through, as a truncated completion would be
+            body = body[: len(body) * 2 // 3]
+        return f"Thought: Do I need to use a tool? No\nFinal Answer: ```json\n{body}\n```"
+
+    async def handle_completion(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        self.stats["requests"] += 1
+        self.stats["in_flight"] += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+        try:
+            if self.max_concurrency and self.stats["in_flight"] > self.max_concurrency:
+                # Over capacity: refused straight away, as an overloaded provider does
+                self.stats["429"] += 1
+                return web.json_response(
+                    {"error": {"message": "Too many concurrent requests", "type": "rate_limit_error", "code": 429}},
+                    status=429, headers={"Retry-After": str(self.retry_after)})
+            await asyncio.sleep(self.sample_latency(self.rng))
+
+            roll = self.rng.random()
+            if roll < self.rate_429:
+                self.stats["429"] += 1
+                return web.json_response(
+                    {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error", "code": 429}},
+                    status=429, headers={"Retry-After": str(self.retry_after)})
+            if roll < self.rate_429 + self.rate_500:
+                self.stats["500"] += 1
+                return web.json_response({"error": {"message": "Injected server error", "type": "server_error"}}, status=500)
+
+            prompt = "\n".join(str(message.get("content", "")) for message in payload.get("messages", []))
+            text = self.completion_text(prompt)
+            model = payload.get("model", "stub")
+            created = int(time.time())
+            completion_id = f"chatcmpl-stub-{self.stats['requests']}"
+            usage = {"prompt_tokens": count_tokens(prompt), "completion_tokens": count_tokens(text)}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            if self.prompt_tokens_per_second > 0:
+                # Prefill: time to first token grows with the size of the prompt
+                await asyncio.sleep(usage["prompt_tokens"] / self.prompt_tokens_per_second)
+
+            if payload.get("stream"):
+                # Usage comes last, in a chunk of its own, only when the client asks for it
+                stream_usage = usage if (payload.get("stream_options") or {}).get("include_usage") else None
+                return await self.stream_completion(request, text, model, created, completion_id, stream_usage)
+
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(usage["completion_tokens"] / self.tokens_per_second)
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        finally:
+            self.stats["in_flight"] -= 1
+
+    async def stream_completion(self, request, text, model, created, completion_id,
+                                usage: Optional[Dict[str, int]] = None) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        def chunk(delta, finish_reason=None, usage=None):
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage:
+                data["usage"] = usage
+            return f"data: {json.dumps(data)}\n\n".encode("utf-8")
+
+        # Send roughly eight tokens per event, paced to the configured token rate
+        piece = 32
+        delay = (count_tokens("x" * piece) / self.tokens_per_second) if self.tokens_per_second > 0 else 0
+        await response.write(chunk({"role": "assistant", "content": ""}))
+        try:
+            for start in range(0, len(text), piece):
+                await response.write(chunk({"content": text[start:start + piece]}))
+                if delay:
+                    await asyncio.sleep(delay)
+            await response.write(chunk({}, "stop"))
+            if usage:
+                await response.write(chunk({}, usage=usage))
+            await response.write(b"data: [DONE]\n\n")
+        except ConnectionResetError:
+            # The client cancelled the stream, which is what early abort is supposed to do
+            pass
+        return response
+
+    async def handle_models(self, request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model"}]})
+
+    async def handle_image(self, request: web.Request) -> web.Response:
+        """Serve a deterministic image for any path, as a fixture for the image pipeline."""
+        path = request.match_info["path"]
+        digest = hashlib.sha256(path.split("?")[0].encode("utf-8")).digest()
+        self.stats["images"] += 1
+        self.stats["image_in_flight"] += 1
+        self.stats["image_max_in_flight"] = max(self.stats["image_max_in_flight"], self.stats["image_in_flight"])
+        try:
+            await asyncio.sleep(self.sample_image_latency(self.rng))
+            # The same path is always dead or always alive
+            if digest[-1] / 256 < self.rate_dead_images:
+                return web.Response(status=404, text="Not found")
+            if path not in self._images:
+                if len(self._images) >= 64:
+                    self._images.pop(next(iter(self._images)))
+                self._images[path] = make_bmp(digest, self.image_width, self.image_height)
+            body = self._images[path]
+            if request.method == "HEAD":
+                return web.Response(headers={"Content-Type": "image/bmp", "Content-Length": str(len(body))})
+            return web.Response(body=body, content_type="image/bmp")
+        finally:
+            self.stats["image_in_flight"] -= 1
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+
+def create_app(stub: StubLLM) -> web.Application:
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    for prefix in ("", "/v1"):
+        app.router.add_post(f"{prefix}/chat/completions", stub.handle_completion)
+        app.router.add_get(f"{prefix}/models", stub.handle_models)
+    # add_get also answers HEAD
+    app.router.add_get("/images/{path:.*}", stub.handle_image)
+    app.router.add_get("/stats", stub.handle_stats)
+    return app
+
+
+class StubServerThread:
+    """Runs the stub server on a background event loop, for benchmarks and local test harnesses."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8089, **options):
+        self.host = host
+        self.port = port
+        self.stub = StubLLM(**options)
+        self._loop = asyncio.new_event_loop()
+        self._runner = None
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self) -> "StubServerThread":
+        self._thread.start()
+
+        async def setup():
+            self._runner = web.AppRunner(create_app(self.stub))
+            await self._runner.setup()
+            await web.TCPSite(self._runner, self.host, self.port).start()
+
+        asyncio.run_coroutine_threadsafe(setup(), self._loop).result()
+        return self
+
+    def stop(self):
+        if self._runner:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub LLM for load testing LandingPageCrew.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="fixed:0",
+                        help="Time to first token: fixed:S, uniform:A,B, normal:MU,SIGMA, lognormal:MU,SIGMA or exp:MEAN")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Completion token rate (0 = instant)")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=0.0,
+                        help="Prompt processing rate, added to time to first token (0 = instant)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-malformed", type=float, default=0.0, help="Fraction of completions with truncated JSON")
+    parser.add_argument("--rate-placeholder", type=float, default=0.0,
+                        help="Fraction of completions with one file left as placeholder content")
+    parser.add_argument("--max-concurrency", type=int, default=0,
+                        help="Requests in flight above which the stub answers 429 (0 = unlimited)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--image-size", default="1600x1000", help="Size of images served under /images/")
+    parser.add_argument("--image-latency", default="fixed:0", help="Latency distribution for image requests")
+    parser.add_argument("--rate-dead-images", type=float, default=0.0, help="Fraction of image paths answered with 404")
+    args = parser.parse_args()
+
+    stub = StubLLM(latency=args.latency, tokens_per_second=args.tokens_per_second, rate_429=args.rate_429,
+                   rate_500=args.rate_500, rate_malformed=args.rate_malformed, retry_after=args.retry_after,
+                   seed=args.seed, image_size=args.image_size, image_latency=args.image_latency,
+                   rate_dead_images=args.rate_dead_images, prompt_tokens_per_second=args.prompt_tokens_per_second,
+                   rate_placeholder=args.rate_placeholder, max_concurrency=args.max_concurrency)
+    print(f"Stub LLM listening on http://{args.host}:{args.port}/v1")
+    print(f"Point the crew at it with OPENROUTER_BASE_URL=http://{args.host}:{args.port}/v1")
+    web.run_app(create_app(stub), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from bundler import BundleError, Bundler, bundle_modules, minify_js
+
+node = pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+
+MODULES = {
+    "js/main.js": """import greet, { add as plus, VERSION } from './modules/util.js';
+import * as stats from './modules/stats.js';
+
+// Runs once every module has loaded
+console.log(greet('maker'), plus(2, 3), VERSION, stats.mean([1, 2, 6]), stats.LABEL);
+""",
+    "js/modules/util.js": """export const VERSION = '1.0', BUILD = 7;
+export function add(a, b) { return a + b; }
+export default function greet(name) { return `hi ${name}`; }
+""",
+    "js/modules/stats.js": """import { add } from './util.js';
+
+let total = 0, count = 0;
+export function mean(values) {
+  for (const v of values) { total = add(total, v); count++ }
+  return total / count;
+}
+const digits = /\\d+\\/\\d+/g;
+export const LABEL = 'a/b 1/2'.replace(digits, 'n');
+""",
+}
+
+
+def run_node(script):
+    result = subprocess.run(["node", "-e", script], capture_output=True, text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+@node
+def test_bundle_runs_like_the_modules():
+    bundle, order = bundle_modules(MODULES)
+    assert order == ["js/modules/util.js", "js/modules/stats.js", "js/main.js"]
+    assert "import " not in bundle and "export " not in bundle
+    assert run_node(bundle) == "hi maker 5 1.0 3 a/b n"
+
+
+@node
+def test_minified_division_after_increment_and_regex_keep_their_meaning():
+    src = """let total = 9, count = 2;
+total++ / count;
+const ratio = total++ / count
+const re = /[/]+/g // slashes
+console.log(ratio, 'a//b'.replace(re, '-'), count--  /2/ 1)
+"""
+    assert run_node(minify_js(src)) == run_node(src) == "5 a-b 1"
+
+
+def test_unsupported_modules_raise_bundle_error():
+    with pytest.raises(BundleError, match="re-export"):
+        bundle_modules({"js/main.js": "export { a } from './a.js';"})
+    with pytest.raises(BundleError, match="not generated"):
+        bundle_modules({"js/main.js": "import { a } from './missing.js';"})
+    with pytest.raises(BundleError, match="cycle"):
+        bundle_modules({"js/main.js": "import './a.js';", "js/a.js": "import './main.js';"})
+
+
+def test_dist_references_hashed_bundle_and_stylesheet():
+    files = {"index.html": '<link rel="stylesheet" href="styles/main.css">\n'
+                           '<script type="module" src="js/main.js"></script>',
+             "styles/main.css": "body {\n  margin: 0;\n}\n", "images/a.png": b"\x89PNG", **MODULES}
+    dist = Bundler().dist_files(files)
+    html = dist["dist/index.html"].decode("utf-8")
+    script = re.search(r'src="(js/main\.[0-9a-f]{8}\.js)"', html)
+    stylesheet = re.search(r'href="(styles/main\.[0-9a-f]{8}\.css)"', html)
+    assert script and stylesheet
+    assert "dist/" + script.group(1) in dist
+    assert dist["dist/" + stylesheet.group(1)].strip() == b"body{margin:0}"
+    assert dist["dist/images/a.png"] == b"\x89PNG"
+    # Every module went into the bundle
+    assert not [path for path in dist if path.startswith("dist/js/modules/")]
@@ -0,0 +1,64 @@
+import os
+import socket
+
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from job_store import JobStore, stages_table  # noqa: E402
+from stub_server import StubServerThread  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_checkpoints_rebuild_a_manifest_of_completed_stages(tmp_path):
+    store = JobStore(f"sqlite:///{tmp_path / 'jobs.db'}")
+    store.start_job("job1", "Acme", "widgets for makers", str(tmp_path / "acme_generated"), "compact")
+    store.save_stage("job1", "setup", "h1", "first", {"directory_structure": {"index.html": "a"}})
+    store.save_stage("job1", "setup", "h2", "second", {"directory_structure": {"index.html": "b"}})
+    assert [job["id"] for job in store.unfinished()] == ["job1"]
+
+    manifest = store.manifest("job1", str(tmp_path / "state"))
+    assert manifest.inputs == {"website_name": "Acme", "niche_description": "widgets for makers",
+                               "prompt_profile": "compact"}
+    assert list(manifest.stages) == ["setup"]
+    assert manifest.stage("setup")["input_hash"] == "h2"
+    assert manifest.stage("setup")["output"] == {"directory_structure": {"index.html": "b"}}
+
+    store.finish_job("job1", "succeeded")
+    store.start_job("job1", "Acme", "widgets for makers", str(tmp_path / "acme_generated"))
+    assert store.job("job1")["runs"] == 2
+    assert store.latest_job("Acme", "widgets for makers")["id"] == "job1"
+
+
+def test_resume_reruns_only_stages_without_a_checkpoint(tmp_path, monkeypatch):
+    stub = StubServerThread(port=free_port(), seed=0).start()
+    db = str(tmp_path / "jobs.db")
+    for name, value in {"OPENROUTER_API_KEY": "stub", "OPENROUTER_BASE_URL": stub.base_url, "LLM_CACHE_MODE": "off",
+                        "LLM_RATE_STATE": "process", "LANDING_JOB_DB": db, "IMAGE_FETCH": "0",
+                        "BUILD_DIST": "0", "TASK_RETRY_BACKOFF": "0"}.items():
+        monkeypatch.setenv(name, value)
+    from crew import LandingPageCrew
+
+    try:
+        crew = LandingPageCrew("Acme", "widgets for makers", output_root=str(tmp_path))
+        assert crew.run() is not None
+        store = JobStore.from_env(str(tmp_path))
+        # As if the process died after setup and assets were checkpointed
+        with store.engine.begin() as conn:
+            conn.execute(stages_table.delete().where(stages_table.c.job_id == crew.job_id,
+                                                     stages_table.c.stage.in_(["components", "js_modules"])))
+        store.start_job(crew.job_id, "Acme", "widgets for makers", crew.output_dir)
+        assert [job["id"] for job in store.unfinished()] == [crew.job_id]
+
+        before = dict(stub.stub.stats["by_task"])
+        assert LandingPageCrew.from_job(crew.job_id, output_root=str(tmp_path)).resume() is not None
+        rerun = {task for task, count in stub.stub.stats["by_task"].items() if count != before.get(task, 0)}
+    finally:
+        stub.stop()
+    assert rerun == {"sections", "js_modules"}
+    assert store.job(crew.job_id)["status"] == "succeeded"
+    assert set(store.stages(crew.job_id)) == {"setup", "assets", "components", "js_modules"}
+    assert not store.unfinished()
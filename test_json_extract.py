@@ -0,0 +1,86 @@
+import json
+import os
+import uuid
+
+import pytest
+
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from json_extract import (PlaceholderContentError, StreamingJSONExtractor, StreamingPlaceholderGuard,  # noqa: E402
+                          extract_json, find_placeholders)
+
+
+def test_object_is_found_after_prose_with_stray_braces():
+    text = 'Thought: use {curly} braces\nFinal Answer: ```json\n{"index.html": "<p>{ok}</p>", "a.js": "x"}\n```'
+    assert extract_json(text) == {"index.html": "<p>{ok}</p>", "a.js": "x"}
+    assert extract_json("no object here") is None
+
+
+def test_raw_newlines_and_invalid_escapes_in_strings_are_repaired():
+    # As a model writes it: single backslashes in a regex and a literal line break
+    text = r'{"js/main.js": "const re = /\d+\.\w/;' + '\n' + r'const tab = \"\t\";", "n": 1}'
+    parsed = extract_json(text)
+    assert parsed["js/main.js"] == 'const re = /\\d+\\.\\w/;\nconst tab = "\t";'
+    assert parsed["n"] == 1
+
+
+def test_undecodable_object_raises_and_largest_object_wins():
+    with pytest.raises(ValueError):
+        extract_json('Final Answer: {"a": 1,}')
+    assert extract_json('{"small": 1} and {"large": {"x": 1, "y": 2}}') == {"large": {"x": 1, "y": 2}}
+
+
+def test_placeholder_paths_follow_document_order():
+    data = {"images": {"hero": [{"url": "https://x/y.png"}, {"url": "placeholder.png"}]}, "a.js": "// TODO"}
+    assert find_placeholders(data) == [("images", "hero", 1, "url"), ("a.js",)]
+
+
+def stream(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_extractor_hands_over_files_as_they_close():
+    seen = []
+    extractor = StreamingJSONExtractor(on_file=lambda path, content: seen.append(path))
+    body = json.dumps({"directory_structure": {"index.html": "<main></main>", "styles/main.css": "body {}"}})
+    for chunk in stream("Thought: done\nFinal Answer: ```json\n" + body + "\n```"):
+        extractor.feed(chunk)
+    assert extractor.finished
+    assert seen == ["directory_structure.index.html", "directory_structure.styles/main.css"]
+    assert extractor.partial == {"directory_structure": {"index.html": "<main></main>", "styles/main.css": "body {}"}}
+
+
+def test_guard_cancels_at_placeholder_with_finished_files():
+    guard = StreamingPlaceholderGuard()
+    run_id = uuid.uuid4()
+    guard.on_chat_model_start({}, [], run_id=run_id)
+    body = json.dumps({"js/main.js": "import './a.js';", "js/a.js": "export const a = 1;\n// TODO: finish this file\n",
+                       "js/b.js": "export const b = 2;"})
+    with pytest.raises(PlaceholderContentError) as raised:
+        for chunk in stream(body):
+            guard.on_llm_new_token(chunk, run_id=run_id)
+    assert raised.value.path == ("js/a.js",)
+    assert raised.value.partial == {"js/main.js": "import './a.js';"}
+
+
+def test_cancelled_response_keeps_finished_files_and_repairs_the_rest(tmp_path, monkeypatch):
+    for name, value in {"OPENROUTER_API_KEY": "stub", "OPENROUTER_BASE_URL": "http://127.0.0.1:9/v1",
+                        "LLM_CACHE_MODE": "off", "LLM_RATE_STATE": "process", "LANDING_JOB_DB": "off"}.items():
+        monkeypatch.setenv(name, value)
+    from crew import LandingPageCrew
+
+    crew = LandingPageCrew("Acme", "widgets for makers", output_root=str(tmp_path))
+    task = crew.create_tasks(*crew.create_agents())[3]
+    crew.store_cancelled("js_modules", None, PlaceholderContentError(("js/a.js",), {"js/main.js": "import './a.js';"}))
+    assert crew.accepted_files["js_modules"] == {"js/main.js": "import './a.js';"}
+    assert list(crew.rejected_files["js_modules"]) == ["js/a.js"]
+
+    repair = crew.create_repair_task("js_modules", task, 2)
+    assert "js/a.js, plus every other file of the stage" in repair.description
+
+    # The repair may add files the cancelled response never reached, but not replace accepted ones
+    crew.repair_requests["js_modules"] = {"js/a.js"}
+    files = crew.accept_files("js_modules", {"js/a.js": "export const a = 1;", "js/b.js": "export const b = 2;",
+                                             "js/main.js": "import './b.js';"})
+    assert files == {"js/main.js": "import './a.js';", "js/a.js": "export const a = 1;", "js/b.js": "export const b = 2;"}
+    assert not crew.rejected_files["js_modules"]
@@ -0,0 +1,73 @@
+import os
+import socket
+
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration  # noqa: E402
+
+import llm_cache  # noqa: E402
+from llm_cache import DiskLLMCache  # noqa: E402
+from stub_server import StubServerThread  # noqa: E402
+
+
+def generations(text):
+    return [ChatGeneration(message=AIMessage(content=text))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    cache = DiskLLMCache(str(tmp_path), ttl_seconds=60)
+    cache.update("prompt", "llm", generations("hello"))
+    assert cache.lookup("prompt", "llm")[0].text == "hello"
+
+    now = llm_cache.time.time()
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 120)
+    assert cache.lookup("prompt", "llm") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted_first(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: clock[0])
+    cache = DiskLLMCache(str(tmp_path), ttl_seconds=None)
+    for name in ("a", "b", "c"):
+        clock[0] += 1
+        cache.update(name, "llm", generations(name * 100))
+    # Room for exactly the three entries
+    cache.max_bytes = cache.stats()["bytes"]
+    clock[0] += 1
+    cache.lookup("a", "llm")
+
+    clock[0] += 1
+    cache.update("d", "llm", generations("d" * 100))
+    assert cache.stats()["entries"] == 3
+    assert cache.lookup("b", "llm") is None
+    assert cache.lookup("a", "llm") is not None
+
+
+def test_second_identical_run_sends_no_requests(tmp_path, monkeypatch):
+    stub = StubServerThread(port=free_port(), seed=0).start()
+    env = {"OPENROUTER_API_KEY": "stub", "OPENROUTER_BASE_URL": stub.base_url, "LLM_CACHE_DIR": str(tmp_path / "cache"),
+           "LLM_CACHE_MODE": "on", "LLM_RATE_STATE": "process", "LANDING_JOB_DB": "off", "IMAGE_FETCH": "0",
+           "BUILD_DIST": "0", "TASK_RETRY_BACKOFF": "0"}
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    from crew import LandingPageCrew
+
+    requests = []
+    try:
+        for _ in range(2):
+            before = stub.stub.stats["requests"]
+            crew = LandingPageCrew("Acme", "widgets for makers", output_root=str(tmp_path / "sites"))
+            assert crew.run() is not None
+            requests.append(stub.stub.stats["requests"] - before)
+    finally:
+        stub.stop()
+    assert requests[0] > 0
+    assert requests[1] == 0
@@ -0,0 +1,51 @@
+import os
+import socket
+
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from manifest import RunManifest, hash_payload  # noqa: E402
+from stub_server import StubServerThread  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_manifest_round_trip_keeps_hashes_and_output_order(tmp_path):
+    manifest = RunManifest(str(tmp_path))
+    output = {"js_modules": {"js/main.js": "import './a.js';", "js/a.js": "export const a = 1;"}}
+    manifest.record_stage("js_modules", "abc", "raw result", output)
+    manifest.save()
+
+    loaded = RunManifest.load(str(tmp_path))
+    stage = loaded.stage("js_modules")
+    assert stage["input_hash"] == "abc" and stage["result"] == "raw result"
+    assert stage["output_hash"] == hash_payload(output)
+    assert list(stage["output"]["js_modules"]) == ["js/main.js", "js/a.js"]
+    assert set(stage["files"]) == {"js/main.js", "js/a.js"}
+    assert RunManifest.load(str(tmp_path / "missing")) is None
+
+
+def test_regenerate_reruns_only_changed_or_forced_stages(tmp_path, monkeypatch):
+    stub = StubServerThread(port=free_port(), seed=0).start()
+    for name, value in {"OPENROUTER_API_KEY": "stub", "OPENROUTER_BASE_URL": stub.base_url, "LLM_CACHE_MODE": "off",
+                        "LLM_RATE_STATE": "process", "LANDING_JOB_DB": "off", "IMAGE_FETCH": "0",
+                        "BUILD_DIST": "0", "TASK_RETRY_BACKOFF": "0"}.items():
+        monkeypatch.setenv(name, value)
+    from crew import LandingPageCrew
+
+    def regenerate(**kwargs):
+        """The kinds of task the stub was asked for by one regeneration."""
+        before = dict(stub.stub.stats["by_task"])
+        crew = LandingPageCrew("Acme", "widgets for makers", output_root=str(tmp_path))
+        assert crew.regenerate(**kwargs) is not None
+        return {task for task, count in stub.stub.stats["by_task"].items() if count != before.get(task, 0)}
+
+    try:
+        assert regenerate() == {"setup", "assets", "sections", "js_modules"}
+        assert regenerate() == set()
+        assert regenerate(stages=["js_modules"]) == {"js_modules"}
+    finally:
+        stub.stop()
@@ -0,0 +1,88 @@
+import json
+import socket
+
+from langchain_openai import ChatOpenAI
+
+from llm_clients import ClientPool
+from rate_limiter import RateLimiter
+from stub_server import StubServerThread
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def succeed(limiter, calls=1):
+    for _ in range(calls):
+        limiter.acquire()
+        limiter.release(latency=0.5, completion_tokens=100)
+
+
+def test_slow_start_adds_one_per_successful_call():
+    limiter = RateLimiter(initial_concurrency=4, latency_tolerance=0)
+    succeed(limiter, 3)
+    assert limiter._state["limit"] == 7
+
+
+def test_429_cuts_limit_to_seventy_percent_of_calls_in_flight():
+    limiter = RateLimiter(initial_concurrency=8, latency_tolerance=0)
+    for _ in range(5):
+        limiter.acquire()
+    limiter.release(status=429, retry_after=0)
+    state = limiter._state
+    assert state["ceiling"] == 5
+    assert state["limit"] == 5 * 0.7
+    assert not state["slow_start"]
+
+    # Out of slow start the limit grows by about one per round of calls, not one per call
+    limit = state["limit"]
+    for _ in range(4):
+        limiter.release(latency=0.5, completion_tokens=100)
+    assert limit < state["limit"] < limit + 1.5
+
+
+def test_rising_latency_per_token_shrinks_limit():
+    limiter = RateLimiter(initial_concurrency=10, max_concurrency=10, latency_tolerance=2.0)
+    succeed(limiter, 20)
+    assert limiter._state["limit"] == 10
+    limiter.acquire()
+    limiter.release(latency=5.0, completion_tokens=100)
+    assert limiter._state["limit"] == 9
+
+
+def test_idle_shared_state_starts_over(tmp_path):
+    path = str(tmp_path / "state.json")
+    limiter = RateLimiter(initial_concurrency=8, state_path=path, state_ttl=60)
+    limiter.acquire()
+    limiter.release(status=429, retry_after=0)
+    assert json.load(open(path))["limit"] == 1
+
+    with open(path) as f:
+        state = json.load(f)
+    state["active"] -= 120
+    with open(path, "w") as f:
+        json.dump(state, f)
+    assert limiter.snapshot()["limit"] == 8
+
+
+def test_streamed_call_reports_usage_and_latency():
+    stub = StubServerThread(port=free_port(), seed=0).start()
+    try:
+        for stream_usage in (True, False):
+            limiter = RateLimiter(tpm=60000, latency_tolerance=0)
+            released = []
+            release = limiter.release
+            limiter.release = lambda *args, **kwargs: released.append((args, kwargs)) or release(*args, **kwargs)
+            pool = ClientPool(stub.base_url, "stub", limiter=limiter, stream_usage=stream_usage)
+            llm = ChatOpenAI(model_name="gpt-3.5-turbo", openai_api_base=stub.base_url, openai_api_key="stub",
+                             **pool.chat_openai_clients())
+            assert "".join(chunk.content for chunk in llm.stream("Write a one-line tagline."))
+
+            (tokens, used, latency, status, _), kwargs = released[0]
+            assert status == 200 and used and latency > 0
+            assert kwargs["completion_tokens"] > 0
+            assert limiter._state["latency_short"] is not None
+    finally:
+        stub.stop()
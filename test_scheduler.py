@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import TaskGraph, critical_path
+
+
+def test_stages_start_after_their_dependencies_and_independent_ones_overlap():
+    order = []
+    lock = threading.Lock()
+
+    def stage(name, delay=0.0):
+        def run():
+            with lock:
+                order.append(f"start {name}")
+            time.sleep(delay)
+            with lock:
+                order.append(f"end {name}")
+            return name
+        return run
+
+    graph = TaskGraph()
+    graph.add("setup", stage("setup", 0.05))
+    graph.add("assets", stage("assets", 0.05))
+    graph.add("components", stage("components"), depends_on=["setup", "assets"])
+    graph.add("js_modules", stage("js_modules"), depends_on=["setup"])
+    timeline = graph.run()
+
+    assert order.index("start components") > max(order.index("end setup"), order.index("end assets"))
+    assert order.index("start js_modules") > order.index("end setup")
+    # Both roots were running before either finished
+    assert max(order.index("start setup"), order.index("start assets")) < min(order.index("end setup"),
+                                                                              order.index("end assets"))
+    assert {name: entry["result"] for name, entry in timeline.items()} == {name: name for name in timeline}
+    assert critical_path(timeline)[0] in ("setup", "assets")
+
+
+def test_failed_stage_is_recorded_and_dependents_still_run():
+    def fail():
+        raise RuntimeError("no output")
+
+    ran = []
+    graph = TaskGraph()
+    graph.add("setup", fail)
+    graph.add("js_modules", lambda: ran.append("js_modules"), depends_on=["setup"])
+    timeline = graph.run()
+
+    assert timeline["setup"]["error"] == "RuntimeError: no output"
+    assert timeline["setup"]["result"] is None
+    assert ran == ["js_modules"]
+    assert timeline["js_modules"]["start"] >= timeline["setup"]["end"]
+
+
+def test_unknown_dependencies_and_cycles_are_refused():
+    graph = TaskGraph()
+    graph.add("components", lambda: None, depends_on=["setup"])
+    with pytest.raises(ValueError, match="unknown stages: setup"):
+        graph.run()
+
+    graph = TaskGraph()
+    graph.add("a", lambda: None, depends_on=["b"])
+    graph.add("b", lambda: None, depends_on=["a"])
+    with pytest.raises(ValueError, match="Dependency cycle"):
+        graph.run()
+    with pytest.raises(ValueError, match="already registered"):
+        graph.add("a", lambda: None)
@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+import site_writer
+from site_writer import SiteWriter
+
+
+def read(root, path):
+    with open(os.path.join(root, path), encoding="utf-8") as f:
+        return f.read()
+
+
+def inode(root, path):
+    return os.stat(os.path.join(root, path)).st_ino
+
+
+def test_unchanged_files_are_linked_from_the_previous_run(tmp_path):
+    site = str(tmp_path / "acme_generated")
+    writer = SiteWriter(site)
+    writer.write({"index.html": "<main></main>", "styles/main.css": "body {}", "js/old.js": "x"})
+    before = {path: inode(site, path) for path in ("index.html", "styles/main.css")}
+
+    stats = writer.write({"index.html": "<main></main>", "styles/main.css": "body { margin: 0; }"})
+    assert stats["unchanged"] == 1 and stats["written"] == 1 and stats["removed"] == 1
+    assert inode(site, "index.html") == before["index.html"]
+    assert inode(site, "styles/main.css") != before["styles/main.css"]
+    assert read(site, "styles/main.css") == "body { margin: 0; }"
+    assert not os.path.exists(os.path.join(site, "js/old.js"))
+
+
+def test_file_edited_since_the_last_run_is_rewritten(tmp_path):
+    site = str(tmp_path / "acme_generated")
+    writer = SiteWriter(site)
+    writer.write({"index.html": "<main></main>"})
+    with open(os.path.join(site, "index.html"), "w", encoding="utf-8") as f:
+        f.write("edited by hand")
+
+    stats = writer.write({"index.html": "<main></main>"})
+    assert stats["unchanged"] == 0
+    assert read(site, "index.html") == "<main></main>"
+
+
+def test_identical_files_in_one_write_share_an_inode(tmp_path):
+    site = str(tmp_path / "acme_generated")
+    stats = SiteWriter(site).write({"images/a.png": b"\x89PNG", "dist/images/a.png": b"\x89PNG", "index.html": "x"})
+    assert stats["duplicates"] == 1 and stats["written"] == 2
+    assert inode(site, "images/a.png") == inode(site, "dist/images/a.png")
+
+
+def test_failed_write_leaves_the_old_site(tmp_path, monkeypatch):
+    site = str(tmp_path / "acme_generated")
+    writer = SiteWriter(site)
+    writer.write({"index.html": "old"})
+
+    def crash(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(writer, "_stage_file", crash)
+    with pytest.raises(OSError):
+        writer.write({"index.html": "new"})
+    assert read(site, "index.html") == "old"
+    assert not [name for name in os.listdir(tmp_path) if ".staging-" in name]
+
+
+def test_failed_rename_swap_restores_the_old_site(tmp_path, monkeypatch):
+    # Without renameat2 the swap is two renames; the second one fails here
+    monkeypatch.setattr(site_writer, "exchange_paths", lambda first, second: False)
+    site = str(tmp_path / "acme_generated")
+    writer = SiteWriter(site)
+    writer.write({"index.html": "old"})
+    rename = os.rename
+
+    def failing_rename(src, dst):
+        if dst == site and not src.endswith(".old"):
+            raise OSError("cross-device link")
+        rename(src, dst)
+
+    monkeypatch.setattr(site_writer.os, "rename", failing_rename)
+    with pytest.raises(OSError):
+        writer.write({"index.html": "new"})
+    assert read(site, "index.html") == "old"
+
+
+def test_site_left_only_as_backup_by_a_crashed_swap_is_restored(tmp_path):
+    site = str(tmp_path / "acme_generated")
+    writer = SiteWriter(site)
+    writer.write({"index.html": "old", "about.html": "about"})
+    # A crash between the two renames of a swap: the live site is only its backup
+    os.rename(site, str(tmp_path / ".acme_generated.staging-abc.old"))
+    os.mkdir(str(tmp_path / ".acme_generated.staging-def"))
+
+    stats = writer.write({"index.html": "new", "about.html": "about"})
+    assert stats["unchanged"] == 1
+    assert read(site, "index.html") == "new"
+    assert not [name for name in os.listdir(tmp_path) if ".staging-" in name]
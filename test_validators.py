@@ -0,0 +1,27 @@
+from validators import validate_html, validate_js
+
+
+def messages(diagnostics):
+    return [d["message"] for d in diagnostics if d["severity"] == "error"]
+
+
+def test_self_closing_svg_children_are_closed():
+    html = '<button><svg viewBox="0 0 24 24"><path d="M4 12h16"/><circle cx="12" cy="12" r="3"/></svg></button>'
+    assert messages(validate_html(html)) == []
+
+
+def test_self_closing_html_element_is_still_open():
+    assert messages(validate_html("<section><div/></section>")) == ["<div> is not closed before </section>"]
+
+
+def test_self_closing_svg_root_is_closed():
+    assert messages(validate_html('<div class="icon"><svg/></div>')) == []
+
+
+def test_postfix_increment_before_division():
+    js = "let average = total++ / count;\nlet rest = left-- / 2;\n"
+    assert messages(validate_js(js)) == []
+
+
+def test_regex_after_operator_is_still_checked():
+    assert messages(validate_js("const pattern = 1 + /unterminated;\n"))
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Stage and attempt of the LLM call currently running on this thread
+current_stage = contextvars.ContextVar("current_stage", default=("unassigned", 1))
+
+# USD per 1K tokens, used when LLM_PRICE_* are not set (gpt-3.5-turbo list prices)
+DEFAULT_PROMPT_PRICE = 0.0005
+DEFAULT_COMPLETION_PRICE = 0.0015
+
+_encodings = {}
+_encoding_lock = threading.Lock()
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised from inside an LLM call once a run has used up its token or time budget."""
+
+
+class RunCancelledError(BudgetExceededError):
+    """Raised from inside an LLM call once the run has been cancelled."""
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Count tokens with tiktoken, falling back to a four-characters-per-token estimate
+    when the encoding is not available (e.g. offline without a tiktoken cache)."""
+    with _encoding_lock:
+        if model not in _encodings:
+            try:
+                import tiktoken
+                try:
+                    _encodings[model] = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _encodings[model] = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                _encodings[model] = None
+        encoding = _encodings[model]
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class UsageTracker(BaseCallbackHandler):
+    """Records tokens, cost and latency of every LLM call, attributed to the stage that made it.
+
+    Budgets are enforced from the callbacks themselves: once the run has used max_tokens or
+    run for max_seconds, the next LLM call (or the next streamed token) raises
+    BudgetExceededError.
+    """
+
+    raise_error = True
+
+    def __init__(self, model: str = "gpt-3.5-turbo", max_tokens: Optional[int] = None,
+                 max_seconds: Optional[float] = None, prompt_price: float = DEFAULT_PROMPT_PRICE,
+                 completion_price: float = DEFAULT_COMPLETION_PRICE):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+        self.calls: List[Dict[str, Any]] = []
+        self.total_tokens = 0
+        self.exceeded: Optional[str] = None
+        self.cancelled: Optional[str] = None
+        self.started = time.time()
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, model: str = "gpt-3.5-turbo") -> "UsageTracker":
+        """Build a tracker from RUN_TOKEN_BUDGET, RUN_TIME_BUDGET_SECONDS and LLM_PRICE_* variables."""
+        max_tokens = int(os.getenv("RUN_TOKEN_BUDGET", "0"))
+        max_seconds = float(os.getenv("RUN_TIME_BUDGET_SECONDS", "0"))
+        return cls(
+            model=model,
+            max_tokens=max_tokens or None,
+            max_seconds=max_seconds or None,
+            prompt_price=float(os.getenv("LLM_PRICE_PROMPT_PER_1K", DEFAULT_PROMPT_PRICE)),
+            completion_price=float(os.getenv("LLM_PRICE_COMPLETION_PER_1K", DEFAULT_COMPLETION_PRICE)),
+        )
+
+    @contextmanager
+    def stage(self, name: str, attempt: int = 1):
+        """Attribute LLM calls made inside the block to a stage and attempt."""
+        token = current_stage.set((name, attempt))
+        try:
+            yield
+        finally:
+            current_stage.reset(token)
+
+    def reset(self):
+        """Start a new run: clear recorded calls and restart the time budget."""
+        with self._lock:
+            self.calls = []
+            self._pending = {}
+            self.total_tokens = 0
+            self.exceeded = None
+            self.started = time.time()
+
+    def cancel(self, reason: str = "run cancelled"):
+        """Stop the run at its next LLM call or streamed token. Unlike a spent budget this
+        survives reset(), so a run cancelled before it starts never makes a call."""
+        with self._lock:
+            self.cancelled = reason
+
+    def check_budget(self):
+        with self._lock:
+            if self.cancelled:
+                self.exceeded = self.cancelled
+                raise RunCancelledError(self.cancelled)
+            if not self.exceeded:
+                elapsed = time.time() - self.started
+                if self.max_tokens and self.total_tokens >= self.max_tokens:
+                    self.exceeded = f"token budget of {self.max_tokens} exhausted ({self.total_tokens} used)"
+                elif self.max_seconds and elapsed >= self.max_seconds:
+                    self.exceeded = f"time budget of {self.max_seconds:.0f}s exhausted ({elapsed:.0f}s elapsed)"
+            exceeded = self.exceeded
+        if exceeded:
+            raise BudgetExceededError(exceeded)
+
+    def _start(self, run_id, prompt: str):
+        self.check_budget()
+        stage, attempt = current_stage.get()
+        with self._lock:
+            self._pending[run_id] = {"stage": stage, "attempt": attempt, "prompt": prompt,
+                                     "start": time.perf_counter()}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "\n".join(prompts))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "\n".join(str(m.content) for batch in messages for m in batch))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+        if pending is None:
+            return
+        latency = time.perf_counter() - pending["start"]
+        completion = "".join(g.text for batch in response.generations for g in batch)
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        # Streamed and cached responses carry no usage block, so count those locally
+        estimated = not usage
+        prompt_tokens = usage.get("prompt_tokens") or count_tokens(pending["prompt"], self.model)
+        completion_tokens = usage.get("completion_tokens") or count_tokens(completion, self.model)
+        record = {
+            "stage": pending["stage"],
+            "attempt": pending["attempt"],
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "cost": (prompt_tokens * self.prompt_price + completion_tokens * self.completion_price) / 1000,
+            "latency": round(latency, 3),
+            "estimated": estimated,
+        }
+        with self._lock:
+            self.calls.append(record)
+            self.total_tokens += record["total_tokens"]
+
+    def on_llm_new_token(self, token, **kwargs):
+        # Streamed responses can be cut off mid-call once the budget runs out
+        self.check_budget()
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+            if pending:
+                self.calls.append({
+                    "stage": pending["stage"], "attempt": pending["attempt"],
+                    "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cost": 0.0,
+                    "latency": round(time.perf_counter() - pending["start"], 3),
+                    "estimated": False, "error": f"{type(error).__name__}: {error}",
+                })
+
+    def summary(self, agents: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Aggregate recorded calls per stage and for the whole run.
+
+        agents maps stage names to the agent that runs them, for labelling the report.
+        """
+        with self._lock:
+            calls = list(self.calls)
+            exceeded = self.exceeded
+            elapsed = time.time() - self.started
+
+        def aggregate(records):
+            return {
+                "calls": len(records),
+                "errors": sum(1 for r in records if r.get("error")),
+                "prompt_tokens": sum(r["prompt_tokens"] for r in records),
+                "completion_tokens": sum(r["completion_tokens"] for r in records),
+                "total_tokens": sum(r["total_tokens"] for r in records),
+                "cost": round(sum(r["cost"] for r in records), 6),
+                "llm_seconds": round(sum(r["latency"] for r in records), 3),
+            }
+
+        stages = {}
+        for record in calls:
+            stages.setdefault(record["stage"], []).append(record)
+        per_stage = {}
+        for name, records in stages.items():
+            per_stage[name] = aggregate(records)
+            per_stage[name]["agent"] = (agents or {}).get(name)
+            per_stage[name]["retries"] = max(r["attempt"] for r in records) - 1
+
+        total = aggregate(calls)
+        total["wall_seconds"] = round(elapsed, 3)
+        return {
+            "model": self.model,
+            "budgets": {"max_tokens": self.max_tokens, "max_seconds": self.max_seconds},
+            "budget_exceeded": exceeded,
+            "total": total,
+            "stages": per_stage,
+            "calls": calls,
+        }
+
+    def write_report(self, path: str, agents: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        report = self.summary(agents)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, path)
+        return report
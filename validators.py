@@ -0,0 +1,348 @@
+import os
+import re
+import posixpath
+from bisect import bisect_right
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+# Elements that never have content or a closing tag
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+                 "source", "track", "wbr"}
+# Roots of foreign content (SVG, MathML), where "/>" closes an element as in XML
+FOREIGN_ELEMENTS = {"svg", "math"}
+# Elements whose closing tag may be omitted; they are closed implicitly by their parent
+OPTIONAL_CLOSE = {"p", "li", "dt", "dd", "option", "optgroup", "tr", "td", "th", "thead", "tbody", "tfoot",
+                  "colgroup", "caption", "rb", "rt", "rtc", "rp", "html", "head", "body"}
+# Below this many bytes in total, files are validated in-process: starting workers costs more
+PARALLEL_THRESHOLD = 256 * 1024
+# Diagnostics reported per file; past this the file is clearly broken and more detail costs time
+MAX_DIAGNOSTICS = 50
+
+CLOSERS = {")": "(", "]": "[", "}": "{"}
+OPENERS = {v: k for k, v in CLOSERS.items()}
+
+
+def locate(content: str, found: List[tuple], path: str) -> List[Dict]:
+    """Turn (offset, message) pairs into error diagnostics with line and column, in file order."""
+    found = sorted(found)[:MAX_DIAGNOSTICS]
+    if not found:
+        return []
+    line_starts = [0] + [m.end() for m in re.finditer("\n", content[:found[-1][0]])]
+    diagnostics = []
+    for position, message in found:
+        line = bisect_right(line_starts, position)
+        diagnostics.append({"file": path, "line": line, "column": position - line_starts[line - 1] + 1,
+                            "severity": "error", "message": message})
+    return diagnostics
+
+
+class _StructureChecker(HTMLParser):
+    """Tracks open elements while the document streams through html.parser."""
+
+    def __init__(self, content: str, path: str):
+        # Text content is never inspected, so character references are not decoded
+        super().__init__(convert_charrefs=False)
+        self.content = content
+        self.path = path
+        self.stack = []  # (tag, (line, column))
+        self.ids = set()
+        self.diagnostics = []
+
+    def report(self, message: str, severity: str = "error", position: Optional[tuple] = None):
+        if len(self.diagnostics) >= MAX_DIAGNOSTICS:
+            return
+        line, column = position or self.getpos()
+        self.diagnostics.append({"file": self.path, "line": line, "column": column + 1,
+                                 "severity": severity, "message": message})
+
+    def in_foreign_content(self) -> bool:
+        return any(tag in FOREIGN_ELEMENTS for tag, _ in self.stack)
+
+    def record_ids(self, attrs):
+        for name, value in attrs:
+            if name == "id" and value:
+                if value in self.ids:
+                    self.report(f'duplicate id "{value}"', "warning")
+                self.ids.add(value)
+
+    def handle_starttag(self, tag, attrs):
+        self.record_ids(attrs)
+        if tag not in VOID_ELEMENTS or self.in_foreign_content():
+            self.stack.append((tag, self.getpos()))
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in FOREIGN_ELEMENTS or self.in_foreign_content():
+            # <path/> inside <svg> is a complete element
+            self.record_ids(attrs)
+            return
+        # <div/> is not self-closing in HTML; treat it as an open tag like browsers do
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS and not self.in_foreign_content():
+            self.report(f"</{tag}> closes a void element")
+            return
+        open_tags = [t for t, _ in self.stack]
+        if tag not in open_tags:
+            self.report(f"</{tag}> has no matching <{tag}>")
+            return
+        # Everything opened after the match must be implicitly closable
+        while self.stack:
+            open_tag, position = self.stack.pop()
+            if open_tag == tag:
+                break
+            if open_tag not in OPTIONAL_CLOSE:
+                self.report(f"<{open_tag}> is not closed before </{tag}>", position=position)
+
+    def finish(self):
+        # Whatever html.parser could not consume yet is an unfinished tag, comment or declaration
+        leftover = self.rawdata
+        if leftover.lstrip().startswith("<"):
+            offset = len(self.content) - len(leftover.lstrip())
+            line = self.content.count("\n", 0, offset) + 1
+            self.report("unterminated tag or comment",
+                        position=(line, offset - (self.content.rfind("\n", 0, offset) + 1)))
+        self.close()
+        for tag, position in self.stack:
+            if tag not in OPTIONAL_CLOSE:
+                self.report(f"<{tag}> is never closed", position=position)
+        return self.diagnostics
+
+
+def validate_html(content: str, path: str = "") -> List[Dict]:
+    """Structural check of an HTML document or fragment: unclosed and mismatched elements,
+    stray closing tags, unterminated markup and duplicate ids."""
+    checker = _StructureChecker(content, path)
+    checker.feed(content)
+    return checker.finish()
+
+
+CSS_TOKEN = re.compile(r"/\*|\"|'|[{}();\[\]]")
+CSS_STRING = {'"': re.compile(r'"(?:[^"\\\n]|\\.)*"', re.S), "'": re.compile(r"'(?:[^'\\\n]|\\.)*'", re.S)}
+
+
+def validate_css(content: str, path: str = "") -> List[Dict]:
+    """Tokenizer-level stylesheet check: unterminated comments and strings, unbalanced braces,
+    parentheses and brackets, and declarations outside of any rule."""
+    found = []
+    stack = []  # (char, offset)
+    statement_start = 0
+    position = 0
+    while True:
+        match = CSS_TOKEN.search(content, position)
+        if not match:
+            break
+        token, position = match.group(0), match.start()
+        if token == "/*":
+            end = content.find("*/", position + 2)
+            if end == -1:
+                found.append((position, "unterminated comment"))
+                return locate(content, found, path)
+            position = end + 2
+            continue
+        if token in CSS_STRING:
+            string = CSS_STRING[token].match(content, position)
+            if not string:
+                found.append((position, "unterminated string"))
+                position = content.find("\n", position)
+                if position == -1:
+                    break
+                continue
+            position = string.end()
+            continue
+        if token in OPENERS:
+            stack.append((token, position))
+        elif token in CLOSERS:
+            if not stack or stack[-1][0] != CLOSERS[token]:
+                expected = f", expected '{OPENERS[stack[-1][0]]}'" if stack else ""
+                found.append((position, f"unexpected '{token}'{expected}"))
+                if stack and CLOSERS[token] in [c for c, _ in stack]:
+                    while stack and stack[-1][0] != CLOSERS[token]:
+                        stack.pop()
+                    stack.pop()
+            else:
+                stack.pop()
+            if token == "}":
+                statement_start = position + 1
+        elif token == ";" and not stack:
+            statement = content[statement_start:position]
+            statement = re.sub(r"/\*.*?\*/", "", statement, flags=re.S).strip()
+            if statement and not statement.startswith("@"):
+                start = statement_start + (len(content[statement_start:position]) -
+                                           len(content[statement_start:position].lstrip()))
+                found.append((start, "declaration outside of a rule"))
+            statement_start = position + 1
+        position += 1
+    for char, offset in stack:
+        found.append((offset, f"'{char}' is never closed"))
+    return locate(content, found, path)
+
+
+JS_TOKEN = re.compile(r"//|/\*|\"|'|`|/|[{}()\[\]]")
+JS_STRING = {'"': re.compile(r'"(?:[^"\\\n]|\\.)*"', re.S), "'": re.compile(r"'(?:[^'\\\n]|\\.)*'", re.S)}
+JS_REGEX = re.compile(r"/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-z]*")
+# After these tokens a "/" starts a regular expression rather than a division
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw",
+                  "instanceof", "yield", "await"}
+
+
+REGEX_CONTEXT = re.compile(r"([A-Za-z_$][\w$]*|\+\+|--|\S)\s*$")
+
+
+def starts_regex(before: str) -> bool:
+    """Whether a "/" following the code `before` starts a regular expression; shared with the
+    bundler's minifier. A trailing ++ or -- ends an operand (total++ / count), so what follows
+    is a division."""
+    match = REGEX_CONTEXT.search(before[-64:])
+    return not match or match.group(1) in REGEX_PRECEDERS or match.group(1) in REGEX_KEYWORDS
+
+
+def validate_js(content: str, path: str = "") -> List[Dict]:
+    """Lightweight JavaScript syntax check: unterminated strings, template literals, regular
+    expressions and comments, and unbalanced brackets, including inside ${} substitutions.
+
+    It is a tokenizer, not a parser, so it only reports what is certainly wrong.
+    """
+    found = []
+    # Each frame is a bracket or a template literal; "${" pushes "{" and its "}" returns to the template
+    stack = []  # (char, offset)
+    position = 0
+    n = len(content)
+
+    def scan_template(position: int) -> int:
+        """Scan template text from `position` to the closing backtick or a ${; returns the index after it."""
+        i = position
+        while i < n:
+            c = content[i]
+            if c == "\\":
+                i += 2
+            elif c == "`":
+                return i + 1
+            elif c == "$" and content.startswith("${", i):
+                stack.append(("${", i))
+                return i + 2
+            else:
+                i += 1
+        return -1
+
+    while position < n:
+        match = JS_TOKEN.search(content, position)
+        if not match:
+            break
+        token, position = match.group(0), match.start()
+        if token == "//":
+            end = content.find("\n", position)
+            position = n if end == -1 else end
+        elif token == "/*":
+            end = content.find("*/", position + 2)
+            if end == -1:
+                found.append((position, "unterminated comment"))
+                break
+            position = end + 2
+        elif token in JS_STRING:
+            string = JS_STRING[token].match(content, position)
+            if not string:
+                found.append((position, "unterminated string"))
+                end = content.find("\n", position)
+                position = n if end == -1 else end
+            else:
+                position = string.end()
+        elif token == "`":
+            end = scan_template(position + 1)
+            if end == -1:
+                found.append((position, "unterminated template literal"))
+                break
+            position = end
+        elif token == "/":
+            if starts_regex(content[max(0, position - 64):position]):
+                regex = JS_REGEX.match(content, position)
+                if not regex:
+                    found.append((position, "unterminated regular expression"))
+                    end = content.find("\n", position)
+                    position = n if end == -1 else end
+                else:
+                    position = regex.end()
+            else:
+                position += 1
+        elif token in OPENERS:
+            stack.append((token, position))
+            position += 1
+        else:
+            expected = CLOSERS[token]
+            if token == "}" and stack and stack[-1][0] == "${":
+                stack.pop()
+                end = scan_template(position + 1)
+                if end == -1:
+                    found.append((position, "unterminated template literal"))
+                    break
+                position = end
+                continue
+            if not stack or stack[-1][0] != expected:
+                wanted = f", expected '{OPENERS.get(stack[-1][0], '}')}'" if stack else ""
+                found.append((position, f"unexpected '{token}'{wanted}"))
+                # Recover by closing up to the matching opener if there is one
+                if any(char == expected for char, _ in stack):
+                    while stack and stack[-1][0] != expected:
+                        stack.pop()
+                    stack.pop()
+            else:
+                stack.pop()
+            position += 1
+    for char, offset in stack:
+        what = "template substitution '${'" if char == "${" else f"'{char}'"
+        found.append((offset, f"{what} is never closed"))
+    return locate(content, found, path)
+
+
+VALIDATORS = {".html": validate_html, ".htm": validate_html, ".css": validate_css, ".js": validate_js,
+              ".mjs": validate_js}
+
+
+def validate_file(path: str, content: str) -> List[Dict]:
+    validator = VALIDATORS.get(posixpath.splitext(path)[1].lower())
+    if validator is None or not isinstance(content, str):
+        return []
+    return validator(content, path)
+
+
+def _validate_batch(batch: List[tuple]) -> List[tuple]:
+    return [(path, validate_file(path, content)) for path, content in batch]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    # One pool per process, started on first use and kept for later generations
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool
+
+
+def validate_files(files: Dict[str, str], workers: Optional[int] = None) -> Dict[str, List[Dict]]:
+    """Validate every HTML, CSS and JS file; returns path -> diagnostics for all of them.
+
+    Large batches are spread over a process pool in chunks of similar size; small ones
+    are validated in-process.
+    """
+    items = [(path, content) for path, content in files.items()
+             if isinstance(content, str) and posixpath.splitext(path)[1].lower() in VALIDATORS]
+    total = sum(len(content) for _, content in items)
+    workers = workers or (len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()) or 1
+    if total < PARALLEL_THRESHOLD or workers < 2:
+        return dict(_validate_batch(items))
+
+    # Largest files first, dealt round-robin so every chunk does a similar amount of work
+    ordered = sorted(items, key=lambda item: len(item[1]), reverse=True)
+    chunks = [ordered[i::workers * 2] for i in range(workers * 2)]
+    results = {}
+    for batch in _get_pool(workers).map(_validate_batch, [chunk for chunk in chunks if chunk]):
+        results.update(batch)
+    return {path: results[path] for path, _ in items}
+
+
+def format_diagnostic(entry: Dict) -> str:
+    return f"{entry['file']}:{entry['line']}:{entry['column']}: {entry['severity']}: {entry['message']}"